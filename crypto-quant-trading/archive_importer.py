@@ -0,0 +1,163 @@
+"""
+K线归档导入模块 - 把交易所提供的K线归档文件（zip/csv）批量导入本地K线缓存
+
+归档文件命名与币安公开数据一致，例如:
+    BTCUSDT-1m-2024-01.zip      （月度）
+    BTCUSDT-1m-2024-01-15.zip   （日度）
+每个zip内含一个同名CSV，列布局与 /klines 接口的12个字段相同（部分文件带表头）。
+"""
+
+import os
+import re
+import zipfile
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from config import Config
+from kline_store import KlineStore, OHLCV_COLUMNS
+from kline_parser import KLINE_COLUMNS, KEEP_FIELDS, klines_to_frame
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PATTERN = re.compile(
+    r'^(?P<symbol>[A-Z0-9]+)-(?P<interval>\d+[smhdwM])-(?P<date>\d{4}-\d{2}(?:-\d{2})?)\.(?:zip|csv)$'
+)
+
+# 毫秒时间戳的上限，超过即认为是微秒时间戳（新版归档文件）
+_MAX_MS_TIMESTAMP = 10 ** 14
+
+
+def parse_archive_name(filename):
+    """
+    解析归档文件名
+
+    Args:
+        filename: 文件名（不含目录）
+
+    Returns:
+        tuple: (交易对, K线间隔)，无法识别时返回None
+    """
+    match = ARCHIVE_PATTERN.match(filename)
+    if match is None:
+        return None
+    return match.group('symbol'), match.group('interval')
+
+
+def _parse_csv_bytes(content):
+    """
+    解析归档CSV内容为 (n, 6) float64 数组（开盘时间毫秒 + OHLCV）
+    """
+    # 跳过表头行
+    first_line_end = content.find(b'\n')
+    first_line = content[:first_line_end if first_line_end >= 0 else len(content)]
+    if first_line[:1].isalpha():
+        content = content[first_line_end + 1:] if first_line_end >= 0 else b''
+
+    flat = np.fromstring(content.strip().replace(b'\r', b'').replace(b'\n', b','), sep=',')
+    if flat.size % len(KLINE_COLUMNS) != 0:
+        raise ValueError(f"CSV字段数不是 {len(KLINE_COLUMNS)} 的整数倍")
+
+    rows = np.ascontiguousarray(flat.reshape(-1, len(KLINE_COLUMNS))[:, :KEEP_FIELDS])
+    if len(rows) and rows[0, 0] >= _MAX_MS_TIMESTAMP:
+        rows[:, 0] = np.floor_divide(rows[:, 0], 1000)
+    return rows
+
+
+def read_archive(path):
+    """
+    读取单个归档文件（zip内的CSV直接在内存中解压，不写临时文件）
+
+    Args:
+        path: 归档文件路径 (.zip 或 .csv)
+
+    Returns:
+        ndarray: (n, 6) float64 数组，列为 开盘时间(毫秒) + OHLCV
+    """
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            members = [name for name in archive.namelist() if name.endswith('.csv')]
+            return np.concatenate([_parse_csv_bytes(archive.read(name)) for name in members]) \
+                if members else np.empty((0, KEEP_FIELDS))
+    with open(path, 'rb') as f:
+        return _parse_csv_bytes(f.read())
+
+
+def find_archives(directory):
+    """
+    查找目录（含子目录）中所有可识别的归档文件
+
+    Args:
+        directory: 归档目录
+
+    Returns:
+        list: [(路径, 交易对, K线间隔), ...]，按文件名排序
+    """
+    found = []
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            parsed = parse_archive_name(filename)
+            if parsed is not None:
+                found.append((os.path.join(root, filename), *parsed))
+    return sorted(found, key=lambda item: os.path.basename(item[0]))
+
+
+def load_archives(directory, symbol=None, interval=None, workers=None):
+    """
+    多进程读取目录中的归档文件，返回与 CryptoDataFetcher 相同格式的数据
+
+    Args:
+        directory: 归档目录
+        symbol: 只读取该交易对，默认全部
+        interval: 只读取该K线间隔，默认全部
+        workers: 进程数，默认取 Config.IMPORT_WORKERS（None为CPU核数）
+
+    Returns:
+        dict: {(交易对, K线间隔): DataFrame}
+    """
+    archives = [
+        item for item in find_archives(directory)
+        if (symbol is None or item[1] == symbol.upper()) and (interval is None or item[2] == interval)
+    ]
+    if not archives:
+        logger.warning(f"{directory} 中没有找到K线归档文件")
+        return {}
+
+    pages = {}
+    with ProcessPoolExecutor(max_workers=workers or Config.IMPORT_WORKERS) as pool:
+        futures = {pool.submit(read_archive, path): (path, sym, iv) for path, sym, iv in archives}
+        for done, future in enumerate(as_completed(futures), 1):
+            path, sym, iv = futures[future]
+            try:
+                pages.setdefault((sym, iv), []).append(future.result())
+            except Exception as e:
+                logger.error(f"解析归档文件失败 {path}: {str(e)}")
+            if done % 50 == 0 or done == len(futures):
+                logger.info(f"已解析 {done}/{len(futures)} 个归档文件")
+
+    return {key: klines_to_frame(frames) for key, frames in pages.items()}
+
+
+def import_archives(directory, store=None, symbol=None, interval=None, workers=None):
+    """
+    把目录中的归档文件导入本地K线缓存
+
+    Args:
+        directory: 归档目录
+        store: 目标 KlineStore，默认使用 Config.KLINE_STORE_DIR
+        symbol: 只导入该交易对，默认全部
+        interval: 只导入该K线间隔，默认全部
+        workers: 解析进程数
+
+    Returns:
+        dict: {(交易对, K线间隔): 写入的K线数量}
+    """
+    store = store or KlineStore(Config.KLINE_STORE_DIR)
+    summary = {}
+    for (sym, iv), df in load_archives(directory, symbol, interval, workers).items():
+        if not store.supports(iv):
+            logger.warning(f"本地缓存不支持K线间隔 {iv}，跳过 {sym}")
+            continue
+        summary[(sym, iv)] = store.write(sym, iv, df[OHLCV_COLUMNS])
+        logger.info(f"导入 {sym} {iv}: {summary[(sym, iv)]} 条K线 "
+                    f"({df.index[0]} ~ {df.index[-1]})")
+    return summary
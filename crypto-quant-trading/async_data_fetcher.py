@@ -0,0 +1,262 @@
+"""
+异步数据获取模块 - 基于asyncio并发获取多个交易对的数据
+"""
+
+import asyncio
+import logging
+import aiohttp
+from config import Config
+from kline_store import interval_to_ms
+from rate_limiter import AsyncWeightRateLimiter
+from http_transport import ApiRequestError, HttpTransport, backoff_delay
+from kline_parser import parse_klines, klines_to_frame
+from data_fetcher import CryptoDataFetcher
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCryptoDataFetcher:
+    """异步加密货币数据获取器
+
+    返回值与 CryptoDataFetcher 相同。同一实例的所有请求共享一个连接池、
+    一个并发上限和一个权重令牌桶，适合对大量交易对使用 gather 并发获取。
+
+    用法:
+        async with AsyncCryptoDataFetcher() as fetcher:
+            prices = await fetcher.gather('get_current_price', ['BTCUSDT', 'ETHUSDT'])
+    """
+
+    def __init__(self, exchange='binance', base_url=None, max_concurrency=None):
+        """
+        初始化异步数据获取器
+
+        Args:
+            exchange: 交易所名称，默认为binance
+            base_url: API地址，默认取 Config.BASE_URL（测试时可指向本地服务）
+            max_concurrency: 同时进行的最大请求数，默认取 Config.ASYNC_MAX_CONCURRENCY
+        """
+        self.exchange = exchange
+        self.base_url = base_url or Config.BASE_URL
+        self.max_concurrency = max_concurrency or Config.ASYNC_MAX_CONCURRENCY
+        self.max_retries = Config.HTTP_MAX_RETRIES
+
+        self.rate_limiter = AsyncWeightRateLimiter(Config.API_WEIGHT_LIMIT,
+                                                   safety_ratio=Config.API_WEIGHT_SAFETY)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _ensure_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            timeout = aiohttp.ClientTimeout(total=Config.HTTP_TIMEOUT)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, endpoint, params, weight=1, raw=False):
+        """
+        请求API端点，对限流、服务端错误和网络异常自动重试
+
+        Args:
+            endpoint: 端点路径 (例如: klines, ticker/price)
+            params: 查询参数
+            weight: 请求权重
+            raw: 为True时返回原始响应体 (bytes)，否则返回解析后的JSON
+
+        Returns:
+            解析后的JSON或原始响应体
+
+        Raises:
+            ApiRequestError: 请求失败
+        """
+        session = self._ensure_session()
+        url = f"{self.base_url}/{endpoint}"
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            headers = None
+            async with self._semaphore:
+                await self.rate_limiter.acquire(weight)
+                try:
+                    async with session.get(url, params=params) as response:
+                        headers = response.headers
+                        self.rate_limiter.update_from_headers(headers)
+                        if response.status == 200:
+                            if raw:
+                                return await response.read()
+                            return await response.json(content_type=None)
+                        last_error = f"API请求失败: {response.status}"
+                        if response.status not in HttpTransport.RETRY_STATUS:
+                            raise ApiRequestError(f"{endpoint} {last_error}", response.status)
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    last_error = f"网络异常: {str(e) or type(e).__name__}"
+
+            if attempt == self.max_retries:
+                break
+
+            try:
+                delay = backoff_delay(attempt, headers, Config.HTTP_BACKOFF_BASE, Config.HTTP_BACKOFF_MAX,
+                                      Config.HTTP_RETRY_AFTER_MAX)
+            except ApiRequestError as e:
+                raise ApiRequestError(f"{endpoint} {last_error}，{e}", response.status) from None
+            logger.warning(f"{endpoint} {last_error}，{delay:.2f}秒后第{attempt + 1}次重试")
+            await asyncio.sleep(delay)
+
+        raise ApiRequestError(f"{endpoint} 重试{self.max_retries}次后仍失败 ({last_error})")
+
+    async def gather(self, method, symbols, *args, **kwargs):
+        """
+        对多个交易对并发调用同一个获取方法
+
+        Args:
+            method: 方法名 (get_historical_data, get_realtime_data,
+                    get_market_info, get_current_price)
+            symbols: 交易对列表
+            *args, **kwargs: 传给该方法的其余参数
+
+        Returns:
+            dict: {交易对: 结果}，失败的交易对结果为None
+        """
+        fetch = getattr(self, method)
+        results = await asyncio.gather(*(fetch(symbol, *args, **kwargs) for symbol in symbols))
+        return dict(zip(symbols, results))
+
+    async def get_historical_data(self, symbol, start_date, end_date, interval='1d', warmup=0):
+        """
+        获取历史K线数据
+
+        Args:
+            symbol: 交易对符号 (例如: BTCUSDT)
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            interval: K线间隔 (1m, 5m, 15m, 1h, 4h, 1d等)
+            warmup: 开始日期之前额外获取的K线数（指标预热）
+
+        Returns:
+            DataFrame: 包含OHLCV数据
+        """
+        try:
+            start_ts, end_ts = CryptoDataFetcher._date_range_to_ts(start_date, end_date)
+            start_ts = CryptoDataFetcher._warmup_start_ts(start_ts, interval, warmup)
+
+            windows = CryptoDataFetcher._split_windows(interval, [(start_ts, end_ts)])
+            pages = await asyncio.gather(*(
+                self._fetch_window(symbol, interval, window_start, window_end)
+                for window_start, window_end in windows
+            ))
+            df = klines_to_frame([page for window in pages for page in window])
+
+            if df.empty:
+                logger.warning(f"{symbol} 未获取到任何数据")
+                return None
+
+            logger.info(f"成功获取 {symbol} {len(df)} 条历史数据")
+            return df
+
+        except Exception as e:
+            logger.error(f"获取 {symbol} 历史数据时出错: {str(e)}")
+            return None
+
+    async def _fetch_window(self, symbol, interval, start_ts, end_ts):
+        """分页获取单个时间窗口 [start_ts, end_ts] 的K线，返回各页解析后的数组"""
+        pages = []
+        current_ts = start_ts
+        step = interval_to_ms(interval) or 1
+
+        while current_ts <= end_ts:
+            params = {
+                'symbol': symbol,
+                'interval': interval,
+                'startTime': current_ts,
+                'endTime': end_ts,
+                'limit': Config.KLINES_PAGE_LIMIT
+            }
+            body = await self._get('klines', params, weight=Config.KLINES_REQUEST_WEIGHT, raw=True)
+            page = parse_klines(body)
+
+            if not len(page):
+                break
+
+            pages.append(page)
+            current_ts = int(page[-1, 0]) + step
+
+            if len(page) < Config.KLINES_PAGE_LIMIT:
+                break
+
+        return pages
+
+    async def get_realtime_data(self, symbol, limit=100, interval='1h'):
+        """
+        获取实时数据
+
+        Args:
+            symbol: 交易对符号
+            limit: 获取的K线数量
+            interval: K线间隔
+
+        Returns:
+            DataFrame: 最新的K线数据
+        """
+        try:
+            params = {
+                'symbol': symbol,
+                'interval': interval,
+                'limit': limit
+            }
+            body = await self._get('klines', params, weight=Config.KLINES_REQUEST_WEIGHT, raw=True)
+            return klines_to_frame([parse_klines(body)])
+
+        except Exception as e:
+            logger.error(f"获取 {symbol} 实时数据时出错: {str(e)}")
+            return None
+
+    async def get_market_info(self, symbol):
+        """
+        获取市场信息
+
+        Args:
+            symbol: 交易对符号
+
+        Returns:
+            dict: 市场信息
+        """
+        try:
+            data = await self._get('ticker/24hr', {'symbol': symbol},
+                                   weight=Config.TICKER_REQUEST_WEIGHT)
+
+            return CryptoDataFetcher._ticker_to_info(symbol, data)
+
+        except Exception as e:
+            logger.error(f"获取 {symbol} 市场信息时出错: {str(e)}")
+            return None
+
+    async def get_current_price(self, symbol):
+        """
+        获取当前价格
+
+        Args:
+            symbol: 交易对符号
+
+        Returns:
+            float: 当前价格
+        """
+        try:
+            data = await self._get('ticker/price', {'symbol': symbol},
+                                   weight=Config.TICKER_REQUEST_WEIGHT)
+            return float(data['price'])
+
+        except Exception as e:
+            logger.error(f"获取 {symbol} 当前价格时出错: {str(e)}")
+            return None
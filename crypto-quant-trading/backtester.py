@@ -7,31 +7,106 @@ import numpy as np
 import matplotlib.pyplot as plt
 import logging
 from datetime import datetime
+from config import Config
+from strategy import signal_labels, signal_codes
+from simulator import simulate
 
 logger = logging.getLogger(__name__)
 
 
+def _holding_state(buy, sell):
+    """
+    每根K线交易后的持仓状态：最近一个买入/卖出信号决定（之前为空仓）
+    
+    全仓买入、全部卖出时，"空仓才买入、持仓才卖出"等价于沿用最近一个非HOLD信号。
+    """
+    last = np.maximum.accumulate(np.where(buy | sell, np.arange(len(buy)), -1))
+    return (last >= 0) & buy[last]
+
+
+def _step_values(length, indices, values, initial):
+    """阶梯序列：indices 处取对应的 values，其余位置沿用前值，第一个变化点之前为 initial"""
+    last = np.full(length, -1)
+    last[indices] = indices
+    np.maximum.accumulate(last, out=last)
+    lookup = np.empty(length)
+    lookup[indices] = values
+    return np.where(last >= 0, lookup[last], initial)
+
+
+def _price_blocks(prices, levels):
+    """
+    长度为 2^l 的价格区间表（l = 0..levels）：第l行第i列为区间 [i, i+2^l) 的
+    最高价、最低价和区间内最大回撤（最低的 价格 / 此前最高价，比值形式）
+    
+    超出数组末尾的区间不会被查询，对应位置保持初始值。
+    """
+    length = len(prices)
+    highs = np.full((levels + 1, length), np.inf)
+    lows = np.full((levels + 1, length), np.inf)
+    drawdowns = np.ones((levels + 1, length))
+    highs[0], lows[0] = prices, prices
+    for level in range(1, levels + 1):
+        half = 1 << (level - 1)
+        n = length - 2 * half + 1
+        if n <= 0:
+            break
+        left, right = slice(0, n), slice(half, half + n)
+        highs[level, :n] = np.maximum(highs[level - 1, left], highs[level - 1, right])
+        lows[level, :n] = np.minimum(lows[level - 1, left], lows[level - 1, right])
+        drawdowns[level, :n] = np.minimum(
+            np.minimum(drawdowns[level - 1, left], drawdowns[level - 1, right]),
+            lows[level - 1, right] / highs[level - 1, left])
+    return highs, lows, drawdowns
+
+
+def _range_extreme(table, first, last, reduce):
+    """区间 [first, last] 的最高/最低价（两个可重叠的 2^l 区间合并）"""
+    level = np.log2(last - first + 1).astype(np.int64)
+    return reduce(table[level, first], table[level, last - (1 << level) + 1])
+
+
 class Backtester:
     """回测系统类"""
     
-    def __init__(self, initial_capital=10000, commission=0.001):
+    # 参数网格回测结果表中保留的指标
+    SUMMARY_METRICS = ['final_value', 'total_return_pct', 'max_drawdown', 'sharpe_ratio',
+                       'win_rate', 'num_trades']
+    
+    def __init__(self, initial_capital=10000, commission=0.001, position_size=1.0, stop_loss=None,
+                 take_profit=None, fill_price=None):
         """
         初始化回测系统
         
         Args:
             initial_capital: 初始资金
             commission: 交易手续费率
+            position_size: 每次买入使用可用资金的比例（如 Config.MAX_POSITION_SIZE）
+            stop_loss: 止损比例（如 Config.STOP_LOSS_PCT），None为不止损
+            take_profit: 止盈比例（如 Config.TAKE_PROFIT_PCT），None为不止盈
+            fill_price: 信号成交价 'close' 或 'next_open'，默认 Config.FILL_PRICE
         """
         self.initial_capital = initial_capital
         self.commission = commission
+        self.position_size = position_size
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.fill_price = fill_price or Config.FILL_PRICE
     
-    def run(self, data, strategy):
+    def path_dependent(self):
+        """是否启用了部分仓位、止损止盈或下一根开盘成交（需要逐根模拟，见 simulator.py）"""
+        return (self.position_size != 1 or bool(self.stop_loss) or bool(self.take_profit)
+                or self.fill_price != 'close')
+    
+    def run(self, data, strategy, start=None, log_trades=True):
         """
         运行回测
         
         Args:
             data: DataFrame包含OHLCV数据
             strategy: 交易策略对象
+            start: 回测开始时间；之前的K线只用于指标预热，不参与交易和统计
+            log_trades: 是否逐笔输出交易日志
         
         Returns:
             dict: 回测结果
@@ -40,88 +115,331 @@ class Backtester:
         
         # 生成交易信号
         df = strategy.generate_signals(data)
+        if start is not None:
+            # 位置切片不复制数据（布尔索引会复制整个表）
+            df = df.iloc[df.index.searchsorted(pd.Timestamp(start)):]
+        results = self.run_signals(df, log_trades)
+        
+        logger.info("回测完成！")
+        return results
+    
+    def run_signals(self, df, log_trades=True):
+        """
+        按已生成的交易信号运行回测
+        
+        持仓状态、成交点和组合价值均按数组计算：最近一个非HOLD信号决定持仓状态
+        （空仓时才买入、持仓时才卖出），只有逐笔交易的资金递推按成交顺序计算，
+        结果与逐行遍历完全一致。
+        
+        启用了止损止盈等规则时交给 simulator.simulate 逐根模拟。
+        
+        Args:
+            df: DataFrame包含close列和signal列（'BUY'/'SELL'/'HOLD'），
+                逐根模拟时还需要 open/high/low 列
+            log_trades: 是否逐笔输出交易日志
         
-        # 初始化回测变量
+        Returns:
+            dict: 回测结果
+        """
+        if self.path_dependent():
+            pv_df, trades = simulate(df, signal_codes(df['signal']), self.initial_capital, self.commission,
+                                     self.position_size, self.stop_loss, self.take_profit, self.fill_price)
+            if log_trades:
+                for trade in trades:
+                    action = '买入' if trade['type'] == 'BUY' else '卖出'
+                    logger.info(f"{action} - 时间: {trade['timestamp']}, 价格: ${trade['price']:.2f}, "
+                                f"数量: {trade['quantity']:.6f}")
+            return self._calculate_metrics(df, pv_df, trades)
+        
+        # 紧凑模式下价格为float32，资金计算统一使用float64
+        prices = df['close'].to_numpy(dtype=np.float64)
+        signals = df['signal'].to_numpy()
+        
+        # 每根K线交易后是否持仓
+        holding = _holding_state(signals == 'BUY', signals == 'SELL')
+        held = np.concatenate([[False], holding[:-1]])
+        entries = np.flatnonzero(holding & ~held)
+        exits = np.flatnonzero(held & ~holding)
+        
+        # 逐笔资金递推：买入使用所有可用资金，卖出清空所有持仓
+        quantities = np.empty(len(entries))
+        proceeds = np.empty(len(exits))
         capital = self.initial_capital
-        position = 0  # 持仓数量
-        portfolio_value = []
-        trades = []
+        for k, i in enumerate(entries):
+            quantities[k] = capital / prices[i] * (1 - self.commission)
+            if k < len(exits):
+                capital = quantities[k] * prices[exits[k]] * (1 - self.commission)
+                proceeds[k] = capital
         
-        # 遍历数据进行回测
-        for i, (timestamp, row) in enumerate(df.iterrows()):
-            current_price = row['close']
-            signal = row['signal']
-            
-            # 计算当前组合价值
-            current_value = capital + position * current_price
-            portfolio_value.append({
+        # 每根K线交易前的资金、持仓和组合价值
+        events = np.concatenate([entries, exits])
+        capital_after = _step_values(len(df), events, np.concatenate([np.zeros(len(entries)), proceeds]),
+                                     self.initial_capital)
+        position_after = _step_values(len(df), events, np.concatenate([quantities, np.zeros(len(exits))]), 0)
+        capital_before = np.concatenate([[self.initial_capital], capital_after[:-1]])
+        position_before = np.concatenate([[0], position_after[:-1]])
+        pv_df = pd.DataFrame({
+            'timestamp': df.index,
+            'value': capital_before + position_before * prices,
+            'capital': capital_before,
+            'position': position_before,
+            'price': prices
+        })
+        
+        trades = []
+        for k, i in enumerate(entries):
+            timestamp, price, quantity = df.index[i], float(prices[i]), float(quantities[k])
+            trades.append({
                 'timestamp': timestamp,
-                'value': current_value,
-                'capital': capital,
-                'position': position,
-                'price': current_price
+                'type': 'BUY',
+                'price': price,
+                'quantity': quantity,
+                'value': quantity * price
             })
-            
-            # 执行交易
-            if signal == 'BUY' and position == 0:
-                # 买入：使用所有可用资金
-                position = capital / current_price * (1 - self.commission)
-                capital = 0
-                trades.append({
-                    'timestamp': timestamp,
-                    'type': 'BUY',
-                    'price': current_price,
-                    'quantity': position,
-                    'value': position * current_price
-                })
-                logger.info(f"买入 - 时间: {timestamp}, 价格: ${current_price:.2f}, 数量: {position:.6f}")
-                
-            elif signal == 'SELL' and position > 0:
-                # 卖出：清空所有持仓
-                capital = position * current_price * (1 - self.commission)
+            if log_trades:
+                logger.info(f"买入 - 时间: {timestamp}, 价格: ${price:.2f}, 数量: {quantity:.6f}")
+            if k < len(exits):
+                timestamp, price = df.index[exits[k]], float(prices[exits[k]])
                 trades.append({
                     'timestamp': timestamp,
                     'type': 'SELL',
-                    'price': current_price,
-                    'quantity': position,
-                    'value': capital
+                    'price': price,
+                    'quantity': quantity,
+                    'value': float(proceeds[k])
                 })
-                logger.info(f"卖出 - 时间: {timestamp}, 价格: ${current_price:.2f}, 数量: {position:.6f}")
-                position = 0
+                if log_trades:
+                    logger.info(f"卖出 - 时间: {timestamp}, 价格: ${price:.2f}, 数量: {quantity:.6f}")
         
         # 如果最后还有持仓，按最后价格卖出
-        if position > 0:
-            final_price = df['close'].iloc[-1]
-            capital = position * final_price * (1 - self.commission)
+        if len(entries) > len(exits):
+            final_price = float(prices[-1])
             trades.append({
                 'timestamp': df.index[-1],
                 'type': 'SELL',
                 'price': final_price,
-                'quantity': position,
-                'value': capital
+                'quantity': float(quantities[-1]),
+                'value': float(quantities[-1]) * final_price * (1 - self.commission)
             })
-            position = 0
         
         # 计算回测指标
-        results = self._calculate_metrics(df, portfolio_value, trades)
+        return self._calculate_metrics(df, pv_df, trades)
+    
+    def run_signal_matrix(self, data, signals, variants):
+        """
+        对信号矩阵的每一列（一组策略参数）回测，返回按夏普比率、收益率、最大回撤排序的结果表
         
-        logger.info("回测完成！")
-        return results
+        全仓、收盘成交时所有参数组合同时按持仓变化点计算（见 _matrix_metrics，与逐列调用
+        run_signals 的结果一致，夏普比率和最大回撤在浮点误差内一致），按
+        Config.MATRIX_BACKTEST_CHUNK_BYTES 分块控制内存；启用止损止盈等规则时逐列模拟。
+        
+        Args:
+            data: DataFrame包含OHLCV数据
+            signals: (时间 × 参数组合) 信号编码矩阵，见 TradingStrategy.*_signal_matrix
+            variants: 每列对应的参数字典列表
+        
+        Returns:
+            DataFrame: 每组参数一行，包含参数、主要回测指标和排名（rank，1为最优）
+        """
+        logger.info(f"开始参数网格回测: {len(variants)} 组参数")
+        if self.path_dependent():
+            columns = ['open', 'high', 'low', 'close']
+            rows = []
+            for j, variant in enumerate(variants):
+                df = data[columns].assign(signal=signal_labels(signals[:, j]))
+                results = self.run_signals(df, log_trades=False)
+                rows.append({key: results[key] for key in self.SUMMARY_METRICS})
+            metrics = pd.DataFrame(rows, columns=self.SUMMARY_METRICS)
+        else:
+            prices = data['close'].to_numpy(dtype=np.float64)
+            # 每组参数需要一个时间长度的非HOLD标记，每个非HOLD信号约6个整数下标
+            per_variant = len(prices) + 48 * np.count_nonzero(signals) / max(signals.shape[1], 1)
+            chunk = max(1, int(Config.MATRIX_BACKTEST_CHUNK_BYTES // per_variant))
+            metrics = pd.concat([
+                pd.DataFrame(self._matrix_metrics(prices, signals[:, j:j + chunk].T))
+                for j in range(0, signals.shape[1], chunk)
+            ], ignore_index=True)
+        
+        return self.rank_results(pd.concat([pd.DataFrame(variants), metrics], axis=1))
     
-    def _calculate_metrics(self, data, portfolio_value, trades):
+    @staticmethod
+    def rank_results(table):
+        """
+        参数组合结果表按夏普比率、收益率、最大回撤（回撤越小越好）排序并编号
+        
+        Args:
+            table: 每组参数一行、包含 SUMMARY_METRICS 的DataFrame
+        
+        Returns:
+            DataFrame: 排序后的结果表，首列 rank 为名次（1为最优）
+        """
+        table = table.drop(columns='rank', errors='ignore')
+        table = table.sort_values(['sharpe_ratio', 'total_return_pct', 'max_drawdown'],
+                                  ascending=False, kind='stable', ignore_index=True)
+        table.insert(0, 'rank', np.arange(1, len(table) + 1))
+        return table
+    
+    def _matrix_metrics(self, prices, codes):
+        """
+        一组参数组合同时回测，计算 SUMMARY_METRICS
+        
+        只处理持仓变化点：每组参数的买入/卖出点配成交易轮次，逐轮资金递推与
+        run_signals 运算顺序相同（最终价值、收益率、胜率、交易次数完全一致）；
+        夏普比率由收盘价收益率的前缀和加上每轮买入、卖出当根的收益率得到，
+        最大回撤由每轮持仓区间在价格区间表上的查询得到（浮点误差内一致）。
+        耗时与交易轮次数成正比，不随 参数组合 × K线数 增长。
+        
+        Args:
+            prices: 收盘价数组（float64）
+            codes: (参数组合 × 时间) 信号编码矩阵
+        
+        Returns:
+            dict: 指标名 -> 每组参数的指标数组
+        """
+        num_variants, length = codes.shape
+        cost = 1 - self.commission
+        
+        # 持仓变化点：最近一个非HOLD信号决定持仓，同一组参数内买入、卖出交替出现。
+        # 在 (时间 × 参数组合) 布局上找非HOLD信号，再按参数组合稳定排序（窄整数为基数排序）
+        nonzero = np.flatnonzero(codes.T != 0)
+        bars, rows = np.divmod(nonzero, num_variants)
+        order = np.argsort(rows.astype(np.min_scalar_type(num_variants)), kind='stable')
+        rows, bars = rows[order], bars[order]
+        del nonzero, order
+        state = codes[rows, bars] > 0
+        previous = np.empty_like(state)
+        previous[:1] = False
+        previous[1:] = state[:-1] & (rows[1:] == rows[:-1])
+        changes = np.flatnonzero(state != previous)
+        rows, bars, state = rows[changes], bars[changes], state[changes]
+        
+        # 交易轮次：买入点及其后的卖出点（未平仓的按最后一根K线收盘价卖出）
+        entries = np.flatnonzero(state)
+        following = np.minimum(entries + 1, len(rows) - 1)
+        closed = (entries + 1 < len(rows)) & (rows[following] == rows[entries])
+        trip_rows, entry_bars = rows[entries], bars[entries]
+        exit_bars = np.where(closed, bars[following], length - 1)
+        num_entries = np.bincount(trip_rows, minlength=num_variants)
+        trip_numbers = np.arange(len(entries)) - np.repeat(np.cumsum(num_entries) - num_entries, num_entries)
+        
+        # 逐轮资金递推（各参数组合同时计算，运算顺序与 run_signals 相同）
+        num_trips = max(int(num_entries.max(initial=0)), 1)
+        entry_prices = np.full((num_variants, num_trips), np.nan)
+        exit_prices = np.full((num_variants, num_trips), np.nan)
+        entry_prices[trip_rows, trip_numbers] = prices[entry_bars]
+        exit_prices[trip_rows, trip_numbers] = prices[exit_bars]
+        capital = np.empty((num_variants, num_trips + 1))
+        quantities = np.empty(entry_prices.shape)
+        capital[:, 0] = self.initial_capital
+        for k in range(num_trips):
+            quantities[:, k] = capital[:, k] / entry_prices[:, k] * cost
+            capital[:, k + 1] = quantities[:, k] * exit_prices[:, k] * cost
+        
+        # 最后一根K线买入的一轮在该K线上没有持仓，不影响组合价值
+        active = entry_bars < length - 1
+        trip_rows, entry_bars, exit_bars, trip_numbers, closed = (
+            trip_rows[active], entry_bars[active], exit_bars[active], trip_numbers[active], closed[active])
+        quantity = quantities[trip_rows, trip_numbers]
+        capital_in = capital[trip_rows, trip_numbers]
+        capital_out = capital[trip_rows, trip_numbers + 1]
+        # 持仓区间 [entry_bars + 1, exit_bars]；卖出点在最后一根K线之前时，下一根K线起为空仓
+        first_held = entry_bars + 1
+        exited = closed & (exit_bars < length - 1)
+        
+        # 最终价值：最后一根K线持仓时为数量 × 收盘价，否则为最后一轮卖出后的资金
+        final_value = np.full(num_variants, float(self.initial_capital))
+        last_trip = np.ones(len(trip_rows), dtype=bool)
+        last_trip[:-1] = trip_rows[1:] != trip_rows[:-1]
+        final_value[trip_rows[last_trip]] = np.where(exited, capital_out, quantity * prices[-1])[last_trip]
+        total_return_pct = (final_value - self.initial_capital) / self.initial_capital * 100
+        
+        # 夏普比率与 _calculate_metrics 相同：收益率均值 / 样本标准差，空仓K线收益率为0
+        num_returns = length - 1
+        sharpe_ratio = np.zeros(num_variants)
+        if num_returns > 0:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                market = np.zeros(length)
+                market[1:] = prices[1:] / prices[:-1] - 1
+            sums, squares = np.cumsum(market), np.cumsum(market ** 2)
+            entry_return = quantity * prices[first_held] / capital_in - 1
+            exit_return = np.where(exited, capital_out / (quantity * prices[exit_bars]) - 1, 0)
+            held_sum = sums[exit_bars] - sums[first_held]
+            held_squares = squares[exit_bars] - squares[first_held]
+            total = np.bincount(trip_rows, entry_return + held_sum + exit_return, minlength=num_variants)
+            total_squares = np.bincount(trip_rows, entry_return ** 2 + held_squares + exit_return ** 2,
+                                        minlength=num_variants)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = total / num_returns
+                std = np.sqrt(np.maximum(total_squares - total * mean, 0) / (num_returns - 1))
+                sharpe_ratio = np.where(std != 0, mean / std * np.sqrt(252), 0)
+        
+        # 最大回撤：空仓时组合价值不变，只需检查持仓区间和卖出后的第一根K线
+        if len(trip_rows):
+            held_lengths = exit_bars - first_held + 1
+            levels = int(held_lengths.max()).bit_length() - 1
+            highs, lows, drawdowns = _price_blocks(prices, levels)
+            peak = quantity * _range_extreme(highs, first_held, exit_bars, np.maximum)
+            # 本轮之前的组合价值最高点（卖出后的资金低于持仓时的最高价值）
+            peaks = np.zeros((num_variants, num_trips + 1))
+            peaks[:, 0] = self.initial_capital
+            peaks[trip_rows, trip_numbers + 1] = peak
+            running_peak = np.maximum.accumulate(peaks, axis=1)[trip_rows, trip_numbers]
+            threshold = running_peak / quantity
+            
+            # 从买入后第一根K线起跳过价格不超过此前最高点的部分（倍增查找）
+            breakout = first_held.copy()
+            for level in range(levels, -1, -1):
+                block_end = breakout + (1 << level) - 1
+                fits = block_end <= exit_bars
+                skip = fits & (highs[level, np.minimum(breakout, length - 1)] <= threshold)
+                breakout = np.where(skip, breakout + (1 << level), breakout)
+            ratio = np.ones(len(trip_rows))
+            below = breakout > first_held
+            ratio[below] = _range_extreme(lows, first_held[below], breakout[below] - 1, np.minimum) / threshold[below]
+            
+            # 突破之后最高点即本轮价格的最高点，回撤为该区间内价格的最大回撤
+            position = breakout.copy()
+            high = np.zeros(len(trip_rows))
+            with np.errstate(divide='ignore'):
+                for level in range(levels, -1, -1):
+                    take = position + (1 << level) - 1 <= exit_bars
+                    column = np.minimum(position, length - 1)
+                    ratio = np.where(take, np.minimum(np.minimum(ratio, drawdowns[level, column]),
+                                                      lows[level, column] / high), ratio)
+                    high = np.where(take, np.maximum(high, highs[level, column]), high)
+                    position = np.where(take, position + (1 << level), position)
+            ratio = np.where(exited, np.minimum(ratio, capital_out / np.maximum(running_peak, peak)), ratio)
+            
+            lowest = np.ones(num_variants)
+            np.minimum.at(lowest, trip_rows, ratio)
+            max_drawdown = (np.minimum(lowest, 1) - 1) * 100
+        else:
+            max_drawdown = np.zeros(num_variants)
+        
+        profitable = np.sum(exit_prices > entry_prices, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_rate = np.where(num_entries > 0, profitable / num_entries * 100, 0)
+        
+        return {
+            'final_value': final_value,
+            'total_return_pct': total_return_pct,
+            'max_drawdown': max_drawdown,
+            'sharpe_ratio': sharpe_ratio,
+            'win_rate': win_rate,
+            'num_trades': 2 * num_entries
+        }
+    
+    def _calculate_metrics(self, data, pv_df, trades):
         """
         计算回测指标
         
         Args:
             data: 原始数据
-            portfolio_value: 组合价值历史
+            pv_df: 组合价值历史（每根K线交易前的 timestamp/value/capital/position/price）
             trades: 交易记录
         
         Returns:
             dict: 回测指标
         """
-        pv_df = pd.DataFrame(portfolio_value)
-        
         # 最终价值
         final_value = pv_df['value'].iloc[-1]
         
@@ -130,7 +448,7 @@ class Backtester:
         total_return_pct = (total_return / self.initial_capital) * 100
         
         # 买入持有策略收益
-        buy_hold_return = (data['close'].iloc[-1] / data['close'].iloc[0] - 1) * 100
+        buy_hold_return = (float(data['close'].iloc[-1]) / float(data['close'].iloc[0]) - 1) * 100
         
         # 最大回撤
         cumulative_max = pv_df['value'].cummax()
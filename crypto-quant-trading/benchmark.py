@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+性能基准测试
+
+用法:
+    python benchmark.py parse --rows 1000000
+    python benchmark.py streaming --rows 20000
+    python benchmark.py kernels --rows 10000000
+    python benchmark.py panel --rows 5000 --symbols 200
+    python benchmark.py parallel --rows 10000000 --threads 8
+    python benchmark.py memory --rows 10000000
+    python benchmark.py backtest --rows 1000000
+    python benchmark.py simulate --rows 1600000
+    python benchmark.py matrix --rows 100000
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from config import Config
+from kline_parser import KLINE_COLUMNS, parse_klines, klines_to_frame
+from kline_store import OHLCV_COLUMNS
+from indicators import TechnicalIndicators, ALL_INDICATOR_COLUMNS
+from strategy import TradingStrategy, signal_labels
+from backtester import Backtester
+import simulator
+from compact_dtypes import track_peak_memory, format_bytes
+from panel import build_panel
+from streaming_indicators import StreamingIndicatorSet
+
+
+def best_time(func, repeat=3):
+    """多次运行取最快耗时（秒），并返回最后一次的结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def print_comparison(title, rows, baseline, optimized, unit='ms'):
+    """打印一组基准对比结果（unit 为 ms 或 us）"""
+    scale = 1000 if unit == 'ms' else 1_000_000
+    print(f"{title} ({rows:,} 条K线)")
+    print(f"  原实现:   {baseline * scale:10.1f} {unit}")
+    print(f"  新实现:   {optimized * scale:10.1f} {unit}")
+    print(f"  加速比:   {baseline / optimized:10.1f}x")
+
+
+def synthetic_ohlcv(rows, seed=42, start='2020-01-01', freq='1min'):
+    """生成随机游走的OHLCV数据"""
+    rng = np.random.default_rng(seed)
+    close = 20000 * np.exp(np.cumsum(rng.normal(0, 0.001, rows)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.0005, rows)) * close
+    index = pd.date_range(start, periods=rows, freq=freq, name='timestamp')
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 100, rows)
+    }, index=index)
+
+
+def synthetic_kline_pages(rows, page_size=1000):
+    """生成与交易所格式相同的K线响应体（每页一个JSON字节串）"""
+    df = synthetic_ohlcv(rows)
+    timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    values = df[OHLCV_COLUMNS].to_numpy()
+
+    pages = []
+    for start in range(0, rows, page_size):
+        page = []
+        for ts, (o, h, l, c, v) in zip(timestamps[start:start + page_size].tolist(),
+                                       values[start:start + page_size].tolist()):
+            page.append([ts, f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}",
+                         ts + 59999, f"{v * c:.8f}", 100, f"{v / 2:.8f}", f"{v * c / 2:.8f}", "0"])
+        pages.append(json.dumps(page).encode())
+    return pages
+
+
+def legacy_klines_to_frame(data):
+    """原有的转换方式：12列object类型DataFrame再逐列astype"""
+    df = pd.DataFrame(data, columns=KLINE_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    for col in OHLCV_COLUMNS:
+        df[col] = df[col].astype(float)
+    df.set_index('timestamp', inplace=True)
+    return df[OHLCV_COLUMNS]
+
+
+def bench_parse(args):
+    """K线响应解析：json.loads + object DataFrame vs NumPy直接解析"""
+    bodies = synthetic_kline_pages(args.rows)
+
+    def legacy():
+        all_data = []
+        for body in bodies:
+            all_data.extend(json.loads(body))
+        return legacy_klines_to_frame(all_data)
+
+    def fast():
+        return klines_to_frame([parse_klines(body) for body in bodies])
+
+    baseline, expected = best_time(legacy, args.repeat)
+    optimized, result = best_time(fast, args.repeat)
+    pd.testing.assert_frame_equal(result, expected, check_index_type=False)
+    print_comparison('K线解析', args.rows, baseline, optimized)
+
+
+def bench_streaming(args):
+    """实时模式每根新K线：整段重算 add_all_indicators vs 流式指标增量更新"""
+    df = synthetic_ohlcv(args.rows)
+    window = 500  # 与 Config.STREAM_BUFFER_SIZE 相同的缓冲长度
+    expected = TechnicalIndicators.add_all_indicators(df)
+
+    def recompute():
+        for end in range(window, len(df) + 1, max(1, len(df) // 200)):
+            TechnicalIndicators.add_all_indicators(df.iloc[end - window:end])
+
+    def incremental():
+        indicators = StreamingIndicatorSet()
+        return [indicators.update(bar) for bar in df.to_dict('records')]
+
+    batch_calls = len(range(window, len(df) + 1, max(1, len(df) // 200)))
+    baseline, _ = best_time(recompute, args.repeat)
+    optimized, rows = best_time(incremental, args.repeat)
+
+    result = pd.DataFrame(rows, index=df.index)
+    columns = list(result.columns)
+    pd.testing.assert_frame_equal(result, expected[columns], check_freq=False, rtol=1e-9)
+    print_comparison('流式指标（每根K线）', args.rows, baseline / batch_calls, optimized / len(df), unit='us')
+    print(f"  逐根与批量结果一致: {len(columns)} 列")
+
+
+def check_backend_parity(df):
+    """逐个指标校验NumPy后端与pandas后端结果一致"""
+    # pandas 的滚动标准差为在线增减算法，长序列上的绝对误差随价格量级增长
+    atol = 1e-7 * df['close'].abs().max()
+    for name in ['moving_average', 'exponential_moving_average', 'rsi', 'macd', 'bollinger_bands',
+                 'stochastic_oscillator', 'atr', 'obv']:
+        func = getattr(TechnicalIndicators, name)
+        args = (df, 20) if name in ('moving_average', 'exponential_moving_average') else (df,)
+        expected = func(*args, backend='pandas')
+        result = func(*args, backend='numpy')
+        for got, want in zip(*(r if isinstance(r, tuple) else (r,) for r in (result, expected))):
+            pd.testing.assert_series_equal(got, want, check_freq=False, rtol=1e-9, atol=atol)
+
+
+def bench_kernels(args):
+    """全部指标：pandas后端 vs NumPy滚动内核，数据量从 10^3 到 --rows"""
+    Config.INDICATOR_CACHE_ENABLED = False
+    print(f"{'K线数':>12}{'pandas':>12}{'numpy':>12}{'加速比':>9}")
+    rows = 1000
+    while rows <= args.rows:
+        df = synthetic_ohlcv(rows)
+        check_backend_parity(df)
+        # 只计时不保留结果，避免大数据量下同时持有两份指标
+        baseline, _ = best_time(
+            lambda: TechnicalIndicators.add_all_indicators(df, backend='pandas').shape, args.repeat)
+        optimized, _ = best_time(
+            lambda: TechnicalIndicators.add_all_indicators(df, backend='numpy').shape, args.repeat)
+        print(f"{rows:>12,}{baseline * 1000:>10.1f}ms{optimized * 1000:>10.1f}ms"
+              f"{baseline / optimized:>8.1f}x")
+        rows *= 10
+
+
+def bench_panel(args):
+    """多交易对：逐个交易对计算 vs (时间 × 交易对) 面板一次计算"""
+    Config.INDICATOR_CACHE_ENABLED = False
+    # 交易对的上市时间错开，面板前段为NaN填充
+    frames = {f"SYM{i:03d}": synthetic_ohlcv(args.rows, seed=i).iloc[i * args.rows // (4 * args.symbols):]
+              for i in range(args.symbols)}
+    panel = build_panel(frames)
+
+    for backend in ('pandas', 'numpy'):
+        baseline, expected = best_time(
+            lambda: {symbol: TechnicalIndicators.add_all_indicators(df, backend=backend)
+                     for symbol, df in frames.items()}, args.repeat)
+        optimized, result = best_time(
+            lambda: TechnicalIndicators.add_all_indicators(panel, backend=backend), args.repeat)
+
+        for symbol, df in expected.items():
+            got = result.xs(symbol, axis=1, level='symbol').loc[df.index, df.columns]
+            pd.testing.assert_frame_equal(got, df, check_freq=False, check_names=False,
+                                          rtol=1e-9, atol=1e-7 * df['close'].abs().max())
+        print_comparison(f"全部指标，{args.symbols} 个交易对，{backend}后端", args.rows, baseline, optimized)
+
+
+def bench_parallel(args):
+    """全部指标：串行 vs 各指标组并行，数据量从 10^6（--rows 更小时为 --rows）到 --rows"""
+    Config.INDICATOR_CACHE_ENABLED = False
+    print(f"CPU核数: {os.cpu_count()}, 线程数: {args.threads}")
+    print(f"{'K线数':>12}{'后端':>8}{'串行':>12}{'并行':>12}{'加速比':>9}")
+    first = rows = min(1_000_000, args.rows)
+    while rows <= args.rows:
+        df = synthetic_ohlcv(rows)
+        for backend in ('pandas', 'numpy'):
+            def run(threads):
+                return TechnicalIndicators.add_indicators(df, ALL_INDICATOR_COLUMNS, backend, threads=threads)
+
+            if rows == first:
+                pd.testing.assert_frame_equal(run(args.threads), run(1))
+            # 只计时不保留结果，避免大数据量下同时持有两份指标
+            baseline, _ = best_time(lambda: run(1).shape, args.repeat)
+            optimized, _ = best_time(lambda: run(args.threads).shape, args.repeat)
+            print(f"{rows:>12,}{backend:>8}{baseline * 1000:>10.1f}ms{optimized * 1000:>10.1f}ms"
+                  f"{baseline / optimized:>8.1f}x")
+        rows *= 10
+
+
+def legacy_generate_signals(data, strategy):
+    """原有流程：整表复制后逐列插入指标，策略方法再整表复制一次"""
+    df = data.copy()
+    for column in strategy.required_indicators():
+        df[column] = TechnicalIndicators.add_indicators(data, [column])[column]
+    return strategy.apply_strategy(df.copy())
+
+
+def bench_memory(args):
+    """信号生成峰值内存：整表复制+逐列插入 vs 一次拼接+只新增信号列"""
+    Config.INDICATOR_CACHE_ENABLED = False
+    df = synthetic_ohlcv(args.rows)
+    print(f"输入数据: {format_bytes(int(df.memory_usage().sum()))} ({args.rows:,} 条K线)")
+    print(f"{'策略':>14}{'原实现':>12}{'新实现':>12}{'降低':>8}")
+    for name in ['ma_crossover', 'combined']:
+        strategy = TradingStrategy(name)
+        with track_peak_memory() as legacy:
+            expected = legacy_generate_signals(df, strategy)
+        del expected
+        with track_peak_memory() as optimized:
+            result = strategy.generate_signals(df)
+        del result
+        print(f"{name:>14}{format_bytes(legacy['peak_bytes']):>12}{format_bytes(optimized['peak_bytes']):>12}"
+              f"{1 - optimized['peak_bytes'] / legacy['peak_bytes']:>8.0%}")
+
+
+def legacy_run_signals(backtester, df):
+    """原有的逐行回测：iterrows 遍历，每根K线追加一条组合价值记录"""
+    capital = backtester.initial_capital
+    position = 0
+    portfolio_value = []
+    trades = []
+    for timestamp, row in df.iterrows():
+        current_price = float(row['close'])
+        signal = row['signal']
+        portfolio_value.append({'timestamp': timestamp, 'value': capital + position * current_price,
+                                'capital': capital, 'position': position, 'price': current_price})
+        if signal == 'BUY' and position == 0:
+            position = capital / current_price * (1 - backtester.commission)
+            capital = 0
+            trades.append({'timestamp': timestamp, 'type': 'BUY', 'price': current_price,
+                           'quantity': position, 'value': position * current_price})
+        elif signal == 'SELL' and position > 0:
+            capital = position * current_price * (1 - backtester.commission)
+            trades.append({'timestamp': timestamp, 'type': 'SELL', 'price': current_price,
+                           'quantity': position, 'value': capital})
+            position = 0
+    if position > 0:
+        final_price = float(df['close'].iloc[-1])
+        capital = position * final_price * (1 - backtester.commission)
+        trades.append({'timestamp': df.index[-1], 'type': 'SELL', 'price': final_price,
+                       'quantity': position, 'value': capital})
+    return backtester._calculate_metrics(df, pd.DataFrame(portfolio_value), trades)
+
+
+def bench_backtest(args):
+    """按信号回测：iterrows 逐行循环 vs 数组化持仓状态与组合价值"""
+    Config.INDICATOR_CACHE_ENABLED = False
+    backtester = Backtester()
+    for name in ['ma_crossover', 'rsi']:
+        df = TradingStrategy(name).generate_signals(synthetic_ohlcv(args.rows))
+        baseline, expected = best_time(lambda: legacy_run_signals(backtester, df), args.repeat)
+        optimized, result = best_time(lambda: backtester.run_signals(df, log_trades=False), args.repeat)
+
+        pd.testing.assert_frame_equal(result['portfolio_value'], expected['portfolio_value'])
+        assert result['trades'] == expected['trades']
+        for key in Backtester.SUMMARY_METRICS:
+            assert result[key] == expected[key], key
+        print_comparison(f"{name} 回测（{result['num_trades']} 笔交易）", args.rows, baseline, optimized)
+
+
+def bench_simulate(args):
+    """止损止盈回测：纯Python模拟循环 vs numba编译（未安装numba时只测纯Python）"""
+    Config.INDICATOR_CACHE_ENABLED = False
+    df = TradingStrategy('ma_crossover').generate_signals(synthetic_ohlcv(args.rows))
+    backtester = Backtester(position_size=Config.MAX_POSITION_SIZE, stop_loss=Config.STOP_LOSS_PCT,
+                            take_profit=Config.TAKE_PROFIT_PCT)
+
+    def run(jit):
+        Config.SIMULATOR_JIT = jit
+        return backtester.run_signals(df, log_trades=False)
+
+    baseline, expected = best_time(lambda: run(False), args.repeat)
+    if not simulator.jit_available():
+        print(f"止损止盈回测 ({args.rows:,} 条K线, {expected['num_trades']} 笔交易)")
+        print(f"  纯Python: {baseline * 1000:10.1f} ms（未安装numba）")
+        return
+    run(True)  # 首次调用包含编译时间
+    optimized, result = best_time(lambda: run(True), args.repeat)
+    pd.testing.assert_frame_equal(result['portfolio_value'], expected['portfolio_value'])
+    assert result['trades'] == expected['trades']
+    print_comparison(f"止损止盈回测（{result['num_trades']} 笔交易），纯Python vs numba", args.rows,
+                     baseline, optimized)
+
+
+def bench_matrix(args):
+    """MA交叉参数网格回测：逐组参数 run_signals vs 信号矩阵所有组合同时计算"""
+    Config.INDICATOR_CACHE_ENABLED = False
+    df = synthetic_ohlcv(args.rows)
+    backtester = Backtester()
+    codes, variants = TradingStrategy().ma_crossover_signal_matrix(df, range(2, 62, 2), range(10, 310, 5))
+    sample = 50  # 逐组回测只计时前50组，按组数折算
+
+    def per_variant():
+        return pd.DataFrame([
+            {**variant, **{key: value for key, value in backtester.run_signals(
+                df[['close']].assign(signal=signal_labels(codes[:, j])), log_trades=False).items()
+                if key in Backtester.SUMMARY_METRICS}}
+            for j, variant in enumerate(variants[:sample])])
+
+    baseline, expected = best_time(per_variant, args.repeat)
+    optimized, result = best_time(lambda: backtester.run_signal_matrix(df, codes, variants), args.repeat)
+
+    keys = ['short_period', 'long_period']
+    got = result.set_index(keys).loc[expected.set_index(keys).index, Backtester.SUMMARY_METRICS]
+    pd.testing.assert_frame_equal(got, expected.set_index(keys)[Backtester.SUMMARY_METRICS], check_dtype=False)
+    print_comparison(f"{len(variants)} 组参数网格回测（逐组耗时按前{sample}组折算）", args.rows,
+                     baseline * len(variants) / sample, optimized)
+
+
+BENCHMARKS = {
+    'parse': bench_parse,
+    'streaming': bench_streaming,
+    'kernels': bench_kernels,
+    'panel': bench_panel,
+    'parallel': bench_parallel,
+    'memory': bench_memory,
+    'backtest': bench_backtest,
+    'simulate': bench_simulate,
+    'matrix': bench_matrix,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='性能基准测试')
+    parser.add_argument('name', choices=sorted(BENCHMARKS), help='基准名称')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='数据条数')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数（取最快）')
+    parser.add_argument('--symbols', type=int, default=200, help='交易对数量（panel）')
+    parser.add_argument('--threads', type=int, default=max(2, os.cpu_count() or 1),
+                        help='并行线程数（parallel）')
+    args = parser.parse_args()
+
+    BENCHMARKS[args.name](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+紧凑数据类型模块 - 用float32保存OHLCV和技术指标，减少内存占用
+
+精度说明:
+- float32 有24位有效二进制位，约7位有效十进制数字，单次舍入的相对误差不超过
+  2^-24 ≈ 6e-8。价格 100,000 的最小可分辨步长约为 0.008，价格 1.0 约为 6e-8，
+  对K线级别的回测足够，但不适合需要精确到最小报价单位的撮合或对账。
+- 指标仍以float64计算，只在写入结果时转换为float32，误差不会在滚动窗口中累积。
+  OBV这类累加量也先用float64累加再转换。
+- 回测中的资金、持仓数量和组合价值始终是float64。
+- 时间索引保持 datetime64（内部就是8字节int64），紧凑模式下不变。
+"""
+
+import tracemalloc
+from contextlib import contextmanager
+import numpy as np
+
+COMPACT_FLOAT = np.float32
+
+
+def to_compact(df, columns=None):
+    """
+    把浮点列转换为float32
+
+    Args:
+        df: DataFrame
+        columns: 要转换的列，默认所有float64列
+
+    Returns:
+        DataFrame: 转换后的数据（新对象）
+    """
+    if columns is None:
+        columns = [col for col in df.columns if df[col].dtype == np.float64]
+    return df.astype({col: COMPACT_FLOAT for col in columns})
+
+
+def is_compact(df, column='close'):
+    """数据是否为紧凑模式（以收盘价列的类型判断，面板要求所有交易对的收盘价都为float32）"""
+    return column in df.columns and bool(np.all(df[column].dtypes == COMPACT_FLOAT))
+
+
+def memory_report(df):
+    """
+    统计DataFrame的内存占用
+
+    Args:
+        df: DataFrame
+
+    Returns:
+        dict: {rows, index_bytes, columns: {列名: 字节数}, total_bytes, bytes_per_row}
+    """
+    usage = df.memory_usage(index=True, deep=True)
+    columns = {col: int(usage[col]) for col in df.columns}
+    total = int(usage.sum())
+    return {
+        'rows': len(df),
+        'index_bytes': int(usage['Index']),
+        'columns': columns,
+        'total_bytes': total,
+        'bytes_per_row': total / len(df) if len(df) else 0.0
+    }
+
+
+@contextmanager
+def track_peak_memory():
+    """
+    统计代码块内新分配内存的峰值（tracemalloc，包含NumPy数组）
+
+    tracemalloc 会明显拖慢大量小对象分配的代码（如逐行循环），只在需要时开启。
+
+    Yields:
+        dict: 代码块结束后填入 {peak_bytes, current_bytes}
+    """
+    stats = {}
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        yield stats
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        stats['peak_bytes'] = peak - baseline
+        stats['current_bytes'] = current - baseline
+        if started:
+            tracemalloc.stop()
+
+
+def format_bytes(num_bytes):
+    """字节数格式化为可读字符串"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(num_bytes) < 1024 or unit == 'GB':
+            return f"{num_bytes:.1f}{unit}" if unit != 'B' else f"{num_bytes}B"
+        num_bytes /= 1024
+
+
+def format_memory_report(report):
+    """
+    内存报告格式化为多行文本
+
+    Args:
+        report: memory_report 的返回值
+
+    Returns:
+        str: 报告文本
+    """
+    lines = [f"行数: {report['rows']:,}  总内存: {format_bytes(report['total_bytes'])}  "
+             f"每行: {report['bytes_per_row']:.1f}B"]
+    lines.append(f"  {'index':<16}{format_bytes(report['index_bytes']):>10}")
+    for col, size in report['columns'].items():
+        lines.append(f"  {col:<16}{format_bytes(size):>10}")
+    return '\n'.join(lines)
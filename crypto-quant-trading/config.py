@@ -15,10 +15,60 @@ class Config:
     # 回测配置
     INITIAL_CAPITAL = 10000  # 初始资金（美元）
     COMMISSION = 0.001  # 手续费率 (0.1%)
+    MATRIX_BACKTEST_CHUNK_BYTES = 256 * 1024 * 1024  # 参数网格同时回测时每块的内存预算
+    SWEEP_WORKERS = None  # 参数扫描的进程数（None为CPU核数）
+    SWEEP_OUTPUT_DIR = 'data/sweeps'  # 参数扫描结果CSV目录（同一文件重新运行时断点续跑）
+    WALK_FORWARD_TRAIN = '180D'  # 滚动优化的训练窗口长度（时间长度如 '180D'，或整数K线根数）
+    WALK_FORWARD_TEST = '30D'  # 滚动优化的测试窗口长度（每次向前滚动一个测试窗口）
+    SIMULATOR_JIT = True  # 止损止盈等路径相关回测在安装了numba时JIT编译（见 simulator.py）
     
     # 数据配置
     DEFAULT_INTERVAL = '1d'  # K线间隔
     DEFAULT_LIMIT = 100  # 默认获取数据条数
+    COMPACT_DTYPES = False  # 紧凑模式：价格、成交量和指标使用float32（精度说明见 compact_dtypes.py）
+    TRACK_PEAK_MEMORY = False  # 回测时用tracemalloc统计峰值内存（会拖慢逐行循环）
+    
+    # 本地K线缓存
+    KLINE_STORE_ENABLED = True  # 是否启用本地K线缓存
+    KLINE_STORE_DIR = 'data/klines'  # 缓存目录（按 交易对/间隔/月份 分区）
+    RESAMPLE_FROM_BASE = True  # 缓存中已有基础间隔数据时，本地重采样生成更粗的间隔
+    RESAMPLE_BASE_INTERVAL = '1m'  # 重采样的基础K线间隔
+    
+    # 指标计算
+    INDICATOR_BACKEND = 'pandas'  # 'pandas' 或 'numpy'（纯NumPy滚动内核，见 numpy_kernels.py）
+    EMA_WARMUP_SPANS = 3  # EMA类指标的预热长度为跨度的倍数（3倍后初始值权重约 e^-6）
+    INDICATOR_THREADS = None  # 并行计算指标组的线程数（None为CPU核数，1为串行）
+    INDICATOR_PARALLEL_MIN_ROWS = 500000  # 数据量（行数×列数）低于该值时串行计算
+    
+    # 指标缓存
+    INDICATOR_CACHE_ENABLED = True  # 按数据指纹和参数缓存指标结果
+    INDICATOR_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 内存层字节预算（LRU淘汰）
+    INDICATOR_CACHE_DIR = None  # 磁盘层目录，如 'data/indicators'（None为只用内存）
+    
+    # API限流与并发下载
+    API_WEIGHT_LIMIT = 6000  # 每分钟请求权重上限
+    API_WEIGHT_SAFETY = 0.9  # 只使用权重上限的这一比例
+    KLINES_REQUEST_WEIGHT = 2  # 单次K线请求的权重
+    TICKER_REQUEST_WEIGHT = 2  # 单个交易对ticker请求的权重
+    KLINES_PAGE_LIMIT = 1000  # 单次K线请求的最大条数
+    DOWNLOAD_WORKERS = 8  # 并发下载线程数
+    HISTORY_CHUNK_SIZE = 100000  # 分块获取历史数据时每块的K线数量
+    IMPORT_WORKERS = None  # 归档导入的解析进程数（None为CPU核数）
+    
+    # HTTP连接池与重试
+    HTTP_POOL_SIZE = 10  # 连接池大小（不小于并发下载线程数）
+    HTTP_MAX_RETRIES = 5  # 429/5xx/网络异常的最大重试次数
+    HTTP_BACKOFF_BASE = 0.5  # 指数退避基础等待时间（秒）
+    HTTP_BACKOFF_MAX = 30  # 单次退避最长等待时间（秒）
+    HTTP_RETRY_AFTER_MAX = 120  # 服务器 Retry-After 超过该值（如418封禁）时不再等待，直接报错
+    HTTP_TIMEOUT = 10  # 请求超时（秒）
+    ASYNC_MAX_CONCURRENCY = 20  # 异步获取器同时进行的最大请求数
+    
+    # WebSocket行情流
+    WS_BASE_URL = 'wss://stream.binance.com:9443'
+    STREAM_BUFFER_SIZE = 500  # 每个交易对保留的K线数量
+    WS_RECONNECT_BASE = 1  # 重连退避基础等待时间（秒）
+    WS_RECONNECT_MAX = 60  # 重连最长等待时间（秒）
     
     # 策略配置
     MA_SHORT_PERIOD = 7
@@ -50,6 +100,7 @@ class Config:
     MAX_POSITION_SIZE = 1.0  # 最大仓位比例
     STOP_LOSS_PCT = 0.05  # 止损比例 (5%)
     TAKE_PROFIT_PCT = 0.15  # 止盈比例 (15%)
+    FILL_PRICE = 'close'  # 信号成交价：'close' 当根收盘价，'next_open' 下一根开盘价
     
     @classmethod
     def get_config(cls):
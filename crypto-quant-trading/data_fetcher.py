@@ -2,11 +2,16 @@
 数据获取模块 - 从加密货币交易所获取数据
 """
 
-import requests
 import pandas as pd
-from datetime import datetime, timedelta
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from kline_store import KlineStore, interval_to_ms
+from rate_limiter import WeightRateLimiter
+from http_transport import HttpTransport
+from kline_parser import parse_klines, klines_to_frame
+from resampler import resample_ohlcv
+from compact_dtypes import to_compact
 
 logger = logging.getLogger(__name__)
 
@@ -14,92 +19,327 @@ logger = logging.getLogger(__name__)
 class CryptoDataFetcher:
     """加密货币数据获取器"""
     
-    def __init__(self, exchange='binance'):
+    def __init__(self, exchange='binance', use_cache=None, base_url=None, compact=None):
         """
         初始化数据获取器
         
         Args:
             exchange: 交易所名称，默认为binance
+            use_cache: 是否使用本地K线缓存，默认取 Config.KLINE_STORE_ENABLED
+            base_url: API地址，默认取 Config.BASE_URL（测试时可指向本地服务）
+            compact: 是否返回float32的紧凑数据，默认取 Config.COMPACT_DTYPES
         """
         self.exchange = exchange
-        self.base_url = 'https://api.binance.com/api/v3'
+        self.base_url = base_url or Config.BASE_URL
+        self.compact = Config.COMPACT_DTYPES if compact is None else compact
         
-    def get_historical_data(self, symbol, start_date, end_date, interval='1d'):
+        if use_cache is None:
+            use_cache = Config.KLINE_STORE_ENABLED
+        self.store = KlineStore(Config.KLINE_STORE_DIR) if use_cache else None
+        self.last_fetch_stats = {'cache_bars': 0, 'network_bars': 0}
+        
+        self.rate_limiter = WeightRateLimiter(Config.API_WEIGHT_LIMIT,
+                                              safety_ratio=Config.API_WEIGHT_SAFETY)
+        self.max_workers = Config.DOWNLOAD_WORKERS
+        
+        # 所有请求共用一个连接池，复用长连接
+        self.transport = HttpTransport(
+            pool_size=Config.HTTP_POOL_SIZE,
+            max_retries=Config.HTTP_MAX_RETRIES,
+            backoff_base=Config.HTTP_BACKOFF_BASE,
+            backoff_max=Config.HTTP_BACKOFF_MAX,
+            timeout=Config.HTTP_TIMEOUT,
+            rate_limiter=self.rate_limiter,
+            retry_after_max=Config.HTTP_RETRY_AFTER_MAX
+        )
+    
+    def _get(self, endpoint, params, weight=1):
+        """
+        通过共享传输层请求API端点
+        
+        Args:
+            endpoint: 端点路径 (例如: klines, ticker/price)
+            params: 查询参数
+            weight: 请求权重
+        
+        Returns:
+            Response: 成功的响应
+        
+        Raises:
+            ApiRequestError: 请求失败
+        """
+        return self.transport.get(f"{self.base_url}/{endpoint}", params=params,
+                                  weight=weight, endpoint=endpoint)
+    
+    def get_request_stats(self):
+        """获取各端点的请求次数、重试次数和延迟统计"""
+        return self.transport.get_stats()
+        
+    def get_historical_data(self, symbol, start_date, end_date, interval='1d', warmup=0):
         """
         获取历史K线数据
         
+        优先读取本地K线缓存，只从交易所请求缺失的头部、尾部和中间缺口。
+        本次缓存命中和网络获取的K线数量记录在 last_fetch_stats 中。
+        
         Args:
             symbol: 交易对符号 (例如: BTCUSDT)
             start_date: 开始日期 (YYYY-MM-DD)
             end_date: 结束日期 (YYYY-MM-DD)
             interval: K线间隔 (1m, 5m, 15m, 1h, 4h, 1d等)
+            warmup: 开始日期之前额外获取的K线数（指标预热，见 TradingStrategy.lookback），
+                    结果从 start_date 之前 warmup 根K线开始
         
         Returns:
             DataFrame: 包含OHLCV数据
         """
         try:
-            # 转换日期为时间戳
-            start_ts = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp() * 1000)
-            end_ts = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp() * 1000)
-            
-            all_data = []
-            current_ts = start_ts
+            start_ts, end_ts = self._date_range_to_ts(start_date, end_date)
+            start_ts = self._warmup_start_ts(start_ts, interval, warmup)
             
             logger.info(f"开始获取 {symbol} 的历史数据...")
             
-            while current_ts < end_ts:
-                url = f"{self.base_url}/klines"
-                params = {
-                    'symbol': symbol,
-                    'interval': interval,
-                    'startTime': current_ts,
-                    'endTime': end_ts,
-                    'limit': 1000
-                }
-                
-                response = requests.get(url, params=params)
-                
-                if response.status_code != 200:
-                    logger.error(f"API请求失败: {response.status_code}")
-                    break
-                
-                data = response.json()
-                
-                if not data:
-                    break
-                
-                all_data.extend(data)
-                current_ts = data[-1][0] + 1
-                
-                # 避免API限流
-                time.sleep(0.5)
+            df, cache_bars, network_bars = self._load_range(symbol, interval, start_ts, end_ts)
+            self.last_fetch_stats = {'cache_bars': cache_bars, 'network_bars': network_bars}
             
-            if not all_data:
+            if df.empty:
                 logger.warning("未获取到任何数据")
                 return None
             
-            # 转换为DataFrame
-            df = pd.DataFrame(all_data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-                'taker_buy_quote', 'ignore'
-            ])
-            
-            # 数据类型转换
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = df[col].astype(float)
-            
-            df.set_index('timestamp', inplace=True)
-            df = df[['open', 'high', 'low', 'close', 'volume']]
-            
-            logger.info(f"成功获取 {len(df)} 条历史数据")
-            return df
+            logger.info(f"成功获取 {len(df)} 条历史数据 (缓存: {cache_bars}, 网络: {network_bars})")
+            return to_compact(df) if self.compact else df
             
         except Exception as e:
             logger.error(f"获取历史数据时出错: {str(e)}")
             return None
     
+    def iter_historical_data(self, symbol, start_date, end_date, interval='1d', chunk_size=None):
+        """
+        分块获取历史K线数据（生成器）
+        
+        按时间顺序逐块返回，每块最多 chunk_size 根K线。获取当前块的同时预取下一块，
+        内存中最多同时存在两块数据，与日期范围长短无关。与 get_historical_data
+        一样优先读取本地缓存，并把新下载的K线写入缓存。
+        
+        Args:
+            symbol: 交易对符号
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            interval: K线间隔
+            chunk_size: 每块的K线数量，默认取 Config.HISTORY_CHUNK_SIZE
+        
+        Yields:
+            DataFrame: 以时间戳为索引的OHLCV数据块
+        
+        Raises:
+            ApiRequestError: 请求失败（已返回的块仍然有效）
+        """
+        chunk_size = chunk_size or Config.HISTORY_CHUNK_SIZE
+        start_ts, end_ts = self._date_range_to_ts(start_date, end_date)
+        
+        interval_ms = interval_to_ms(interval)
+        if interval_ms is None:
+            chunks = [(start_ts, end_ts)]
+        else:
+            span = chunk_size * interval_ms
+            first = -(-start_ts // interval_ms) * interval_ms
+            chunks = [(s, min(s + span - 1, end_ts)) for s in range(first, end_ts + 1, span)]
+        
+        self.last_fetch_stats = {'cache_bars': 0, 'network_bars': 0}
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            pending = None
+            for i in range(len(chunks)):
+                if pending is None:
+                    pending = prefetcher.submit(self._load_range, symbol, interval, *chunks[i])
+                df, cache_bars, network_bars = pending.result()
+                pending = None
+                if i + 1 < len(chunks):
+                    pending = prefetcher.submit(self._load_range, symbol, interval, *chunks[i + 1])
+                
+                self.last_fetch_stats['cache_bars'] += cache_bars
+                self.last_fetch_stats['network_bars'] += network_bars
+                if not df.empty:
+                    yield to_compact(df) if self.compact else df
+    
+    @staticmethod
+    def _date_range_to_ts(start_date, end_date):
+        """日期 (YYYY-MM-DD) 按UTC转换为毫秒时间戳（与K线索引和回测开始时间使用同一时钟）"""
+        start_ts = pd.Timestamp(start_date, tz='UTC').value // 10**6
+        end_ts = pd.Timestamp(end_date, tz='UTC').value // 10**6
+        return start_ts, end_ts
+    
+    @staticmethod
+    def _warmup_start_ts(start_ts, interval, warmup):
+        """开始时间向前推 warmup 根K线（不支持的间隔不预热）"""
+        if not warmup:
+            return start_ts
+        interval_ms = interval_to_ms(interval)
+        if interval_ms is None:
+            logger.warning(f"K线间隔 {interval} 不支持按根数预热，从开始日期获取")
+            return start_ts
+        # 与交易所分桶对齐后再向前推，预热K线数恰好为 warmup
+        return (-(-start_ts // interval_ms) - warmup) * interval_ms
+    
+    def _load_range(self, symbol, interval, start_ts, end_ts):
+        """
+        获取 [start_ts, end_ts] 的K线：先读缓存，再下载缺失部分并写回缓存
+        
+        Args:
+            symbol: 交易对符号
+            interval: K线间隔
+            start_ts: 开始时间戳（毫秒）
+            end_ts: 结束时间戳（毫秒，包含）
+        
+        Returns:
+            tuple: (DataFrame, 缓存K线数, 网络K线数)
+        """
+        if self.store is None or not self.store.supports(interval):
+            df = klines_to_frame(self._fetch_klines(symbol, interval, [(start_ts, end_ts)]))
+            return df, 0, len(df)
+        
+        cached = self.store.read(symbol, interval, start_ts, end_ts)
+        missing = self.store.missing_ranges(cached.index, interval, start_ts, end_ts,
+                                            self.store.read_empty(symbol, interval))
+        if not missing:
+            return cached, len(cached), 0
+        
+        # 本地已有基础间隔（1m）数据的部分直接重采样，不再请求交易所
+        resampled, missing = self._resample_from_store(symbol, interval, missing)
+        fetched = klines_to_frame(self._fetch_klines(symbol, interval, missing))
+        self.store.write(symbol, interval, pd.concat([resampled, fetched]))
+        # 交易所没有返回K线的时间段（上市之前、停机缺口）记录下来，之后不再重复请求
+        self.store.mark_empty(symbol, interval, missing, fetched.index)
+        
+        df = pd.concat([cached, resampled, fetched])
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        return df, len(cached) + len(resampled), len(fetched)
+    
+    def _resample_from_store(self, symbol, interval, ranges):
+        """
+        用缓存中的基础间隔K线合成目标间隔K线
+        
+        只有基础间隔数据完整覆盖的区间才在本地合成，其余区间原样返回。
+        
+        Args:
+            symbol: 交易对符号
+            interval: 目标K线间隔
+            ranges: 缺失的目标间隔K线区间 [(开始, 结束), ...]
+        
+        Returns:
+            tuple: (合成的DataFrame, 仍需从交易所获取的区间列表)
+        """
+        base = Config.RESAMPLE_BASE_INTERVAL
+        empty = klines_to_frame([])
+        if not Config.RESAMPLE_FROM_BASE or interval == base:
+            return empty, ranges
+        
+        interval_ms = interval_to_ms(interval)
+        frames = []
+        remaining = []
+        for range_start, range_end in ranges:
+            base_end = range_end + interval_ms - 1
+            base_df = self.store.read(symbol, base, range_start, base_end)
+            if base_df.empty or self.store.missing_ranges(base_df.index, base, range_start, base_end):
+                remaining.append((range_start, range_end))
+                continue
+            frames.append(resample_ohlcv(base_df, interval, base))
+        
+        if not frames:
+            return empty, remaining
+        return pd.concat(frames), remaining
+    
+    def _fetch_klines(self, symbol, interval, ranges):
+        """
+        并发下载若干时间段的原始K线
+        
+        每个时间段按单页容量切分为互不重叠的时间窗口，由线程池并发请求，
+        请求速率由权重令牌桶控制。
+        
+        Args:
+            symbol: 交易对符号
+            interval: K线间隔
+            ranges: [(开始时间戳, 结束时间戳), ...]，毫秒，包含端点
+        
+        Returns:
+            list: 各页解析后的K线数组，见 kline_parser.parse_klines
+        """
+        windows = self._split_windows(interval, ranges)
+        if not windows:
+            return []
+        
+        workers = max(1, min(self.max_workers, len(windows)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            window_pages = list(pool.map(lambda w: self._fetch_window(symbol, interval, *w), windows))
+        
+        return [page for pages in window_pages for page in pages]
+    
+    @staticmethod
+    def _split_windows(interval, ranges):
+        """
+        把时间段切分为恰好容纳一页K线的时间窗口
+        
+        Args:
+            interval: K线间隔
+            ranges: [(开始时间戳, 结束时间戳), ...]，毫秒，包含端点
+        
+        Returns:
+            list: [(窗口开始, 窗口结束), ...]
+        """
+        interval_ms = interval_to_ms(interval)
+        windows = []
+        for start_ts, end_ts in ranges:
+            if interval_ms is None:
+                # 非固定长度的间隔（如 1M）无法预先切分，整段顺序分页
+                windows.append((start_ts, end_ts))
+                continue
+            span = Config.KLINES_PAGE_LIMIT * interval_ms
+            start_ts = -(-start_ts // interval_ms) * interval_ms
+            for window_start in range(start_ts, end_ts + 1, span):
+                windows.append((window_start, min(window_start + span - 1, end_ts)))
+        return windows
+    
+    def _fetch_window(self, symbol, interval, start_ts, end_ts):
+        """
+        分页获取单个时间窗口 [start_ts, end_ts] 的原始K线
+        
+        Args:
+            symbol: 交易对符号
+            interval: K线间隔
+            start_ts: 开始时间戳（毫秒）
+            end_ts: 结束时间戳（毫秒）
+        
+        Returns:
+            list: 各页解析后的K线数组
+        """
+        pages = []
+        current_ts = start_ts
+        step = interval_to_ms(interval) or 1
+        
+        while current_ts <= end_ts:
+            params = {
+                'symbol': symbol,
+                'interval': interval,
+                'startTime': current_ts,
+                'endTime': end_ts,
+                'limit': Config.KLINES_PAGE_LIMIT
+            }
+            
+            # 请求失败时抛出 ApiRequestError，避免静默截断历史数据
+            response = self._get('klines', params, weight=Config.KLINES_REQUEST_WEIGHT)
+            page = parse_klines(response.content)
+            
+            if not len(page):
+                break
+            
+            pages.append(page)
+            current_ts = int(page[-1, 0]) + step
+            
+            # 不足一页说明窗口内已无更多数据
+            if len(page) < Config.KLINES_PAGE_LIMIT:
+                break
+        
+        return pages
+    
     def get_realtime_data(self, symbol, limit=100, interval='1h'):
         """
         获取实时数据
@@ -113,33 +353,16 @@ class CryptoDataFetcher:
             DataFrame: 最新的K线数据
         """
         try:
-            url = f"{self.base_url}/klines"
             params = {
                 'symbol': symbol,
                 'interval': interval,
                 'limit': limit
             }
             
-            response = requests.get(url, params=params)
-            
-            if response.status_code != 200:
-                logger.error(f"API请求失败: {response.status_code}")
-                return None
-            
-            data = response.json()
-            
-            df = pd.DataFrame(data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-                'taker_buy_quote', 'ignore'
-            ])
-            
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = df[col].astype(float)
-            
-            df.set_index('timestamp', inplace=True)
-            df = df[['open', 'high', 'low', 'close', 'volume']]
+            response = self._get('klines', params, weight=Config.KLINES_REQUEST_WEIGHT)
+            df = klines_to_frame([parse_klines(response.content)])
+            if self.compact:
+                df = to_compact(df)
             
             return df
             
@@ -159,33 +382,30 @@ class CryptoDataFetcher:
         """
         try:
             # 获取24小时ticker
-            url = f"{self.base_url}/ticker/24hr"
             params = {'symbol': symbol}
             
-            response = requests.get(url, params=params)
-            
-            if response.status_code != 200:
-                logger.error(f"API请求失败: {response.status_code}")
-                return None
-            
+            response = self._get('ticker/24hr', params, weight=Config.TICKER_REQUEST_WEIGHT)
             data = response.json()
             
-            info = {
-                '交易对': symbol,
-                '当前价格': f"${float(data['lastPrice']):.2f}",
-                '24h涨跌幅': f"{float(data['priceChangePercent']):.2f}%",
-                '24h最高价': f"${float(data['highPrice']):.2f}",
-                '24h最低价': f"${float(data['lowPrice']):.2f}",
-                '24h成交量': f"{float(data['volume']):.2f}",
-                '24h成交额': f"${float(data['quoteVolume']):.2f}"
-            }
-            
-            return info
+            return self._ticker_to_info(symbol, data)
             
         except Exception as e:
             logger.error(f"获取市场信息时出错: {str(e)}")
             return None
     
+    @staticmethod
+    def _ticker_to_info(symbol, data):
+        """24小时ticker转换为市场信息字典"""
+        return {
+            '交易对': symbol,
+            '当前价格': f"${float(data['lastPrice']):.2f}",
+            '24h涨跌幅': f"{float(data['priceChangePercent']):.2f}%",
+            '24h最高价': f"${float(data['highPrice']):.2f}",
+            '24h最低价': f"${float(data['lowPrice']):.2f}",
+            '24h成交量': f"{float(data['volume']):.2f}",
+            '24h成交额': f"${float(data['quoteVolume']):.2f}"
+        }
+    
     def get_current_price(self, symbol):
         """
         获取当前价格
@@ -197,17 +417,12 @@ class CryptoDataFetcher:
             float: 当前价格
         """
         try:
-            url = f"{self.base_url}/ticker/price"
             params = {'symbol': symbol}
             
-            response = requests.get(url, params=params)
+            response = self._get('ticker/price', params, weight=Config.TICKER_REQUEST_WEIGHT)
+            data = response.json()
+            return float(data['price'])
             
-            if response.status_code == 200:
-                data = response.json()
-                return float(data['price'])
-            else:
-                return None
-                
         except Exception as e:
             logger.error(f"获取当前价格时出错: {str(e)}")
             return None
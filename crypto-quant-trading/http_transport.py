@@ -0,0 +1,180 @@
+"""
+HTTP传输模块 - 连接池、重试退避与请求统计
+"""
+
+import math
+import time
+import random
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt, headers=None, backoff_base=0.5, backoff_max=30, retry_after_max=120):
+    """
+    计算重试等待时间：优先使用 Retry-After，否则指数退避加随机抖动
+
+    Args:
+        attempt: 已失败的次数（从0开始）
+        headers: 失败响应的响应头，网络异常时为None
+        backoff_base: 指数退避的基础等待时间（秒）
+        backoff_max: 单次退避的最长等待时间（秒）
+        retry_after_max: Retry-After 允许的最长等待（秒）
+
+    Returns:
+        float: 等待秒数
+
+    Raises:
+        ApiRequestError: 服务器要求的等待超过 retry_after_max（如418封禁），不占用线程长时间等待
+    """
+    if headers is not None:
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                delay = math.nan
+            if delay > retry_after_max:
+                raise ApiRequestError(f"服务器要求 {delay:.0f} 秒后重试，超过上限 {retry_after_max} 秒")
+            if math.isfinite(delay):
+                return max(0.0, delay)
+
+    cap = min(backoff_max, backoff_base * (2 ** attempt))
+    return cap / 2 + random.uniform(0, cap / 2)
+
+
+class ApiRequestError(Exception):
+    """API请求最终失败（不可重试的状态码或重试次数耗尽）"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class HttpTransport:
+    """带连接池和重试的HTTP传输层（线程安全）"""
+
+    # 可重试的状态码：418/429 为限流，5xx 为服务端错误
+    RETRY_STATUS = {418, 429, 500, 502, 503, 504}
+
+    def __init__(self, pool_size=10, max_retries=5, backoff_base=0.5, backoff_max=30,
+                 timeout=10, rate_limiter=None, retry_after_max=120):
+        """
+        初始化传输层
+
+        Args:
+            pool_size: 每个主机保持的长连接数
+            max_retries: 最大重试次数
+            backoff_base: 指数退避的基础等待时间（秒）
+            backoff_max: 单次退避的最长等待时间（秒）
+            timeout: 请求超时（秒）
+            rate_limiter: 可选的 WeightRateLimiter，请求前获取权重
+            retry_after_max: Retry-After 允许的最长等待（秒），超过时不再重试
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, weight=1, endpoint=None):
+        """
+        发送GET请求，对限流、服务端错误和网络异常自动重试
+
+        Args:
+            url: 请求地址
+            params: 查询参数
+            weight: 请求权重（用于限流）
+            endpoint: 统计用的端点名称，默认使用url
+
+        Returns:
+            Response: 状态码为200的响应
+
+        Raises:
+            ApiRequestError: 不可重试的错误或重试次数耗尽
+        """
+        endpoint = endpoint or url
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(weight)
+
+            response = None
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = f"网络异常: {str(e)}"
+            self._record(endpoint, time.perf_counter() - started, retried=attempt > 0)
+
+            if response is not None:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update_from_headers(response.headers)
+                if response.status_code == 200:
+                    return response
+                last_error = f"API请求失败: {response.status_code}"
+                if response.status_code not in self.RETRY_STATUS:
+                    self._record_error(endpoint)
+                    raise ApiRequestError(f"{endpoint} {last_error}", response.status_code)
+
+            if attempt == self.max_retries:
+                break
+
+            headers = response.headers if response is not None else None
+            try:
+                delay = backoff_delay(attempt, headers, self.backoff_base, self.backoff_max,
+                                      self.retry_after_max)
+            except ApiRequestError as e:
+                self._record_error(endpoint)
+                raise ApiRequestError(f"{endpoint} {last_error}，{e}", response.status_code) from None
+            logger.warning(f"{endpoint} {last_error}，{delay:.2f}秒后第{attempt + 1}次重试")
+            time.sleep(delay)
+
+        self._record_error(endpoint)
+        status_code = response.status_code if response is not None else None
+        raise ApiRequestError(f"{endpoint} 重试{self.max_retries}次后仍失败 ({last_error})", status_code)
+
+    def _record(self, endpoint, latency, retried):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                'requests': 0, 'retries': 0, 'errors': 0, 'total_latency': 0.0
+            })
+            stats['requests'] += 1
+            stats['total_latency'] += latency
+            if retried:
+                stats['retries'] += 1
+
+    def _record_error(self, endpoint):
+        with self._lock:
+            self._stats[endpoint]['errors'] += 1
+
+    def get_stats(self):
+        """
+        获取各端点的请求统计
+
+        Returns:
+            dict: {端点: {requests, retries, errors, total_latency, avg_latency}}
+        """
+        with self._lock:
+            result = {}
+            for endpoint, stats in self._stats.items():
+                result[endpoint] = dict(stats)
+                result[endpoint]['avg_latency'] = stats['total_latency'] / stats['requests']
+            return result
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
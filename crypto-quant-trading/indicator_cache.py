@@ -0,0 +1,243 @@
+"""
+指标缓存模块 - 按输入数据指纹和参数缓存技术指标结果
+
+同一份OHLCV数据上反复运行多个策略或参数组合时，相同的指标序列只计算一次。
+缓存键 = 指标函数名 + 输入列的内容指纹 + 参数。结果只依赖输入列的数值，
+与索引无关，命中时用调用方数据的索引重建Series。
+
+内存层为按字节预算淘汰的LRU；配置目录后启用磁盘层（每个结果一个npz文件），
+跨进程、跨命令行调用复用。
+"""
+
+import os
+import json
+import hashlib
+import inspect
+import threading
+import functools
+from collections import OrderedDict
+import numpy as np
+from config import Config
+from numpy_kernels import resolve_backend
+from panel import wrap_values
+
+
+def fingerprint(values):
+    """
+    计算数组内容指纹
+
+    对数据类型、形状和全部字节按顺序做 BLAKE2b 哈希：元素的改变、增删或重新排列
+    都会改变指纹（500万个float64约30ms）。
+
+    Args:
+        values: ndarray
+
+    Returns:
+        str: 十六进制指纹
+    """
+    values = np.asarray(values)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{values.dtype.str}:{values.shape}".encode())
+    digest.update(np.ascontiguousarray(values).data)
+    return digest.hexdigest()
+
+
+class IndicatorCache:
+    """指标结果缓存：内存LRU（字节预算）+ 可选磁盘层"""
+
+    def __init__(self, max_bytes=None, disk_dir=None):
+        """
+        Args:
+            max_bytes: 内存层字节预算，默认 Config.INDICATOR_CACHE_MAX_BYTES
+            disk_dir: 磁盘层目录，None表示不使用磁盘层
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else Config.INDICATOR_CACHE_MAX_BYTES
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # 键 -> (names, arrays, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        """
+        查找缓存结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            tuple: (names, arrays)，未命中返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[0], entry[1]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._insert(key, *entry)
+            return entry
+
+    def put(self, key, names, arrays):
+        """
+        写入缓存结果（磁盘层为直写）
+
+        Args:
+            key: 缓存键
+            names: 各结果Series的名称
+            arrays: 各结果的数值数组
+        """
+        arrays = [np.array(values, copy=True) for values in arrays]
+        for values in arrays:
+            values.flags.writeable = False
+        with self._lock:
+            self._insert(key, names, arrays)
+        self._write_disk(key, names, arrays)
+
+    def _insert(self, key, names, arrays):
+        nbytes = sum(values.nbytes for values in arrays)
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[2]
+        self._entries[key] = (names, arrays, nbytes)
+        self._bytes += nbytes
+        while self._bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self._stats['evictions'] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.npz")
+
+    def _read_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as npz:
+            names = json.loads(str(npz['names']))
+            arrays = [npz[f"a{i}"] for i in range(len(names))]
+        for values in arrays:
+            values.flags.writeable = False
+        return names, arrays
+
+    def _write_disk(self, key, names, arrays):
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再替换，并发进程写入同一键时不会留下半个文件
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, names=np.array(json.dumps(names)),
+                     **{f"a{i}": values for i, values in enumerate(arrays)})
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """清空内存层（不删除磁盘文件）"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        """
+        获取缓存统计
+
+        Returns:
+            dict: {hits, disk_hits, misses, evictions, entries, bytes, hit_rate}
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_indicator_cache():
+    """
+    获取全局指标缓存（首次调用时按Config创建）
+
+    Returns:
+        IndicatorCache: 缓存实例，Config.INDICATOR_CACHE_ENABLED 为False时返回None
+    """
+    global _default_cache
+    if not Config.INDICATOR_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = IndicatorCache(disk_dir=Config.INDICATOR_CACHE_DIR)
+        return _default_cache
+
+
+def set_indicator_cache(cache):
+    """
+    替换全局指标缓存
+
+    Args:
+        cache: IndicatorCache 实例，None表示下次按Config重新创建
+    """
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
+
+
+def cached_indicator(*input_columns):
+    """
+    指标函数缓存装饰器
+
+    被装饰函数的第一个参数为DataFrame或面板，返回Series或Series元组
+    （面板输入时为 (时间 × 交易对) DataFrame 或其元组）。
+
+    Args:
+        *input_columns: 函数读取的列名；不指定时读取参数 column 指定的列
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(data, *args, **kwargs):
+            cache = get_indicator_cache()
+            if cache is None:
+                return func(data, *args, **kwargs)
+
+            bound = signature.bind(data, *args, **kwargs)
+            bound.apply_defaults()
+            params = {name: value for name, value in bound.arguments.items() if name != 'data'}
+            if 'backend' in params:
+                # 默认后端按当前配置解析，切换全局后端后不会命中另一后端的结果
+                params['backend'] = resolve_backend(params['backend'])
+            columns = input_columns or (params['column'],)
+            key_parts = [func.__name__, repr(sorted(params.items()))]
+            key_parts += [fingerprint(data[column].to_numpy()) for column in columns]
+            key = hashlib.sha1('|'.join(key_parts).encode(), usedforsecurity=False).hexdigest()
+
+            cached = cache.get(key)
+            if cached is not None:
+                names, arrays = cached
+                series = [wrap_values(values, data, name, copy=True)
+                          for name, values in zip(names, arrays)]
+                return tuple(series) if len(series) > 1 else series[0]
+
+            result = func(data, *args, **kwargs)
+            series = result if isinstance(result, tuple) else (result,)
+            cache.put(key, [getattr(s, 'name', None) for s in series], [s.to_numpy() for s in series])
+            return result
+
+        return wrapper
+    return decorator
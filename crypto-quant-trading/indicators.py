@@ -1,60 +1,131 @@
 """
 技术指标计算模块
+
+各指标函数既接受单交易对的OHLCV DataFrame，也接受 (时间 × 交易对) 面板
+（见 panel.py），面板输入时返回同样布局的DataFrame。输入缺失（面板中
+上市前、退市后或缺失的K线）的位置，指标结果也为NaN。
+
+add_indicators 支持更高周期的指标列 "列名@K线间隔"（如 ma_200@1d、rsi@4h）：
+在重采样后的K线上计算，再按收盘时间对齐回原K线，每根K线只能看到已经收盘的
+更高周期K线。
 """
 
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
+from config import Config
+from compact_dtypes import COMPACT_FLOAT, is_compact
+from indicator_cache import cached_indicator
+import numpy_kernels as kernels
+from numpy_kernels import resolve_backend
+from panel import is_panel, panel_symbols, wrap_values, add_fields
+from resampler import resample_ohlcv, infer_interval, interval_span_ms, closed_bar_positions
+
+# add_all_indicators 输出的指标列（按输出顺序）
+ALL_INDICATOR_COLUMNS = [
+    'ma_7', 'ma_25', 'ma_50', 'ma_200', 'ema_12', 'ema_26', 'rsi',
+    'macd', 'macd_signal', 'macd_histogram', 'bb_upper', 'bb_middle', 'bb_lower',
+    'stoch_k', 'atr', 'obv'
+]
+
+# 带周期的指标列名，如 ma_20、ema_9、rsi_7（rsi 不带周期时为14）
+_PERIOD_COLUMN = re.compile(r'^(ma|ema|rsi)_(\d+)$')
+# 带参数的MACD列名，如 macd_8_21_5（快线_慢线_信号线，不带参数时为12/26/9）
+_MACD_COLUMN = re.compile(r'^(macd|macd_signal|macd_histogram)_(\d+)_(\d+)_(\d+)$')
+# 带参数的布林带列名，如 bb_upper_30_2.5（周期_标准差倍数，不带参数时为20/2）
+_BOLLINGER_COLUMN = re.compile(r'^(bb_upper|bb_middle|bb_lower)_(\d+)_(\d+(?:\.\d+)?)$')
+
+# 更高周期指标列的分隔符：列名@K线间隔
+TIMEFRAME_SEPARATOR = '@'
+
+
+def rsi_column(period):
+    """RSI周期对应的指标列名"""
+    return 'rsi' if period == 14 else f"rsi_{period}"
+
+
+def macd_columns(fast_period, slow_period, signal_period):
+    """MACD参数对应的 (MACD线, 信号线, 柱状图) 指标列名"""
+    names = ('macd', 'macd_signal', 'macd_histogram')
+    if (fast_period, slow_period, signal_period) == (12, 26, 9):
+        return names
+    return tuple(f"{name}_{fast_period}_{slow_period}_{signal_period}" for name in names)
+
+
+def bollinger_columns(period, std_dev):
+    """布林带参数对应的 (上轨, 中轨, 下轨) 指标列名"""
+    names = ('bb_upper', 'bb_middle', 'bb_lower')
+    if (period, std_dev) == (20, 2):
+        return names
+    return tuple(f"{name}_{period}_{std_dev:g}" for name in names)
 
 
 class TechnicalIndicators:
     """技术指标计算类"""
     
     @staticmethod
-    def moving_average(data, period, column='close'):
+    @cached_indicator()
+    def moving_average(data, period, column='close', backend=None):
         """
         计算移动平均线
         
         Args:
-            data: DataFrame
+            data: DataFrame 或面板
             period: 周期
             column: 计算列名
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
         
         Returns:
             Series: 移动平均值
         """
+        if resolve_backend(backend) == 'numpy':
+            return wrap_values(kernels.rolling_mean(data[column].to_numpy(), period), data, column)
         return data[column].rolling(window=period).mean()
     
     @staticmethod
-    def exponential_moving_average(data, period, column='close'):
+    @cached_indicator()
+    def exponential_moving_average(data, period, column='close', backend=None):
         """
         计算指数移动平均线
         
         Args:
-            data: DataFrame
+            data: DataFrame 或面板
             period: 周期
             column: 计算列名
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
         
         Returns:
             Series: EMA值
         """
-        return data[column].ewm(span=period, adjust=False).mean()
+        if resolve_backend(backend) == 'numpy':
+            close = data[column].to_numpy()
+            return wrap_values(_mask_missing(kernels.ema(close, period), close), data, column)
+        return _mask_missing(data[column].ewm(span=period, adjust=False).mean(), data[column])
     
     @staticmethod
-    def rsi(data, period=14, column='close'):
+    @cached_indicator()
+    def rsi(data, period=14, column='close', backend=None):
         """
         计算相对强弱指标 (RSI)
         
         Args:
-            data: DataFrame
+            data: DataFrame 或面板
             period: 周期
             column: 计算列名
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
         
         Returns:
             Series: RSI值
         """
+        if resolve_backend(backend) == 'numpy':
+            return wrap_values(_rsi_values(data[column].to_numpy(), period), data, column)
+        
+        # 缺失K线的涨跌记为NaN，面板中上市前的填充值不会混入窗口
         delta = data[column].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        gain = _mask_missing(delta.where(delta > 0, 0), data[column]).rolling(window=period).mean()
+        loss = _mask_missing(-delta.where(delta < 0, 0), data[column]).rolling(window=period).mean()
         
         rs = gain / loss
         rsi = 100 - (100 / (1 + rs))
@@ -62,43 +133,61 @@ class TechnicalIndicators:
         return rsi
     
     @staticmethod
-    def macd(data, fast_period=12, slow_period=26, signal_period=9, column='close'):
+    @cached_indicator()
+    def macd(data, fast_period=12, slow_period=26, signal_period=9, column='close', backend=None):
         """
         计算MACD指标
         
         Args:
-            data: DataFrame
+            data: DataFrame 或面板
             fast_period: 快线周期
             slow_period: 慢线周期
             signal_period: 信号线周期
             column: 计算列名
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
         
         Returns:
             tuple: (MACD线, 信号线, MACD柱)
         """
+        if resolve_backend(backend) == 'numpy':
+            close = data[column].to_numpy()
+            macd_line = _mask_missing(kernels.ema(close, fast_period) - kernels.ema(close, slow_period), close)
+            signal_line = _mask_missing(kernels.ema(macd_line, signal_period), close)
+            return tuple(wrap_values(values, data, column)
+                         for values in (macd_line, signal_line, macd_line - signal_line))
+        
         ema_fast = data[column].ewm(span=fast_period, adjust=False).mean()
         ema_slow = data[column].ewm(span=slow_period, adjust=False).mean()
         
-        macd_line = ema_fast - ema_slow
-        signal_line = macd_line.ewm(span=signal_period, adjust=False).mean()
+        macd_line = _mask_missing(ema_fast - ema_slow, data[column])
+        signal_line = _mask_missing(macd_line.ewm(span=signal_period, adjust=False).mean(), data[column])
         macd_histogram = macd_line - signal_line
         
         return macd_line, signal_line, macd_histogram
     
     @staticmethod
-    def bollinger_bands(data, period=20, std_dev=2, column='close'):
+    @cached_indicator()
+    def bollinger_bands(data, period=20, std_dev=2, column='close', backend=None):
         """
         计算布林带
         
         Args:
-            data: DataFrame
+            data: DataFrame 或面板
             period: 周期
             std_dev: 标准差倍数
             column: 计算列名
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
         
         Returns:
             tuple: (上轨, 中轨, 下轨)
         """
+        if resolve_backend(backend) == 'numpy':
+            close = data[column].to_numpy()
+            middle_band = kernels.rolling_mean(close, period)
+            std = kernels.rolling_std(close, period)
+            return tuple(wrap_values(values, data, column) for values in
+                         (middle_band + std * std_dev, middle_band, middle_band - std * std_dev))
+        
         middle_band = data[column].rolling(window=period).mean()
         std = data[column].rolling(window=period).std()
         
@@ -108,17 +197,24 @@ class TechnicalIndicators:
         return upper_band, middle_band, lower_band
     
     @staticmethod
-    def stochastic_oscillator(data, period=14):
+    @cached_indicator('high', 'low', 'close')
+    def stochastic_oscillator(data, period=14, backend=None):
         """
         计算随机震荡指标
         
         Args:
-            data: DataFrame
+            data: DataFrame 或面板
             period: 周期
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
         
         Returns:
             Series: %K值
         """
+        if resolve_backend(backend) == 'numpy':
+            values = _stochastic_values(data['high'].to_numpy(), data['low'].to_numpy(),
+                                        data['close'].to_numpy(), period)
+            return wrap_values(values, data, None)
+        
         low_min = data['low'].rolling(window=period).min()
         high_max = data['high'].rolling(window=period).max()
         
@@ -127,85 +223,402 @@ class TechnicalIndicators:
         return k
     
     @staticmethod
-    def atr(data, period=14):
+    @cached_indicator('high', 'low', 'close')
+    def atr(data, period=14, backend=None):
         """
         计算平均真实波幅 (ATR)
         
         Args:
-            data: DataFrame
+            data: DataFrame 或面板
             period: 周期
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
         
         Returns:
             Series: ATR值
         """
+        if resolve_backend(backend) == 'numpy':
+            values = _atr_values(data['high'].to_numpy(), data['low'].to_numpy(),
+                                 data['close'].to_numpy(), period)
+            return wrap_values(values, data, None)
+        
         high_low = data['high'] - data['low']
         high_close = np.abs(data['high'] - data['close'].shift())
         low_close = np.abs(data['low'] - data['close'].shift())
         
-        true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+        # fmax 跳过NaN（等价于三列 max(axis=1)），面板输入时逐元素计算
+        true_range = np.fmax(np.fmax(high_low, high_close), low_close)
         atr = true_range.rolling(window=period).mean()
         
         return atr
     
     @staticmethod
-    def obv(data):
+    @cached_indicator('close', 'volume')
+    def obv(data, backend=None):
         """
         计算能量潮 (OBV)
         
         Args:
-            data: DataFrame
+            data: DataFrame 或面板
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
         
         Returns:
             Series: OBV值
         """
-        obv = (np.sign(data['close'].diff()) * data['volume']).fillna(0).cumsum()
-        return obv
+        if resolve_backend(backend) == 'numpy':
+            values = _obv_values(data['close'].to_numpy(), data['volume'].to_numpy())
+            return wrap_values(values, data, None)
+        
+        # 累加量始终用float64计算，避免紧凑模式下的误差累积
+        volume = data['volume'].astype(np.float64)
+        obv = (np.sign(data['close'].diff()) * volume).fillna(0).cumsum()
+        return _mask_missing(obv, data['close'])
     
     @staticmethod
-    def add_all_indicators(data):
+    def moving_average_grid(data, periods, column='close'):
         """
-        添加所有常用技术指标
+        一次计算多个周期的移动平均线（NumPy内核，所有周期共用一次前缀和）
         
         Args:
             data: DataFrame
+            periods: 周期序列
+            column: 计算列名
         
         Returns:
-            DataFrame: 添加了技术指标的数据
+            ndarray: (时间 × 周期) 数组，第j列为周期 periods[j] 的移动平均
         """
-        df = data.copy()
-        
-        # 移动平均线
-        df['ma_7'] = TechnicalIndicators.moving_average(df, 7)
-        df['ma_25'] = TechnicalIndicators.moving_average(df, 25)
-        df['ma_50'] = TechnicalIndicators.moving_average(df, 50)
-        df['ma_200'] = TechnicalIndicators.moving_average(df, 200)
-        
-        # EMA
-        df['ema_12'] = TechnicalIndicators.exponential_moving_average(df, 12)
-        df['ema_26'] = TechnicalIndicators.exponential_moving_average(df, 26)
-        
-        # RSI
-        df['rsi'] = TechnicalIndicators.rsi(df, 14)
+        return kernels.rolling_mean_grid(data[column].to_numpy(), periods)
+    
+    @staticmethod
+    def exponential_moving_average_grid(data, periods, column='close'):
+        """
+        一次计算多个周期的指数移动平均线（NumPy内核）
         
-        # MACD
-        macd_line, signal_line, macd_histogram = TechnicalIndicators.macd(df)
-        df['macd'] = macd_line
-        df['macd_signal'] = signal_line
-        df['macd_histogram'] = macd_histogram
+        Args:
+            data: DataFrame
+            periods: 周期序列
+            column: 计算列名
         
-        # 布林带
-        upper, middle, lower = TechnicalIndicators.bollinger_bands(df)
-        df['bb_upper'] = upper
-        df['bb_middle'] = middle
-        df['bb_lower'] = lower
+        Returns:
+            ndarray: (时间 × 周期) 数组，第j列为周期 periods[j] 的EMA
+        """
+        return kernels.ema_grid(data[column].to_numpy(), periods)
+    
+    @staticmethod
+    def rsi_grid(data, periods, column='close'):
+        """
+        一次计算多个周期的RSI（NumPy内核，共用同一组涨跌序列和前缀和）
         
-        # 随机震荡指标
-        df['stoch_k'] = TechnicalIndicators.stochastic_oscillator(df)
+        Args:
+            data: DataFrame
+            periods: 周期序列
+            column: 计算列名
         
-        # ATR
-        df['atr'] = TechnicalIndicators.atr(df)
+        Returns:
+            ndarray: (时间 × 周期) 数组，第j列为周期 periods[j] 的RSI
+        """
+        gain, loss = _gains_losses(data[column].to_numpy())
+        average_gain = kernels.rolling_mean_grid(gain, periods)
+        average_loss = kernels.rolling_mean_grid(loss, periods)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100 - (100 / (1 + average_gain / average_loss))
+    
+    @staticmethod
+    def add_indicators(data, columns, backend=None, interval=None, threads=None):
+        """
+        只计算指定的指标列，同一次计算中共享中间结果
+        （例如MACD复用 ema_12/ema_26，布林带中轨复用 ma_20）
+
+        互不依赖的指标组（均线、EMA/MACD、RSI、布林带、随机指标、ATR、OBV、
+        各更高周期）在数据量达到 Config.INDICATOR_PARALLEL_MIN_ROWS 时分配到线程池
+        并行计算（NumPy和pandas的滚动计算在大数组上会释放GIL），全部完成后一次写入结果。
+
+        结果数组直接作为新列拼接到输入数据上：不复制输入列（写时复制下与 data 共享），
+        也不逐列插入。
+
+        Args:
+            data: DataFrame 或面板
+            columns: 指标列名列表，取值见 ALL_INDICATOR_COLUMNS，
+                     均线/RSI 也可写任意周期，如 ma_20、ema_9、rsi_7；
+                     MACD/布林带也可带参数，如 macd_8_21_5、bb_upper_30_2.5；
+                     加 "@K线间隔" 后缀为更高周期的指标，如 ma_200@1d
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
+            interval: data 的K线间隔（只用于更高周期指标列），默认由时间索引推断
+            threads: 并行线程数，默认 Config.INDICATOR_THREADS；1 为串行
+
+        Returns:
+            DataFrame: 添加了指定指标列的数据（面板输入时为添加了指标字段的面板）
+        """
+        context = _IndicatorContext(data, resolve_backend(backend), interval)
+        results = _compute_columns(context, columns, threads)
+        del context  # 释放不输出的中间结果（如布林带的标准差）
+
+        # 紧凑模式：指标结果与输入一样保存为float32
+        if is_compact(data):
+            results = {column: values.astype(COMPACT_FLOAT) for column, values in results.items()}
+
+        if is_panel(data):
+            return add_fields(data, results)
+        indicators = pd.DataFrame(results, index=data.index, columns=list(results), copy=False)
+        return pd.concat([data.drop(columns=indicators.columns.intersection(data.columns)), indicators],
+                         axis=1)
+
+    @staticmethod
+    def add_all_indicators(data, backend=None):
+        """
+        添加所有常用技术指标
         
-        # OBV
-        df['obv'] = TechnicalIndicators.obv(df)
+        Args:
+            data: DataFrame
+            backend: 计算后端 'pandas'/'numpy'，默认 Config.INDICATOR_BACKEND
         
-        return df
+        Returns:
+            DataFrame: 添加了技术指标的数据
+        """
+        return TechnicalIndicators.add_indicators(data, ALL_INDICATOR_COLUMNS, backend)
+
+    @staticmethod
+    def lookback(columns, interval=None):
+        """
+        指标列的最大回看长度：某根K线之前需要多少根K线，该K线的指标值才有效
+
+        滚动窗口类为窗口长度减1（RSI、ATR 的差分再多1根），EMA类没有固定窗口，
+        取跨度的 Config.EMA_WARMUP_SPANS 倍。更高周期的指标列换算为基础K线数。
+
+        Args:
+            columns: 指标列名列表，取值同 add_indicators
+            interval: 基础K线间隔，默认 Config.DEFAULT_INTERVAL
+
+        Returns:
+            int: 最大回看K线数
+        """
+        interval = interval or Config.DEFAULT_INTERVAL
+        return max((_column_lookback(column, interval) for column in columns), default=0)
+
+
+def _column_group(name):
+    """
+    指标列所属的计算组：同组的列共享中间结果，不同组之间互不依赖
+
+    各组在线程池中并行时共用一个 _IndicatorContext，其中间结果缓存不加锁，
+    因此用到同一中间结果的列必须在同一组：MACD 用 EMA，布林带中轨即 SMA。
+    """
+    if TIMEFRAME_SEPARATOR in name:
+        return name.split(TIMEFRAME_SEPARATOR, 1)[1]
+    if name.startswith('ema_') or name.startswith('macd'):
+        return 'ema'
+    if name.startswith('ma_') or name.startswith('bb_'):
+        return 'ma'
+    return name.split('_')[0]
+
+
+def _compute_columns(context, columns, threads=None):
+    """
+    计算全部指标列，数据量足够大时各计算组并行
+
+    Returns:
+        dict: {列名: 结果}
+    """
+    groups = {}
+    for column in columns:
+        groups.setdefault(_column_group(column), []).append(column)
+
+    threads = threads or Config.INDICATOR_THREADS or os.cpu_count() or 1
+    size = len(context.data)
+    if is_panel(context.data):
+        size *= len(panel_symbols(context.data))
+    if threads <= 1 or len(groups) <= 1 or size < Config.INDICATOR_PARALLEL_MIN_ROWS:
+        return {column: context.column(column) for column in columns}
+
+    def compute(group):
+        return {column: context.column(column) for column in group}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(threads, len(groups))) as pool:
+        for group_results in pool.map(compute, groups.values()):
+            results.update(group_results)
+    return {column: results[column] for column in columns}
+
+
+def _column_lookback(name, interval):
+    """单个指标列的回看长度（见 TechnicalIndicators.lookback）"""
+    if TIMEFRAME_SEPARATOR in name:
+        name, timeframe = name.split(TIMEFRAME_SEPARATOR, 1)
+        ratio = -(-interval_span_ms(timeframe) // interval_span_ms(interval))
+        # 需要 lookback+1 根完整的更高周期K线，开头不完整的一根被丢弃
+        return (_column_lookback(name, timeframe) + 2) * ratio
+
+    spans = Config.EMA_WARMUP_SPANS
+    match = _PERIOD_COLUMN.match(name)
+    if match:
+        kind, period = match.group(1), int(match.group(2))
+        return {'ma': period - 1, 'ema': spans * period, 'rsi': period}[kind]
+    match = _MACD_COLUMN.match(name)
+    if match:
+        slow_period, signal_period = int(match.group(3)), int(match.group(4))
+        return spans * slow_period if match.group(1) == 'macd' else spans * (slow_period + signal_period)
+    match = _BOLLINGER_COLUMN.match(name)
+    if match:
+        return int(match.group(2)) - 1
+    lookbacks = {
+        'rsi': 14,
+        'macd': spans * 26, 'macd_signal': spans * (26 + 9), 'macd_histogram': spans * (26 + 9),
+        'bb_upper': 19, 'bb_middle': 19, 'bb_lower': 19,
+        'stoch_k': 13, 'atr': 14, 'obv': 1,
+    }
+    if name not in lookbacks:
+        raise ValueError(f"未知指标列: {name}")
+    return lookbacks[name]
+
+
+def _mask_missing(result, source):
+    """输入缺失的位置结果也记为NaN（没有缺失时原样返回）"""
+    missing = source.isna() if isinstance(source, (pd.Series, pd.DataFrame)) else np.isnan(source)
+    if not np.asarray(missing).any():
+        return result
+    if isinstance(result, (pd.Series, pd.DataFrame)):
+        return result.mask(missing)
+    return np.where(missing, np.nan, result)
+
+
+def _gains_losses(close):
+    """逐根涨幅和跌幅（与pandas的 where 一致：差分为NaN时涨跌都记为0，缺失K线记为NaN）"""
+    delta = kernels.diff(close)
+    gain, loss = np.where(delta > 0, delta, 0.0), np.where(delta < 0, -delta, 0.0)
+    return _mask_missing(gain, close), _mask_missing(loss, close)
+
+
+def _rsi_values(close, period):
+    gain, loss = _gains_losses(close)
+    gain = kernels.rolling_mean(gain, period)
+    loss = kernels.rolling_mean(loss, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def _stochastic_values(high, low, close, period):
+    low_min = kernels.rolling_min(low, period)
+    high_max = kernels.rolling_max(high, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * ((close - low_min) / (high_max - low_min))
+
+
+def _atr_values(high, low, close, period):
+    prev_close = kernels.shift(close)
+    # fmax 跳过NaN，与 DataFrame.max(axis=1) 一致
+    true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    return kernels.rolling_mean(true_range, period)
+
+
+def _obv_values(close, volume):
+    flow = np.sign(kernels.diff(close)) * np.asarray(volume, dtype=np.float64)
+    return _mask_missing(np.cumsum(np.where(np.isnan(flow), 0.0, flow), axis=0), close)
+
+
+class _IndicatorContext:
+    """一次 add_indicators 调用内的中间结果缓存"""
+
+    def __init__(self, data, backend, interval=None):
+        self.data = data
+        self.backend = backend
+        self.interval = interval
+        self._results = {}
+
+    def _memo(self, key, compute):
+        if key not in self._results:
+            self._results[key] = compute()
+        return self._results[key]
+
+    def sma(self, period):
+        return self._memo(('sma', period),
+                          lambda: TechnicalIndicators.moving_average(self.data, period, backend=self.backend))
+
+    def ema(self, period):
+        return self._memo(('ema', period), lambda: TechnicalIndicators.exponential_moving_average(
+            self.data, period, backend=self.backend))
+
+    def macd(self, fast_period=12, slow_period=26, signal_period=9):
+        def compute():
+            close = self.data['close']
+            macd_line = self.ema(fast_period) - self.ema(slow_period)
+            if self.backend == 'numpy':
+                signal_line = wrap_values(kernels.ema(macd_line.to_numpy(), signal_period), self.data, 'close')
+            else:
+                signal_line = macd_line.ewm(span=signal_period, adjust=False).mean()
+            signal_line = _mask_missing(signal_line, close)
+            return macd_line, signal_line, macd_line - signal_line
+        return self._memo(('macd', fast_period, slow_period, signal_period), compute)
+
+    def rolling_std(self, period):
+        def compute():
+            if self.backend == 'numpy':
+                return wrap_values(kernels.rolling_std(self.data['close'].to_numpy(), period), self.data, 'close')
+            return self.data['close'].rolling(window=period).std()
+        return self._memo(('std', period), compute)
+
+    def bollinger(self, period=20, std_dev=2):
+        def compute():
+            middle_band = self.sma(period)
+            std = self.rolling_std(period)
+            return middle_band + (std * std_dev), middle_band, middle_band - (std * std_dev)
+        return self._memo(('bollinger', period, std_dev), compute)
+
+    def timeframe(self, interval):
+        """更高周期K线上的上下文及其对齐位置（同一周期的多个指标共用一次重采样）"""
+        def compute():
+            if is_panel(self.data):
+                raise ValueError("面板数据不支持更高周期的指标列")
+            base_interval = self.interval or infer_interval(self.data.index)
+            if base_interval is None:
+                raise ValueError("无法从时间索引推断K线间隔，请指定 interval")
+            if interval_span_ms(interval) <= interval_span_ms(base_interval):
+                raise ValueError(f"指标周期 {interval} 必须大于数据的K线间隔 {base_interval}")
+            bars = resample_ohlcv(self.data, interval, base_interval)
+            positions = closed_bar_positions(self.data.index, base_interval, bars.index, interval)
+            return _IndicatorContext(bars, self.backend), positions
+        return self._memo(('timeframe', interval), compute)
+
+    def higher_timeframe(self, name, interval):
+        """更高周期的指标列，按收盘时间前向填充到原K线"""
+        context, positions = self.timeframe(interval)
+        values = np.asarray(context.column(name), dtype=np.float64)
+        aligned = np.full(len(positions), np.nan)
+        closed = positions >= 0
+        aligned[closed] = values[positions[closed]]
+        return wrap_values(aligned, self.data, f"{name}{TIMEFRAME_SEPARATOR}{interval}")
+
+    def column(self, name):
+        """计算单个指标列"""
+        if TIMEFRAME_SEPARATOR in name:
+            return self.higher_timeframe(*name.split(TIMEFRAME_SEPARATOR, 1))
+
+        match = _PERIOD_COLUMN.match(name)
+        if match:
+            kind, period = match.group(1), int(match.group(2))
+            if kind == 'ma':
+                return self.sma(period)
+            if kind == 'ema':
+                return self.ema(period)
+            return TechnicalIndicators.rsi(self.data, period, backend=self.backend)
+
+        match = _MACD_COLUMN.match(name)
+        if match:
+            lines = self.macd(int(match.group(2)), int(match.group(3)), int(match.group(4)))
+            return lines[('macd', 'macd_signal', 'macd_histogram').index(match.group(1))]
+        match = _BOLLINGER_COLUMN.match(name)
+        if match:
+            bands = self.bollinger(int(match.group(2)), float(match.group(3)))
+            return bands[('bb_upper', 'bb_middle', 'bb_lower').index(match.group(1))]
+
+        if name == 'rsi':
+            return TechnicalIndicators.rsi(self.data, 14, backend=self.backend)
+        if name in ('macd', 'macd_signal', 'macd_histogram'):
+            return self.macd()[('macd', 'macd_signal', 'macd_histogram').index(name)]
+        if name in ('bb_upper', 'bb_middle', 'bb_lower'):
+            return self.bollinger()[('bb_upper', 'bb_middle', 'bb_lower').index(name)]
+        if name == 'stoch_k':
+            return TechnicalIndicators.stochastic_oscillator(self.data, backend=self.backend)
+        if name == 'atr':
+            return TechnicalIndicators.atr(self.data, backend=self.backend)
+        if name == 'obv':
+            return TechnicalIndicators.obv(self.data, backend=self.backend)
+        raise ValueError(f"未知指标列: {name}")
@@ -0,0 +1,93 @@
+"""
+K线解析模块 - 把交易所返回的K线响应直接解析为NumPy数组
+
+币安K线响应是固定12列的二维JSON数组，数值以字符串形式给出。这里不经过
+Python对象列表和object类型的DataFrame，而是去掉括号和引号后由NumPy在C层
+一次性解析为float64，只保留 开盘时间 + OHLCV 六列，最后直接用预分配的数组
+构造DataFrame。
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from kline_store import OHLCV_COLUMNS
+
+# 交易所K线的12个字段
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades', 'taker_buy_base',
+    'taker_buy_quote', 'ignore'
+]
+
+# 需要保留的字段：开盘时间 + OHLCV
+KEEP_FIELDS = 6
+
+_STRIP_CHARS = b'[]"'
+
+
+def parse_klines(body):
+    """
+    解析K线响应
+
+    Args:
+        body: 响应体 (bytes/str) 或已解码的K线列表
+
+    Returns:
+        ndarray: (n, 6) float64 数组，列为 开盘时间(毫秒) + OHLCV。
+                 毫秒时间戳小于2^53，可以被float64精确表示。
+    """
+    if isinstance(body, list):
+        return _parse_decoded(body)
+    if isinstance(body, str):
+        body = body.encode()
+
+    flat = np.fromstring(body.translate(None, _STRIP_CHARS), sep=',')
+    if flat.size % len(KLINE_COLUMNS) != 0:
+        # 非标准格式（例如字段数变化），退回到逐行解码
+        return _parse_decoded(json.loads(body))
+
+    rows = flat.reshape(-1, len(KLINE_COLUMNS))
+    return np.ascontiguousarray(rows[:, :KEEP_FIELDS])
+
+
+def _parse_decoded(data):
+    """解析已解码的K线列表"""
+    out = np.empty((len(data), KEEP_FIELDS), dtype=np.float64)
+    for i, kline in enumerate(data):
+        out[i] = kline[:KEEP_FIELDS]
+    return out
+
+
+def klines_to_frame(pages):
+    """
+    合并若干页解析后的K线，按开盘时间去重排序并构造DataFrame
+
+    OHLCV写入一块按列连续的预分配数组，DataFrame直接引用这块内存，不再复制。
+
+    Args:
+        pages: parse_klines 返回的数组列表
+
+    Returns:
+        DataFrame: 以时间戳为索引的OHLCV数据（float64）
+    """
+    pages = [page for page in pages if len(page)]
+    total = sum(len(page) for page in pages)
+
+    timestamps = np.empty(total, dtype=np.int64)
+    values = np.empty((len(OHLCV_COLUMNS), total), dtype=np.float64)
+
+    offset = 0
+    for page in pages:
+        n = len(page)
+        timestamps[offset:offset + n] = page[:, 0]
+        values[:, offset:offset + n] = page[:, 1:KEEP_FIELDS].T
+        offset += n
+
+    # 窗口之间可能重叠或乱序
+    if total and not (np.diff(timestamps) > 0).all():
+        timestamps, first = np.unique(timestamps, return_index=True)
+        values = np.ascontiguousarray(values[:, first])
+
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps, unit='ms'), name='timestamp')
+    return pd.DataFrame(values.T, index=index, columns=OHLCV_COLUMNS, copy=False)
+
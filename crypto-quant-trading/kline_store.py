@@ -0,0 +1,274 @@
+"""
+K线本地存储模块 - 按 (交易对, K线间隔) 保存OHLCV数据，以月为分区
+"""
+
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# OHLCV字段（与 CryptoDataFetcher 返回的列一致）
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# 与Unix纪元对齐的K线间隔（毫秒），只有这些间隔可以推算出完整的K线时间网格
+INTERVAL_MS = {
+    '1m': 60 * 1000,
+    '3m': 3 * 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '2h': 2 * 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '6h': 6 * 60 * 60 * 1000,
+    '8h': 8 * 60 * 60 * 1000,
+    '12h': 12 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+
+def interval_to_ms(interval):
+    """
+    K线间隔转换为毫秒
+
+    Args:
+        interval: K线间隔 (1m, 5m, 1h, 1d等)
+
+    Returns:
+        int: 毫秒数，不支持的间隔（如 3d, 1w, 1M）返回None
+    """
+    return INTERVAL_MS.get(interval)
+
+
+class KlineStore:
+    """K线本地存储"""
+
+    def __init__(self, root='data/klines'):
+        """
+        初始化K线存储
+
+        Args:
+            root: 存储根目录，文件布局为 root/交易对/间隔/YYYY-MM.npz，
+                同目录下 empty.npy 记录交易所没有K线的时间段
+        """
+        self.root = root
+
+    def supports(self, interval):
+        """是否支持缓存该K线间隔"""
+        return interval_to_ms(interval) is not None
+
+    def _partition_path(self, symbol, interval, month):
+        return os.path.join(self.root, symbol.upper(), interval, f'{month}.npz')
+
+    @staticmethod
+    def _months(start_ts, end_ts):
+        """[start_ts, end_ts] 覆盖的所有月份 (UTC)"""
+        periods = pd.period_range(
+            pd.Timestamp(start_ts, unit='ms').to_period('M'),
+            pd.Timestamp(end_ts, unit='ms').to_period('M'),
+            freq='M'
+        )
+        return [str(p) for p in periods]
+
+    def _load_partition(self, path):
+        """读取单个月份分区，返回 (时间戳数组, 字段字典)"""
+        with np.load(path) as npz:
+            return npz['timestamp'], {col: npz[col] for col in OHLCV_COLUMNS}
+
+    def _save_partition(self, path, timestamps, columns):
+        """原子写入单个月份分区"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, timestamp=timestamps, **columns)
+        os.replace(tmp_path, path)
+
+    def _empty_path(self, symbol, interval):
+        return os.path.join(self.root, symbol.upper(), interval, 'empty.npy')
+
+    def read_empty(self, symbol, interval):
+        """
+        读取已确认交易所没有K线的时间段（上市之前、交易所停机缺口等）
+
+        Returns:
+            ndarray: (区间数, 2) 的 [起始时间戳, 结束时间戳]，按起始时间排序、互不重叠
+        """
+        path = self._empty_path(symbol, interval)
+        if os.path.exists(path):
+            try:
+                return np.load(path)
+            except Exception as e:
+                logger.warning(f"读取空缺记录失败 {path}: {str(e)}")
+        return np.empty((0, 2), dtype=np.int64)
+
+    def mark_empty(self, symbol, interval, ranges, fetched_index):
+        """
+        记录请求过但交易所没有返回K线的时间段，之后不再重复请求
+
+        只记录已收盘的K线时间，尚未到来或未收盘的K线不会被标记。
+
+        Args:
+            symbol: 交易对符号
+            interval: K线间隔
+            ranges: 已请求的区间 [(开始, 结束), ...]，毫秒，包含端点
+            fetched_index: 交易所返回的K线时间索引
+
+        Returns:
+            int: 新标记的空缺区间数量
+        """
+        interval_ms = interval_to_ms(interval)
+        last_closed = int(time.time() * 1000) - interval_ms
+        empty = [run for start_ts, end_ts in ranges
+                 for run in self.missing_ranges(fetched_index, interval, start_ts, min(end_ts, last_closed))]
+        if not empty:
+            return 0
+
+        # 与已有记录合并，首尾相接或重叠的区间合为一段
+        runs = np.concatenate([self.read_empty(symbol, interval), np.array(empty, dtype=np.int64)])
+        runs = runs[np.argsort(runs[:, 0], kind='stable')]
+        merged = [list(runs[0])]
+        for start_ts, end_ts in runs[1:]:
+            if start_ts <= merged[-1][1] + interval_ms:
+                merged[-1][1] = max(merged[-1][1], end_ts)
+            else:
+                merged.append([start_ts, end_ts])
+
+        path = self._empty_path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.array(merged, dtype=np.int64))
+        os.replace(tmp_path, path)
+        return len(empty)
+
+    def read(self, symbol, interval, start_ts, end_ts):
+        """
+        读取缓存中开盘时间位于 [start_ts, end_ts] 的K线
+
+        Args:
+            symbol: 交易对符号
+            interval: K线间隔
+            start_ts: 开始时间戳（毫秒）
+            end_ts: 结束时间戳（毫秒，包含）
+
+        Returns:
+            DataFrame: OHLCV数据（可能为空）
+        """
+        ts_parts = []
+        col_parts = {col: [] for col in OHLCV_COLUMNS}
+
+        for month in self._months(start_ts, end_ts):
+            path = self._partition_path(symbol, interval, month)
+            if not os.path.exists(path):
+                continue
+            try:
+                timestamps, columns = self._load_partition(path)
+            except Exception as e:
+                logger.warning(f"读取缓存分区失败 {path}: {str(e)}")
+                continue
+
+            mask = (timestamps >= start_ts) & (timestamps <= end_ts)
+            ts_parts.append(timestamps[mask])
+            for col in OHLCV_COLUMNS:
+                col_parts[col].append(columns[col][mask])
+
+        if ts_parts:
+            timestamps = np.concatenate(ts_parts)
+            data = {col: np.concatenate(col_parts[col]) for col in OHLCV_COLUMNS}
+        else:
+            timestamps = np.empty(0, dtype=np.int64)
+            data = {col: np.empty(0, dtype=np.float64) for col in OHLCV_COLUMNS}
+
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps, unit='ms'), name='timestamp')
+        return pd.DataFrame(data, index=index, columns=OHLCV_COLUMNS)
+
+    def write(self, symbol, interval, df):
+        """
+        写入K线数据，按月与已有分区合并去重
+
+        只保存已收盘的K线，未收盘的最新K线不会写入缓存。
+
+        Args:
+            symbol: 交易对符号
+            interval: K线间隔
+            df: OHLCV数据，索引为时间戳
+
+        Returns:
+            int: 写入的K线数量
+        """
+        interval_ms = interval_to_ms(interval)
+        if interval_ms is None or df is None or df.empty:
+            return 0
+
+        timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+        now_ms = int(time.time() * 1000)
+        closed = timestamps + interval_ms <= now_ms
+        if not closed.any():
+            return 0
+
+        timestamps = timestamps[closed]
+        values = {col: df[col].to_numpy(dtype=np.float64)[closed] for col in OHLCV_COLUMNS}
+        months = pd.to_datetime(timestamps, unit='ms').strftime('%Y-%m')
+
+        written = 0
+        for month in pd.unique(months):
+            in_month = months == month
+            new_ts = timestamps[in_month]
+            new_cols = {col: values[col][in_month] for col in OHLCV_COLUMNS}
+
+            path = self._partition_path(symbol, interval, month)
+            if os.path.exists(path):
+                try:
+                    old_ts, old_cols = self._load_partition(path)
+                    # 新数据放在前面，去重时优先保留
+                    new_ts = np.concatenate([new_ts, old_ts])
+                    new_cols = {col: np.concatenate([new_cols[col], old_cols[col]])
+                                for col in OHLCV_COLUMNS}
+                except Exception as e:
+                    logger.warning(f"缓存分区损坏，将被覆盖 {path}: {str(e)}")
+
+            new_ts, first = np.unique(new_ts, return_index=True)
+            new_cols = {col: new_cols[col][first] for col in OHLCV_COLUMNS}
+            self._save_partition(path, new_ts, new_cols)
+            written += int(in_month.sum())
+
+        return written
+
+    @staticmethod
+    def missing_ranges(cached_index, interval, start_ts, end_ts, empty_ranges=None):
+        """
+        计算 [start_ts, end_ts] 内缓存缺失的时间段（头部、尾部及中间缺口）
+
+        Args:
+            cached_index: 已缓存K线的时间索引
+            interval: K线间隔
+            start_ts: 开始时间戳（毫秒）
+            end_ts: 结束时间戳（毫秒，包含）
+            empty_ranges: 已确认没有K线的区间（见 read_empty），不计为缺失
+
+        Returns:
+            list: [(起始时间戳, 结束时间戳), ...]，均为包含端点的K线开盘时间
+        """
+        interval_ms = interval_to_ms(interval)
+        first = -(-start_ts // interval_ms) * interval_ms
+        last = end_ts // interval_ms * interval_ms
+        if first > last:
+            return []
+
+        expected = np.arange(first, last + 1, interval_ms, dtype=np.int64)
+        have = cached_index.values.astype('datetime64[ms]').astype(np.int64)
+        missing = ~np.isin(expected, have)
+        if empty_ranges is not None and len(empty_ranges):
+            run = np.searchsorted(empty_ranges[:, 0], expected, side='right') - 1
+            missing &= ~((run >= 0) & (expected <= empty_ranges[np.maximum(run, 0), 1]))
+        if not missing.any():
+            return []
+
+        # 把连续缺失的K线合并为区间
+        edges = np.diff(missing.astype(np.int8), prepend=0, append=0)
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1) - 1
+        return [(int(expected[s]), int(expected[e])) for s, e in zip(run_starts, run_ends)]
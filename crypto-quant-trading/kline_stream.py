@@ -0,0 +1,300 @@
+"""
+实时行情流模块 - 通过WebSocket订阅K线/ticker，维护每个交易对的滚动K线缓冲
+"""
+
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+import pandas as pd
+import websockets
+from config import Config
+from kline_store import OHLCV_COLUMNS, interval_to_ms
+from http_transport import backoff_delay
+from data_fetcher import CryptoDataFetcher
+
+logger = logging.getLogger(__name__)
+
+
+class BarBuffer:
+    """单个交易对的滚动K线缓冲（线程安全）"""
+
+    def __init__(self, maxlen=500):
+        """
+        初始化K线缓冲
+
+        Args:
+            maxlen: 最多保留的已收盘K线数量
+        """
+        self.maxlen = maxlen
+        self._bars = OrderedDict()  # 开盘时间戳(毫秒) -> (open, high, low, close, volume)
+        self._partial = None  # 尚未收盘的当前K线 (开盘时间戳, OHLCV)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._bars)
+
+    def load(self, df, interval_ms=None):
+        """
+        用REST回补的数据重置缓冲
+
+        Args:
+            df: CryptoDataFetcher 返回的OHLCV数据
+            interval_ms: K线间隔毫秒数，用于判断最后一根K线是否已收盘；
+                None（3d、1w、1M等非固定长度间隔）时除最后一根外均视为已收盘
+        """
+        timestamps = df.index.values.astype('datetime64[ms]').astype('int64')
+        values = df[OHLCV_COLUMNS].to_numpy(dtype=float)
+        now_ms = int(time.time() * 1000)
+
+        with self._lock:
+            self._bars.clear()
+            self._partial = None
+            last = len(timestamps) - 1
+            for i, (ts, row) in enumerate(zip(timestamps.tolist(), values.tolist())):
+                closed = ts + interval_ms <= now_ms if interval_ms is not None else i < last
+                if closed:
+                    self._bars[ts] = tuple(row)
+                else:
+                    self._partial = (ts, tuple(row))
+            self._trim()
+
+    def update(self, ts, bar, closed):
+        """
+        写入一根K线（同一开盘时间的K线会被覆盖）
+
+        Args:
+            ts: 开盘时间戳（毫秒）
+            bar: (open, high, low, close, volume)
+            closed: 该K线是否已收盘
+
+        Returns:
+            bool: 是否新增了一根已收盘K线
+        """
+        with self._lock:
+            if not closed:
+                self._partial = (ts, bar)
+                return False
+
+            is_new = ts not in self._bars
+            if is_new and self._bars and ts < next(reversed(self._bars)):
+                # 乱序的旧K线（重连回补前的消息），按时间重新排序
+                self._bars[ts] = bar
+                self._bars = OrderedDict(sorted(self._bars.items()))
+            else:
+                self._bars[ts] = bar
+            if self._partial is not None and self._partial[0] <= ts:
+                self._partial = None
+            self._trim()
+            return is_new
+
+    def _trim(self):
+        while len(self._bars) > self.maxlen:
+            self._bars.popitem(last=False)
+
+    def to_frame(self, include_partial=False):
+        """
+        导出为与 CryptoDataFetcher 相同格式的DataFrame
+
+        Args:
+            include_partial: 是否包含尚未收盘的当前K线
+
+        Returns:
+            DataFrame: 以时间戳为索引的OHLCV数据
+        """
+        with self._lock:
+            timestamps = list(self._bars.keys())
+            rows = list(self._bars.values())
+            if include_partial and self._partial is not None:
+                timestamps.append(self._partial[0])
+                rows.append(self._partial[1])
+
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps, unit='ms'), name='timestamp')
+        return pd.DataFrame(rows, index=index, columns=OHLCV_COLUMNS, dtype=float)
+
+
+class KlineStream:
+    """WebSocket K线行情流
+
+    在后台线程中运行asyncio事件循环，订阅各交易对的K线（以及可选的24h ticker）
+    组合流。每次（重新）连接后用一次REST请求回补缓冲，之后只靠推送更新，
+    策略读取缓冲时没有任何HTTP请求。
+
+    用法:
+        stream = KlineStream(['BTCUSDT'], interval='1m')
+        stream.start()
+        while stream.wait_for_bar(timeout=120):
+            df = stream.get_frame('BTCUSDT')
+    """
+
+    def __init__(self, symbols, interval='1h', buffer_size=None, fetcher=None,
+                 ws_url=None, subscribe_ticker=False, on_bar=None):
+        """
+        初始化行情流
+
+        Args:
+            symbols: 交易对列表
+            interval: K线间隔
+            buffer_size: 每个交易对保留的K线数量，默认取 Config.STREAM_BUFFER_SIZE
+            fetcher: 用于回补的 CryptoDataFetcher，默认新建
+            ws_url: WebSocket地址，默认取 Config.WS_BASE_URL（测试时可指向本地服务）
+            subscribe_ticker: 是否同时订阅24h ticker
+            on_bar: 新K线收盘时的回调 on_bar(symbol, frame)，在后台线程中调用
+        """
+        self.symbols = [s.upper() for s in symbols]
+        self.interval = interval
+        self.interval_ms = interval_to_ms(interval)
+        self.buffer_size = buffer_size or Config.STREAM_BUFFER_SIZE
+        # 回补只有一次REST请求，最多 KLINES_PAGE_LIMIT 根；其余K线随行情流逐步累积
+        self.backfill_size = min(self.buffer_size, Config.KLINES_PAGE_LIMIT)
+        if self.buffer_size > self.backfill_size:
+            logger.warning(f"缓冲长度 {self.buffer_size} 超过单次请求上限，回补 {self.backfill_size} 根K线，"
+                           f"其余随行情流累积")
+        self.fetcher = fetcher or CryptoDataFetcher()
+        self.ws_url = ws_url or Config.WS_BASE_URL
+        self.subscribe_ticker = subscribe_ticker
+        self.on_bar = on_bar
+
+        self.buffers = {symbol: BarBuffer(self.buffer_size) for symbol in self.symbols}
+        self.tickers = {}
+        self.reconnects = 0
+
+        self._bar_event = threading.Condition()
+        self._bar_seq = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._ws = None
+
+    @property
+    def stream_url(self):
+        streams = [f"{s.lower()}@kline_{self.interval}" for s in self.symbols]
+        if self.subscribe_ticker:
+            streams += [f"{s.lower()}@ticker" for s in self.symbols]
+        return f"{self.ws_url}/stream?streams={'/'.join(streams)}"
+
+    def start(self):
+        """在后台线程中启动行情流"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._thread_main, name='kline-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """停止行情流并等待后台线程退出"""
+        self._stop.set()
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        with self._bar_event:
+            self._bar_event.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_frame(self, symbol, include_partial=False):
+        """
+        读取某交易对的缓冲K线
+
+        Args:
+            symbol: 交易对符号
+            include_partial: 是否包含尚未收盘的当前K线
+
+        Returns:
+            DataFrame: 以时间戳为索引的OHLCV数据
+        """
+        return self.buffers[symbol.upper()].to_frame(include_partial)
+
+    def wait_for_bar(self, timeout=None):
+        """
+        阻塞直到有新的K线收盘
+
+        Args:
+            timeout: 最长等待秒数
+
+        Returns:
+            bool: 是否等到了新K线（超时或已停止返回False）
+        """
+        with self._bar_event:
+            seq = self._bar_seq
+            self._bar_event.wait_for(lambda: self._bar_seq != seq or self._stop.is_set(), timeout)
+            return self._bar_seq != seq
+
+    def _thread_main(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _run(self):
+        """连接、回补、接收消息；断线后指数退避重连并重新回补"""
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self.stream_url, ping_interval=20) as ws:
+                    self._ws = ws
+                    # 先建立连接再回补，回补期间的推送会在之后按时间戳去重合并
+                    await self._backfill()
+                    attempt = 0
+                    logger.info(f"行情流已连接: {', '.join(self.symbols)} {self.interval}")
+                    async for message in ws:
+                        self._handle_message(message)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logger.warning(f"行情流连接断开: {str(e) or type(e).__name__}")
+            finally:
+                self._ws = None
+
+            if self._stop.is_set():
+                break
+            delay = backoff_delay(attempt, None, Config.WS_RECONNECT_BASE, Config.WS_RECONNECT_MAX)
+            attempt += 1
+            self.reconnects += 1
+            logger.info(f"{delay:.1f}秒后重连行情流")
+            deadline = time.monotonic() + delay
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                await asyncio.sleep(min(0.5, deadline - time.monotonic()))
+
+    async def _backfill(self):
+        """用一次REST请求回补每个交易对的缓冲"""
+        loop = asyncio.get_running_loop()
+        for symbol in self.symbols:
+            df = await loop.run_in_executor(
+                None, self.fetcher.get_realtime_data, symbol, self.backfill_size, self.interval)
+            if df is None:
+                raise ConnectionError(f"{symbol} 回补失败")
+            self.buffers[symbol].load(df, self.interval_ms)
+            logger.info(f"{symbol} 回补 {len(self.buffers[symbol])} 根K线")
+
+    def _handle_message(self, message):
+        payload = json.loads(message)
+        data = payload.get('data', payload)
+        event = data.get('e')
+
+        if event == 'kline':
+            k = data['k']
+            symbol = data['s']
+            bar = (float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v']))
+            buffer = self.buffers.get(symbol)
+            if buffer is None:
+                return
+            if buffer.update(int(k['t']), bar, bool(k['x'])):
+                if self.on_bar is not None:
+                    self.on_bar(symbol, buffer.to_frame())
+                with self._bar_event:
+                    self._bar_seq += 1
+                    self._bar_event.notify_all()
+
+        elif event == '24hrTicker':
+            self.tickers[data['s']] = {
+                'last_price': float(data['c']),
+                'price_change_pct': float(data['P']),
+                'high': float(data['h']),
+                'low': float(data['l']),
+                'volume': float(data['v']),
+                'quote_volume': float(data['q'])
+            }
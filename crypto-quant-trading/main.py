@@ -3,12 +3,21 @@
 加密货币量化交易系统 - 主程序
 """
 
+import os
+import json
 import argparse
 import logging
 from datetime import datetime
 from data_fetcher import CryptoDataFetcher
+from kline_stream import KlineStream
+from streaming_indicators import StreamingIndicatorSet
+from archive_importer import import_archives
+from compact_dtypes import memory_report, format_memory_report, track_peak_memory, format_bytes
+from indicator_cache import get_indicator_cache
 from strategy import TradingStrategy
 from backtester import Backtester
+from sweep import DEFAULT_SPACES, parameter_grid, run_sweep
+from walk_forward import run_walk_forward
 from config import Config
 
 # 配置日志
@@ -23,53 +32,189 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def run_backtest(symbol, start_date, end_date, strategy_name='ma_crossover', initial_capital=10000):
-    """运行回测"""
-    logger.info(f"开始回测 {symbol} 从 {start_date} 到 {end_date}")
+def run_backtest(symbol, start_date, end_date, strategy_name='ma_crossover', initial_capital=10000,
+                 use_cache=None, compact=None, interval=None, trend_filter=None, risk=None):
+    """运行回测（risk 为 Backtester 的仓位/止损止盈/成交价参数）"""
+    interval = interval or Config.DEFAULT_INTERVAL
+    logger.info(f"开始回测 {symbol} 从 {start_date} 到 {end_date}, K线间隔 {interval}")
     logger.info(f"使用策略: {strategy_name}, 初始资金: ${initial_capital}")
     
-    # 获取历史数据
-    fetcher = CryptoDataFetcher()
-    df = fetcher.get_historical_data(symbol, start_date, end_date)
+    # 初始化策略
+    strategy = TradingStrategy(strategy_name, trend_filter=trend_filter, interval=interval)
+    
+    # 获取历史数据（开始日期前多取策略回看长度的K线用于指标预热）
+    fetcher = CryptoDataFetcher(use_cache=use_cache, compact=compact)
+    df = fetcher.get_historical_data(symbol, start_date, end_date, interval, warmup=strategy.lookback())
     
     if df is None or df.empty:
         logger.error("无法获取历史数据")
         return
     
     logger.info(f"成功获取 {len(df)} 条历史数据")
-    
-    # 初始化策略
-    strategy = TradingStrategy(strategy_name)
+    for endpoint, stats in fetcher.get_request_stats().items():
+        logger.info(f"API {endpoint}: 请求 {stats['requests']} 次, 重试 {stats['retries']} 次, "
+                    f"平均延迟 {stats['avg_latency'] * 1000:.0f}ms")
     
     # 运行回测
-    backtester = Backtester(initial_capital)
-    results = backtester.run(df, strategy)
+    backtester = Backtester(initial_capital, Config.COMMISSION, **(risk or {}))
+    if Config.TRACK_PEAK_MEMORY:
+        with track_peak_memory() as memory:
+            results = backtester.run(df, strategy, start=start_date)
+        logger.info(f"信号生成与回测峰值内存: {format_bytes(memory['peak_bytes'])}")
+    else:
+        results = backtester.run(df, strategy, start=start_date)
+    logger.info("行情与指标内存占用:\n" + format_memory_report(memory_report(results['price_data'])))
+    log_indicator_cache_stats()
     
     # 显示结果
     backtester.print_results(results)
     backtester.plot_results(results, symbol)
 
 
-def run_live_trading(symbol, strategy_name='ma_crossover', initial_capital=10000):
+def load_parameter_space(strategy_name, space_file=None):
+    """参数空间：JSON文件 {参数名: 取值列表}，默认 sweep.DEFAULT_SPACES"""
+    if space_file:
+        with open(space_file) as f:
+            return json.load(f)
+    return DEFAULT_SPACES[strategy_name]
+
+
+def run_parameter_sweep(symbol, start_date, end_date, strategy_name='ma_crossover', initial_capital=10000,
+                        space_file=None, output=None, workers=None, use_cache=None, compact=None,
+                        interval=None, trend_filter=None, risk=None):
+    """运行参数扫描（参数空间默认 sweep.DEFAULT_SPACES，结果CSV可断点续跑）"""
+    interval = interval or Config.DEFAULT_INTERVAL
+    space = load_parameter_space(strategy_name, space_file)
+    output = output or os.path.join(Config.SWEEP_OUTPUT_DIR,
+                                    f"{symbol}_{interval}_{strategy_name}_{start_date}_{end_date}.csv")
+    logger.info(f"开始参数扫描 {symbol} 从 {start_date} 到 {end_date}, K线间隔 {interval}, 策略: {strategy_name}")
+    logger.info(f"参数空间: {space}")
+    
+    # 预热长度取所有参数组合中最长的回看长度
+    warmup = max(TradingStrategy(strategy_name, trend_filter=trend_filter, interval=interval, params=params).lookback()
+                 for params in parameter_grid(space))
+    fetcher = CryptoDataFetcher(use_cache=use_cache, compact=compact)
+    df = fetcher.get_historical_data(symbol, start_date, end_date, interval, warmup=warmup)
+    
+    if df is None or df.empty:
+        logger.error("无法获取历史数据")
+        return
+    
+    logger.info(f"成功获取 {len(df)} 条历史数据")
+    backtester_kwargs = {'initial_capital': initial_capital, 'commission': Config.COMMISSION, **(risk or {})}
+    results = run_sweep(df, strategy_name, space, output, start=start_date, trend_filter=trend_filter,
+                        interval=interval, backtester_kwargs=backtester_kwargs, workers=workers)
+    
+    print("\n" + "="*60)
+    print(f"🔍 参数扫描结果（共 {len(results)} 组，前10名）")
+    print("="*60)
+    print(results.head(10).to_string(index=False))
+    print(f"\n完整结果: {output}\n")
+
+
+def run_walk_forward_optimization(symbol, start_date, end_date, strategy_name='ma_crossover',
+                                  initial_capital=10000, space_file=None, train=None, test=None,
+                                  anchored=False, workers=None, use_cache=None, compact=None,
+                                  interval=None, trend_filter=None, risk=None):
+    """运行滚动优化（训练窗口选参数、测试窗口检验，输出衔接后的样本外结果）"""
+    interval = interval or Config.DEFAULT_INTERVAL
+    train = train or Config.WALK_FORWARD_TRAIN
+    test = test or Config.WALK_FORWARD_TEST
+    space = load_parameter_space(strategy_name, space_file)
+    logger.info(f"开始滚动优化 {symbol} 从 {start_date} 到 {end_date}, K线间隔 {interval}, 策略: {strategy_name}")
+    logger.info(f"训练窗口: {train}, 测试窗口: {test}, {'锚定' if anchored else '滚动'}模式, 参数空间: {space}")
+    
+    warmup = max(TradingStrategy(strategy_name, trend_filter=trend_filter, interval=interval, params=params).lookback()
+                 for params in parameter_grid(space))
+    fetcher = CryptoDataFetcher(use_cache=use_cache, compact=compact)
+    df = fetcher.get_historical_data(symbol, start_date, end_date, interval, warmup=warmup)
+    
+    if df is None or df.empty:
+        logger.error("无法获取历史数据")
+        return
+    
+    logger.info(f"成功获取 {len(df)} 条历史数据")
+    backtester = Backtester(initial_capital, Config.COMMISSION, **(risk or {}))
+    backtester_kwargs = {'initial_capital': initial_capital, 'commission': Config.COMMISSION, **(risk or {})}
+    results = run_walk_forward(df, strategy_name, space, train, test, start=start_date, anchored=anchored,
+                               trend_filter=trend_filter, interval=interval,
+                               backtester_kwargs=backtester_kwargs, workers=workers)
+    
+    print("\n" + "="*60)
+    print(f"🔁 滚动优化窗口（共 {len(results['windows'])} 个）")
+    print("="*60)
+    print(results['windows'].to_string(index=False))
+    backtester.print_results(results)
+    backtester.plot_results(results, symbol)
+
+
+def log_indicator_cache_stats():
+    """输出指标缓存命中统计"""
+    cache = get_indicator_cache()
+    if cache is None:
+        return
+    stats = cache.get_stats()
+    logger.info(f"指标缓存: 内存命中 {stats['hits']} 次, 磁盘命中 {stats['disk_hits']} 次, "
+                f"未命中 {stats['misses']} 次, 命中率 {stats['hit_rate']:.0%}")
+
+
+def run_live_trading(symbol, strategy_name='ma_crossover', initial_capital=10000, stream=False,
+                     interval=None, trend_filter=None):
     """运行实时交易模拟"""
-    logger.info(f"开始实时交易模拟 {symbol}")
+    interval = interval or '1h'
+    logger.info(f"开始实时交易模拟 {symbol}, K线间隔 {interval}")
     logger.info(f"使用策略: {strategy_name}, 初始资金: ${initial_capital}")
     
     fetcher = CryptoDataFetcher()
-    strategy = TradingStrategy(strategy_name)
+    strategy = TradingStrategy(strategy_name, trend_filter=trend_filter, interval=interval)
     
-    # 获取最新数据
-    df = fetcher.get_realtime_data(symbol, limit=100)
+    if stream:
+        if trend_filter:
+            logger.error("行情流模式只支持流式指标，不支持趋势过滤")
+            return
+        run_live_stream(symbol, strategy, fetcher, interval)
+        return
+    
+    # 获取最新数据：最新一根K线（当前未收盘）加上信号所需的回看K线
+    limit = strategy.lookback() + 1
+    if limit > Config.KLINES_PAGE_LIMIT:
+        logger.warning(f"策略需要 {limit} 根K线，超过单次请求上限 {Config.KLINES_PAGE_LIMIT}")
+        limit = Config.KLINES_PAGE_LIMIT
+    df = fetcher.get_realtime_data(symbol, limit=limit, interval=interval)
     
     if df is None or df.empty:
         logger.error("无法获取实时数据")
         return
     
-    # 生成信号
-    signals = strategy.generate_signals(df)
+    report_live_signal(strategy.generate_signals(df))
+
+
+def run_live_stream(symbol, strategy, fetcher, interval='1h'):
+    """订阅WebSocket行情流，每根K线收盘时增量更新指标并生成信号"""
+    indicators = StreamingIndicatorSet()
+    # 回补的K线至少覆盖全部流式指标的回看长度
+    buffer_size = max(Config.STREAM_BUFFER_SIZE, StreamingIndicatorSet.lookback() + 1)
+    stream = KlineStream([symbol], interval=interval, buffer_size=buffer_size, fetcher=fetcher)
+    stream.start()
+    logger.info("已启动行情流，按 Ctrl+C 退出")
+    
+    try:
+        while True:
+            if stream.wait_for_bar(timeout=60):
+                # 只有新收盘的K线进入流式指标，不再对整个缓冲区重算
+                latest = indicators.feed(stream.get_frame(symbol))
+                report_live_signal(strategy.apply_strategy(latest))
+    except KeyboardInterrupt:
+        logger.info("停止实时交易模拟")
+    finally:
+        stream.stop()
+
+
+def report_live_signal(signals):
+    """根据最新K线的交易信号输出交易建议"""
     latest_signal = signals.iloc[-1]
     
-    logger.info(f"当前价格: ${df['close'].iloc[-1]:.2f}")
+    logger.info(f"当前价格: ${latest_signal['close']:.2f}")
     logger.info(f"交易信号: {latest_signal['signal']}")
     
     if latest_signal['signal'] == 'BUY':
@@ -94,14 +239,31 @@ def show_market_info(symbol):
         print("="*50 + "\n")
 
 
+def import_kline_archives(archive_dir):
+    """导入K线归档文件到本地缓存"""
+    logger.info(f"开始导入K线归档: {archive_dir}")
+    summary = import_archives(archive_dir)
+    
+    if not summary:
+        logger.error("没有导入任何K线数据")
+        return
+    
+    print("\n" + "="*50)
+    print("K线归档导入结果")
+    print("="*50)
+    for (sym, interval), bars in sorted(summary.items()):
+        print(f"{sym} {interval}: {bars} 条K线")
+    print("="*50 + "\n")
+
+
 def main():
     parser = argparse.ArgumentParser(description='加密货币量化交易系统')
-    parser.add_argument('--mode', choices=['backtest', 'live', 'info'], 
+    parser.add_argument('--mode', choices=['backtest', 'live', 'info', 'import', 'sweep', 'walkforward'], 
                        default='backtest', help='运行模式')
     parser.add_argument('--symbol', default='BTCUSDT', 
                        help='交易对符号 (例如: BTCUSDT, ETHUSDT)')
     parser.add_argument('--strategy', default='ma_crossover',
-                       choices=['ma_crossover', 'rsi', 'macd', 'combined'],
+                       choices=['ma_crossover', 'rsi', 'macd', 'bollinger', 'combined'],
                        help='交易策略')
     parser.add_argument('--start', default='2024-01-01', 
                        help='回测开始日期 (YYYY-MM-DD)')
@@ -109,20 +271,85 @@ def main():
                        help='回测结束日期 (YYYY-MM-DD)')
     parser.add_argument('--capital', type=float, default=10000,
                        help='初始资金')
+    parser.add_argument('--interval', default=None,
+                       help='K线间隔 (回测默认 Config.DEFAULT_INTERVAL，实时默认 1h)')
+    parser.add_argument('--trend-filter', default=None,
+                       help='趋势过滤指标列，收盘价在其之上才买入 (例如: ma_200@1d)')
+    parser.add_argument('--stop-loss', type=float, nargs='?', const=Config.STOP_LOSS_PCT, default=None,
+                       help=f'止损比例，按K线最低价盘中触发 (不带值为 {Config.STOP_LOSS_PCT})')
+    parser.add_argument('--take-profit', type=float, nargs='?', const=Config.TAKE_PROFIT_PCT, default=None,
+                       help=f'止盈比例，按K线最高价盘中触发 (不带值为 {Config.TAKE_PROFIT_PCT})')
+    parser.add_argument('--position-size', type=float, default=1.0,
+                       help=f'每次买入使用可用资金的比例 (Config.MAX_POSITION_SIZE 为 {Config.MAX_POSITION_SIZE})')
+    parser.add_argument('--fill-price', choices=['close', 'next_open'], default=None,
+                       help='信号成交价：当根收盘价或下一根开盘价（默认 Config.FILL_PRICE）')
+    parser.add_argument('--sweep-space', default=None,
+                       help='参数扫描的参数空间JSON文件 {参数名: [取值...]}（默认 sweep.DEFAULT_SPACES）')
+    parser.add_argument('--sweep-output', default=None,
+                       help='参数扫描结果CSV；文件已存在时跳过已完成的参数组合')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='参数扫描/滚动优化的进程数（默认 Config.SWEEP_WORKERS）')
+    parser.add_argument('--train-period', default=None,
+                       help='滚动优化的训练窗口长度，如 180D 或K线根数（默认 Config.WALK_FORWARD_TRAIN）')
+    parser.add_argument('--test-period', default=None,
+                       help='滚动优化的测试窗口长度（默认 Config.WALK_FORWARD_TEST）')
+    parser.add_argument('--anchored', action='store_true',
+                       help='滚动优化使用锚定模式（训练窗口从开始日期起逐步变长）')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='不使用本地K线缓存，全部从交易所下载')
+    parser.add_argument('--compact', action='store_true',
+                       help='使用float32紧凑数据类型，降低内存占用')
+    parser.add_argument('--archive-dir', default='data/archives',
+                       help='导入模式下K线归档文件(zip/csv)所在目录')
+    parser.add_argument('--stream', action='store_true',
+                       help='实时模式下订阅WebSocket行情流持续生成信号')
+    parser.add_argument('--indicator-backend', choices=['pandas', 'numpy'], default=None,
+                       help='指标计算后端（默认取 Config.INDICATOR_BACKEND）')
+    parser.add_argument('--indicator-cache-dir', default=None,
+                       help='指标缓存磁盘层目录，跨多次运行复用指标结果')
+    parser.add_argument('--track-memory', action='store_true',
+                       help='统计信号生成与回测的峰值内存（tracemalloc，会变慢）')
     
     args = parser.parse_args()
+    if args.indicator_backend:
+        Config.INDICATOR_BACKEND = args.indicator_backend
+    if args.indicator_cache_dir:
+        Config.INDICATOR_CACHE_DIR = args.indicator_cache_dir
+    if args.track_memory:
+        Config.TRACK_PEAK_MEMORY = True
     
     print("\n" + "="*60)
     print("🚀 加密货币量化交易系统")
     print("="*60 + "\n")
     
+    risk = {'position_size': args.position_size, 'stop_loss': args.stop_loss,
+            'take_profit': args.take_profit, 'fill_price': args.fill_price}
     if args.mode == 'backtest':
         run_backtest(args.symbol, args.start, args.end, 
-                    args.strategy, args.capital)
+                    args.strategy, args.capital,
+                    use_cache=False if args.no_cache else None,
+                    compact=True if args.compact else None,
+                    interval=args.interval, trend_filter=args.trend_filter, risk=risk)
+    elif args.mode == 'sweep':
+        run_parameter_sweep(args.symbol, args.start, args.end, args.strategy, args.capital,
+                            space_file=args.sweep_space, output=args.sweep_output, workers=args.workers,
+                            use_cache=False if args.no_cache else None,
+                            compact=True if args.compact else None,
+                            interval=args.interval, trend_filter=args.trend_filter, risk=risk)
+    elif args.mode == 'walkforward':
+        run_walk_forward_optimization(args.symbol, args.start, args.end, args.strategy, args.capital,
+                                      space_file=args.sweep_space, train=args.train_period,
+                                      test=args.test_period, anchored=args.anchored, workers=args.workers,
+                                      use_cache=False if args.no_cache else None,
+                                      compact=True if args.compact else None,
+                                      interval=args.interval, trend_filter=args.trend_filter, risk=risk)
     elif args.mode == 'live':
-        run_live_trading(args.symbol, args.strategy, args.capital)
+        run_live_trading(args.symbol, args.strategy, args.capital, stream=args.stream,
+                         interval=args.interval, trend_filter=args.trend_filter)
     elif args.mode == 'info':
         show_market_info(args.symbol)
+    elif args.mode == 'import':
+        import_kline_archives(args.archive_dir)
 
 
 if __name__ == '__main__':
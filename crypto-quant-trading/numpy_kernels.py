@@ -0,0 +1,449 @@
+"""
+NumPy滚动计算内核 - TechnicalIndicators 的纯NumPy后端
+
+所有内核直接在连续的float64数组上计算，沿第0轴（时间）滚动，输入可以是
+一维序列或二维 (时间 × 列) 数组，各列独立计算。NaN语义与pandas一致：
+窗口内含NaN时结果为NaN（rolling 的 min_periods 等于窗口长度）。
+
+- 滚动均值：分块前缀和相减，跨块的窗口补上前一块的总和，前缀和的量级
+  不随序列长度增长。
+- 滚动方差：分块前缀和。每块先减去块内均值再累加，二阶和的量级只与块内
+  波动有关，避免长序列上 sum(x^2) - n*mean^2 的相消误差。
+- 滚动最小/最大值：van Herk/Gil-Werman 分块前缀/后缀极值，O(n) 且全部向量化
+  （单调队列需要逐元素的Python循环，在NumPy中反而更慢）。
+- EMA：一阶线性递推 y[t] = d*y[t-1] + u[t] 的分块扫描，块内用缩放后的累加和
+  求解，块间的进位再递归求解。
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from config import Config
+
+BACKENDS = ('pandas', 'numpy')
+
+# 前缀和分块的最小长度（实际取 max(_CHUNK, 8*窗口长度)）
+_CHUNK = 256
+# 线性递推块内允许的最大缩放倍数（决定块长度）
+_MAX_SCALE = 1e12
+# 衰减系数小于该值时，递推直接按截断级数计算
+_TRUNCATE_DECAY = 1e-4
+
+
+def resolve_backend(backend=None):
+    """
+    解析指标计算后端
+
+    Args:
+        backend: 'pandas' 或 'numpy'，None表示使用 Config.INDICATOR_BACKEND
+
+    Returns:
+        str: 后端名称
+    """
+    backend = backend or Config.INDICATOR_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"未知指标计算后端: {backend}")
+    return backend
+
+
+def _as_float(x):
+    return np.asarray(x, dtype=np.float64)
+
+
+def _pad(x, front, back, value=np.nan):
+    """沿第0轴在前后填充常数"""
+    width = [(front, back)] + [(0, 0)] * (x.ndim - 1)
+    return np.pad(x, width, constant_values=value)
+
+
+def _fill_missing(x, missing):
+    """
+    用前一个有效值填充NaN（开头的NaN用首个有效值），只用于中心化计算，
+    含NaN的窗口结果最终仍置为NaN
+    """
+    rows = np.arange(x.shape[0]).reshape((-1,) + (1,) * (x.ndim - 1))
+    source = np.where(missing, 0, rows)
+    np.maximum.accumulate(source, axis=0, out=source)
+    filled = np.take_along_axis(x, source, axis=0)
+    first = np.take_along_axis(x, missing.argmin(axis=0)[None], axis=0)
+    filled = np.where(np.isnan(filled), first, filled)
+    return np.where(np.isnan(filled), 0.0, filled)
+
+
+def _window_count(mask, period):
+    """每个完整窗口（以第 period-1 行起结尾）内为True的个数"""
+    counts = np.cumsum(mask, axis=0, dtype=np.int64)
+    window = counts[period - 1:].copy()
+    window[1:] -= counts[:-period]
+    return window
+
+
+def _valid_bounds(missing):
+    """各列第一个和最后一个有效行（全部缺失的列为 n 和 n-1）"""
+    n = missing.shape[0]
+    has_value = ~missing.all(axis=0)
+    first = np.where(has_value, missing.argmin(axis=0), n)
+    last = np.where(has_value, n - 1 - missing[::-1].argmin(axis=0), n - 1)
+    return first, last
+
+
+def _incomplete_windows(missing, period):
+    """
+    每个完整窗口（以第 period-1 行起结尾）是否含缺失值
+
+    面板中缺失通常只出现在各列开头（上市前）和结尾（退市后），此时由首尾有效行
+    直接判断，不必对缺失标记做前缀计数；有中间缺失的数据回退到计数。
+    """
+    n = missing.shape[0]
+    first, last = _valid_bounds(missing)
+    if (missing.sum(axis=0) == first + (n - 1 - last)).all():
+        ends = np.arange(period - 1, n).reshape((-1,) + (1,) * (missing.ndim - 1))
+        return (ends < first + period - 1) | (ends > last)
+    return _window_count(missing, period) > 0
+
+
+def _chunk_segments(x, period):
+    """
+    把序列切成等长的块，每块前面带上 period-1 个重叠元素，
+    使得以块内任一位置结尾的窗口都完整落在该块的片段中
+
+    块越短，块内中心化后的数值越小，二阶和的相消误差越小；
+    块长取窗口的8倍，重叠带来的额外计算不超过1/8。
+
+    Returns:
+        ndarray: 片段视图 (块数, ..., 片段长度)
+    """
+    n = x.shape[0]
+    chunk = max(_CHUNK, 8 * period)
+    chunks = -(-n // chunk)
+    padded = _pad(x, period - 1, chunks * chunk - n, 0.0)
+    return sliding_window_view(padded, chunk + period - 1, axis=0)[::chunk]
+
+
+def _unchunk(values, n):
+    """把 (块数, ..., 块长) 的结果还原为沿第0轴的序列"""
+    values = np.moveaxis(values, -1, 1)
+    return values.reshape((-1,) + values.shape[2:])[:n]
+
+
+def _window_sums(segments, period):
+    """对片段沿最后一维做前缀和，返回每个窗口的和 (块数, ..., 块长)"""
+    prefix = np.empty(segments.shape[:-1] + (segments.shape[-1] + 1,))
+    prefix[..., 0] = 0.0
+    np.cumsum(segments, axis=-1, out=prefix[..., 1:])
+    return prefix[..., period:] - prefix[..., :-period]
+
+
+def _block_prefix(values, block):
+    """
+    块内前缀和：prefix[i] 为所在块起点到 i 的和，量级不超过 块长×价格
+
+    Returns:
+        tuple: (prefix 长度补齐到块长整数倍, 各块总和)
+    """
+    n = values.shape[0]
+    blocks = -(-n // block)
+    if blocks * block != n:
+        values = _pad(values, 0, blocks * block - n, 0.0)
+    prefix = np.cumsum(values.reshape((blocks, block) + values.shape[1:]), axis=1)
+    totals = prefix[:, -1].copy()
+    return prefix.reshape((-1,) + values.shape[1:]), totals
+
+
+def _prefix_window_mean(prefix, totals, block, period, n, out):
+    """
+    由块内前缀和求滚动均值，写入 out（长度 n-period+1，对应以第 period-1 行起结尾的窗口）
+
+    窗口和 = prefix[i] - prefix[i-period]，窗口起点在前一块时补上前一块的总和。
+    """
+    sums = np.empty(prefix.shape)
+    sums[:period] = prefix[:period]
+    np.subtract(prefix[period:], prefix[:-period], out=sums[period:])
+    blocked = sums.reshape((-1, block) + prefix.shape[1:])
+    blocked[1:, :period] += totals[:-1, None]
+    np.divide(sums[period - 1:n], period, out=out)
+
+
+def rolling_mean(x, period):
+    """
+    滚动均值（等价于 rolling(window=period).mean()）
+
+    Args:
+        x: 一维或二维数组（沿第0轴滚动）
+        period: 窗口长度
+
+    Returns:
+        ndarray: float64，与x形状相同
+    """
+    x = _as_float(x)
+    n = x.shape[0]
+    result = np.full(x.shape, np.nan)
+    if n < period:
+        return result
+
+    missing = np.isnan(x)
+    has_missing = missing.any()
+    block = max(_CHUNK, 8 * period)
+    prefix, totals = _block_prefix(np.where(missing, 0.0, x) if has_missing else x, block)
+
+    window = result[period - 1:]
+    _prefix_window_mean(prefix, totals, block, period, n, window)
+    if has_missing:
+        window[_incomplete_windows(missing, period)] = np.nan
+    return result
+
+
+def rolling_mean_grid(x, periods):
+    """
+    多个窗口长度的滚动均值，共用一次前缀和
+
+    Args:
+        x: 一维数组
+        periods: 窗口长度序列
+
+    Returns:
+        ndarray: (时间 × 窗口) float64 数组（列连续存储），第j列等于 rolling_mean(x, periods[j])
+    """
+    x = _as_float(x)
+    n = x.shape[0]
+    periods = [int(period) for period in periods]
+    result = np.full((n, len(periods)), np.nan, order='F')
+    if n == 0 or not periods:
+        return result
+
+    missing = np.isnan(x)
+    has_missing = missing.any()
+    block = max(_CHUNK, 8 * max(periods))
+    prefix, totals = _block_prefix(np.where(missing, 0.0, x) if has_missing else x, block)
+
+    for j, period in enumerate(periods):
+        if n < period:
+            continue
+        window = result[period - 1:, j]
+        _prefix_window_mean(prefix, totals, block, period, n, window)
+        if has_missing:
+            window[_incomplete_windows(missing, period)] = np.nan
+    return result
+
+
+def rolling_std(x, period, ddof=1):
+    """
+    滚动标准差（等价于 rolling(window=period).std(ddof=ddof)）
+
+    Args:
+        x: 一维或二维数组（沿第0轴滚动）
+        period: 窗口长度
+        ddof: 自由度修正
+
+    Returns:
+        ndarray: float64，与x形状相同
+    """
+    x = _as_float(x)
+    n = x.shape[0]
+    if n < period or period - ddof <= 0:
+        return np.full(x.shape, np.nan)
+
+    missing = np.isnan(x)
+    has_missing = missing.any()
+    segments = _chunk_segments(_fill_missing(x, missing) if has_missing else x, period)
+    # 每块减去块内均值，二阶和只包含块内的波动
+    centered = segments - segments.mean(axis=-1, keepdims=True)
+    s1 = _window_sums(centered, period)
+    np.square(centered, out=centered)
+    s2 = _window_sums(centered, period)
+
+    s1 *= s1
+    s1 /= period
+    s2 -= s1
+    np.maximum(s2, 0.0, out=s2)
+    s2 /= period - ddof
+    std = _unchunk(np.sqrt(s2, out=s2), n)
+
+    std[:period - 1] = np.nan
+    if has_missing:
+        std[period - 1:][_incomplete_windows(missing, period)] = np.nan
+    return std
+
+
+def _rolling_extreme(x, period, ufunc, fill):
+    """van Herk/Gil-Werman 滚动极值（ufunc 为 np.maximum 或 np.minimum）"""
+    x = _as_float(x)
+    n = x.shape[0]
+    result = np.full(x.shape, np.nan)
+    if n < period:
+        return result
+
+    missing = np.isnan(x)
+    has_missing = missing.any()
+    blocks = -(-n // period)
+    values = _pad(np.where(missing, fill, x) if has_missing else x, 0, blocks * period - n, fill)
+    values = values.reshape((blocks, period) + x.shape[1:])
+
+    # prefix[i]: 所在块起点到 i 的极值；suffix[i]: i 到所在块终点的极值
+    prefix = ufunc.accumulate(values, axis=1).reshape((-1,) + x.shape[1:])
+    suffix = ufunc.accumulate(values[:, ::-1], axis=1)[:, ::-1].reshape((-1,) + x.shape[1:])
+    ufunc(suffix[:n - period + 1], prefix[period - 1:n], out=result[period - 1:])
+
+    if has_missing:
+        result[period - 1:][_incomplete_windows(missing, period)] = np.nan
+    return result
+
+
+def rolling_max(x, period):
+    """
+    滚动最大值（等价于 rolling(window=period).max()）
+
+    Args:
+        x: 一维或二维数组（沿第0轴滚动）
+        period: 窗口长度
+
+    Returns:
+        ndarray: float64，与x形状相同
+    """
+    return _rolling_extreme(x, period, np.maximum, -np.inf)
+
+
+def rolling_min(x, period):
+    """
+    滚动最小值（等价于 rolling(window=period).min()）
+
+    Args:
+        x: 一维或二维数组（沿第0轴滚动）
+        period: 窗口长度
+
+    Returns:
+        ndarray: float64，与x形状相同
+    """
+    return _rolling_extreme(x, period, np.minimum, np.inf)
+
+
+def _linear_recurrence(u, decay):
+    """求解 y[t] = decay*y[t-1] + u[t]，y[-1] = 0（沿第0轴）"""
+    n = u.shape[0]
+    if decay == 0:
+        # 跨度为1的EMA：结果即输入本身
+        return u.copy()
+    if decay <= _TRUNCATE_DECAY:
+        # 衰减很快时，更早的项对结果的贡献低于浮点精度，直接截断
+        terms = int(np.ceil(np.log(1e-18) / np.log(decay)))
+        y = u.copy()
+        factor = 1.0
+        for lag in range(1, min(terms, n)):
+            factor *= decay
+            y[lag:] += factor * u[:-lag]
+        return y
+
+    block = max(2, int(np.log(_MAX_SCALE) / -np.log(decay)))
+    if n <= block:
+        block = n
+    blocks = -(-n // block)
+    if blocks * block != n:
+        u = _pad(u, 0, blocks * block - n, 0.0)
+    u_blocks = u.reshape((blocks, block) + u.shape[1:])
+
+    shape = (1, block) + (1,) * (u.ndim - 1)
+    powers = decay ** np.arange(block).reshape(shape)
+    # 块内解：local[j] = sum_{s<=j} decay^(j-s) * u[s]
+    local = u_blocks / powers
+    np.cumsum(local, axis=1, out=local)
+    local *= powers
+
+    if blocks > 1:
+        # 块末尾的值满足同样形式的递推，衰减为 decay^block
+        ends = _linear_recurrence(local[:, -1], decay ** block)
+        local[1:] += (powers * decay) * ends[:-1, None]
+    return local.reshape((-1,) + u.shape[1:])[:n]
+
+
+def ema(x, period):
+    """
+    指数移动平均（等价于 ewm(span=period, adjust=False).mean()）
+
+    支持开头的NaN（从第一个有效值开始计算）和结尾的NaN（沿用最后的值）；
+    含中间缺失值的列按pandas的缺失值衰减规则逐列回退到pandas计算。
+
+    Args:
+        x: 一维或二维数组（沿第0轴）
+        period: 跨度
+
+    Returns:
+        ndarray: float64，与x形状相同
+    """
+    x = _as_float(x)
+    n = x.shape[0]
+    if n == 0:
+        return x.copy()
+    alpha = 2.0 / (period + 1)
+    decay = 1.0 - alpha
+
+    missing = np.isnan(x)
+    if not missing.any():
+        u = x * alpha
+        u[0] = x[0]  # adjust=False: y[0] = x[0]
+        return _linear_recurrence(u, decay)
+
+    columns = x.reshape(n, -1)
+    missing = missing.reshape(n, -1)
+    has_value = ~missing.all(axis=0)
+    first = np.where(has_value, missing.argmin(axis=0), n)
+    last = np.where(has_value, n - 1 - missing[::-1].argmin(axis=0), -1)
+    rows = np.arange(n)[:, None]
+    inside = (rows >= first) & (rows <= last)
+    gaps = (missing & inside).any(axis=0)
+
+    # 开头NaN用首个有效值代替（y保持为该值），结尾NaN由最后的值前向填充
+    first_value = columns[np.minimum(first, n - 1), np.arange(columns.shape[1])]
+    filled = np.where(rows < first, first_value, columns)
+    filled = np.where(rows > last, 0.0, filled)
+    u = alpha * filled
+    u[0] += decay * filled[0]
+    y = _linear_recurrence(np.where(missing & inside, 0.0, u), decay)
+
+    last_value = y[np.maximum(last, 0), np.arange(columns.shape[1])]
+    y = np.where(rows > last, last_value, y)
+    y[(rows < first) | ~has_value] = np.nan
+
+    if gaps.any():
+        for col in np.flatnonzero(gaps):
+            y[:, col] = pd.Series(columns[:, col]).ewm(span=period, adjust=False).mean().to_numpy()
+    return y.reshape(x.shape)
+
+
+def ema_grid(x, periods):
+    """
+    多个跨度的EMA
+
+    Args:
+        x: 一维数组
+        periods: 跨度序列
+
+    Returns:
+        ndarray: (时间 × 跨度) float64 数组（列连续存储），第j列等于 ema(x, periods[j])
+    """
+    x = _as_float(x)
+    result = np.empty((x.shape[0], len(periods)), order='F')
+    for j, period in enumerate(periods):
+        result[:, j] = ema(x, period)
+    return result
+
+
+def diff(x):
+    """一阶差分，首行为NaN（等价于 Series.diff()）"""
+    x = _as_float(x)
+    result = np.empty_like(x)
+    if len(x) == 0:
+        return result
+    result[0] = np.nan
+    np.subtract(x[1:], x[:-1], out=result[1:])
+    return result
+
+
+def shift(x):
+    """向后移动一行，首行为NaN（等价于 Series.shift()）"""
+    x = _as_float(x)
+    result = np.empty_like(x)
+    if len(x) == 0:
+        return result
+    result[0] = np.nan
+    result[1:] = x[:-1]
+    return result
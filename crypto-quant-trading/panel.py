@@ -0,0 +1,97 @@
+"""
+面板数据模块 - 多个交易对对齐为 (时间 × 交易对) 的二维数据
+
+面板是两级列索引 (field, symbol) 的DataFrame：panel['close'] 即为
+(时间 × 交易对) 的收盘价矩阵。各交易对按时间并集对齐，上市前、退市后
+以及缺失的K线填NaN。TechnicalIndicators 的各指标函数可以直接传入面板，
+所有交易对一次向量化计算，返回同样布局的 (时间 × 交易对) DataFrame。
+"""
+
+import pandas as pd
+from kline_store import OHLCV_COLUMNS
+
+PANEL_LEVELS = ['field', 'symbol']
+
+
+def build_panel(frames, fields=None):
+    """
+    把多个交易对的OHLCV数据对齐为面板
+
+    Args:
+        frames: {交易对: DataFrame}，如 AsyncCryptoDataFetcher.gather 的返回值，
+                值为None的交易对跳过
+        fields: 保留的列，默认 OHLCV 五列
+
+    Returns:
+        DataFrame: 列为 (field, symbol) 两级索引、按时间升序的面板
+    """
+    fields = list(fields or OHLCV_COLUMNS)
+    frames = {symbol: df[fields] for symbol, df in frames.items() if df is not None}
+    if not frames:
+        raise ValueError("没有可用于构建面板的数据")
+
+    panel = pd.concat(frames, axis=1, names=['symbol', 'field']).sort_index()
+    columns = pd.MultiIndex.from_product([fields, list(frames)], names=PANEL_LEVELS)
+    return panel.swaplevel(axis=1).reindex(columns=columns)
+
+
+def is_panel(data):
+    """数据是否为 (field, symbol) 两级列索引的面板"""
+    return isinstance(data.columns, pd.MultiIndex) and list(data.columns.names) == PANEL_LEVELS
+
+
+def panel_symbols(panel):
+    """面板中的交易对（按列顺序）"""
+    return panel.columns.unique(level='symbol')
+
+
+def wrap_values(values, data, name=None, copy=False):
+    """
+    数组结果包装为与输入相同的布局
+
+    Args:
+        values: 一维数组（单交易对）或二维 (时间 × 交易对) 数组
+        data: 输入的DataFrame或面板
+        name: 一维结果的Series名称
+        copy: 是否复制数组
+
+    Returns:
+        Series 或 (时间 × 交易对) DataFrame
+    """
+    if values.ndim > 1:
+        return pd.DataFrame(values, index=data.index, columns=panel_symbols(data), copy=copy)
+    return pd.Series(values, index=data.index, name=name, copy=copy)
+
+
+def add_fields(panel, fields):
+    """
+    向面板追加 (时间 × 交易对) 字段，同名字段被替换
+
+    Args:
+        panel: 面板
+        fields: {字段名: DataFrame}，列为交易对
+
+    Returns:
+        DataFrame: 新面板
+    """
+    if not fields:
+        return panel.copy()
+    existing = panel.drop(columns=list(fields), level='field', errors='ignore')
+    added = pd.concat(fields, axis=1, names=PANEL_LEVELS)
+    return pd.concat([existing, added], axis=1)
+
+
+def cross_section(panel, timestamp=None):
+    """
+    取某一时刻所有交易对的截面，用于横截面筛选和排序
+
+    Args:
+        panel: 面板（可含指标字段）
+        timestamp: 时间戳，默认最后一根K线
+
+    Returns:
+        DataFrame: 行为交易对、列为字段；该时刻没有数据的交易对不包含在内
+    """
+    timestamp = panel.index[-1] if timestamp is None else timestamp
+    row = panel.loc[timestamp].unstack('field')
+    return row.dropna(how='all')[list(panel.columns.unique(level='field'))]
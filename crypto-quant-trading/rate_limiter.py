@@ -0,0 +1,97 @@
+"""
+API限流模块 - 基于请求权重的令牌桶
+"""
+
+import time
+import asyncio
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WeightRateLimiter:
+    """基于请求权重的令牌桶限流器（线程安全）"""
+
+    # 币安在响应头中返回当前1分钟窗口内该IP已使用的权重
+    USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+
+    def __init__(self, weight_limit=6000, window_seconds=60, safety_ratio=0.9):
+        """
+        初始化限流器
+
+        Args:
+            weight_limit: 每个窗口允许的请求权重上限
+            window_seconds: 窗口长度（秒）
+            safety_ratio: 安全系数，只使用上限的这一比例
+        """
+        self.capacity = weight_limit * safety_ratio
+        self.refill_rate = self.capacity / window_seconds
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def acquire(self, weight=1):
+        """
+        获取指定权重的令牌，不足时阻塞等待
+
+        Args:
+            weight: 本次请求的权重
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = (weight - self.tokens) / self.refill_rate
+            time.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """
+        根据交易所返回的已用权重校正剩余令牌
+
+        服务端统计包含本进程之外的请求，只在其更保守时下调本地令牌。
+
+        Args:
+            headers: HTTP响应头
+        """
+        used = headers.get(self.USED_WEIGHT_HEADER)
+        if used is None:
+            return
+        try:
+            remaining = self.capacity - float(used)
+        except ValueError:
+            return
+
+        with self._lock:
+            self._refill()
+            if remaining < self.tokens:
+                self.tokens = remaining
+                if remaining <= 0:
+                    logger.warning(f"API权重接近上限: 已使用 {used}")
+
+
+class AsyncWeightRateLimiter(WeightRateLimiter):
+    """令牌桶限流器的asyncio版本，等待时不阻塞事件循环"""
+
+    async def acquire(self, weight=1):
+        """
+        获取指定权重的令牌，不足时异步等待
+
+        Args:
+            weight: 本次请求的权重
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = (weight - self.tokens) / self.refill_rate
+            await asyncio.sleep(wait)
@@ -0,0 +1,157 @@
+"""
+K线重采样模块 - 用细粒度K线（如1m）合成任意更粗的K线间隔
+
+分桶边界与币安一致：分钟/小时/日K线按UTC时间自Unix纪元对齐，周K线从周一
+00:00 (UTC) 开始，月K线按自然月。每个桶取 首个开盘价、最高价、最低价、
+最后收盘价、成交量之和。
+
+多周期指标用 closed_bar_positions 把更高周期K线按收盘时间对齐回基础K线。
+"""
+
+import numpy as np
+import pandas as pd
+from kline_store import OHLCV_COLUMNS, INTERVAL_MS, interval_to_ms
+
+_DAY_MS = 24 * 60 * 60 * 1000
+_WEEK_MS = 7 * _DAY_MS
+_FIRST_MONDAY_MS = 4 * _DAY_MS  # 1970-01-05 是纪元后的第一个周一
+
+
+def bucket_starts(timestamps, interval):
+    """
+    计算每根K线所属的目标间隔K线的开盘时间
+
+    Args:
+        timestamps: 开盘时间戳数组（毫秒，int64）
+        interval: 目标K线间隔 (5m, 1h, 4h, 1d, 1w, 1M等)
+
+    Returns:
+        ndarray: 桶开盘时间戳（毫秒，int64）
+    """
+    if interval == '1w':
+        return (timestamps - _FIRST_MONDAY_MS) // _WEEK_MS * _WEEK_MS + _FIRST_MONDAY_MS
+    if interval == '1M':
+        months = timestamps.astype('datetime64[ms]').astype('datetime64[M]')
+        return months.astype('datetime64[ms]').astype(np.int64)
+
+    interval_ms = interval_to_ms(interval)
+    if interval_ms is None:
+        raise ValueError(f"不支持重采样到K线间隔: {interval}")
+    return timestamps // interval_ms * interval_ms
+
+
+def _bucket_end(starts, interval):
+    """桶的结束时间（下一个桶的开盘时间）"""
+    if interval == '1w':
+        return starts + _WEEK_MS
+    if interval == '1M':
+        months = starts.astype('datetime64[ms]').astype('datetime64[M]') + 1
+        return months.astype('datetime64[ms]').astype(np.int64)
+    return starts + interval_to_ms(interval)
+
+
+def resample_ohlcv(df, interval, base_interval='1m', trim_partial=True):
+    """
+    把OHLCV数据重采样到更粗的K线间隔（全部为向量化运算）
+
+    Args:
+        df: 按时间升序、以时间戳为索引的OHLCV数据
+        interval: 目标K线间隔
+        base_interval: 输入数据的K线间隔，用于判断首尾桶是否完整
+        trim_partial: 是否丢弃首尾不完整的桶（数据从桶中间开始或在桶结束前截止）
+
+    Returns:
+        DataFrame: 目标间隔的OHLCV数据
+    """
+    if df.empty:
+        return df[OHLCV_COLUMNS].iloc[:0]
+
+    timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    buckets = bucket_starts(timestamps, interval)
+
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    ends = np.append(starts[1:], len(buckets)) - 1
+
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    volume = df['volume'].to_numpy()
+
+    bucket_ts = buckets[starts]
+    result = pd.DataFrame({
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(high, starts),
+        'low': np.minimum.reduceat(low, starts),
+        'close': df['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(volume, starts)
+    }, index=pd.DatetimeIndex(pd.to_datetime(bucket_ts, unit='ms'), name='timestamp'))
+
+    if trim_partial:
+        base_ms = interval_to_ms(base_interval)
+        keep = np.ones(len(result), dtype=bool)
+        # 首桶：数据晚于桶开盘时间才开始
+        if timestamps[0] > bucket_ts[0]:
+            keep[0] = False
+        # 尾桶：最后一根K线收盘早于桶结束
+        if base_ms is not None and timestamps[-1] + base_ms < _bucket_end(bucket_ts[-1:], interval)[0]:
+            keep[-1] = False
+        result = result[keep]
+
+    return result
+
+
+
+def interval_span_ms(interval):
+    """
+    K线间隔的最长跨度（毫秒），周K线为7天，月K线按31天
+
+    Args:
+        interval: K线间隔
+
+    Returns:
+        int: 毫秒数
+    """
+    span = {'1w': _WEEK_MS, '1M': 31 * _DAY_MS}.get(interval) or interval_to_ms(interval)
+    if span is None:
+        raise ValueError(f"不支持的K线间隔: {interval}")
+    return span
+
+
+def infer_interval(index):
+    """
+    由时间索引推断K线间隔（相邻K线的最小间距）
+
+    Args:
+        index: 按时间升序的DatetimeIndex
+
+    Returns:
+        str: K线间隔，无法推断时返回None
+    """
+    if len(index) < 2:
+        return None
+    steps = np.diff(index.values.astype('datetime64[ms]').astype(np.int64))
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return None
+    step = steps.min()
+    return next((interval for interval, ms in INTERVAL_MS.items() if ms == step), None)
+
+
+def closed_bar_positions(index, base_interval, bar_index, interval):
+    """
+    每根基础K线收盘时，最近一根已经收盘的更高周期K线的位置
+
+    更高周期K线在收盘后才可用：只有基础K线的收盘时间不早于它的收盘时间时才能看到，
+    对齐结果不含未来信息。
+
+    Args:
+        index: 基础K线的开盘时间索引
+        base_interval: 基础K线间隔
+        bar_index: 更高周期K线的开盘时间索引（按时间升序）
+        interval: 更高周期K线间隔
+
+    Returns:
+        ndarray: int64位置数组，-1 表示此时还没有已收盘的更高周期K线
+    """
+    base_close = index.values.astype('datetime64[ms]').astype(np.int64) + interval_to_ms(base_interval)
+    bar_close = _bucket_end(bar_index.values.astype('datetime64[ms]').astype(np.int64), interval)
+    return np.searchsorted(bar_close, base_close, side='right') - 1
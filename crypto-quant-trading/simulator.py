@@ -0,0 +1,212 @@
+"""
+路径相关的回测模拟器
+
+止损止盈、部分仓位、下一根开盘成交等规则依赖逐根K线的持仓状态，无法像
+Backtester 的全仓回测那样纯数组化。这里在连续的 open/high/low/close/信号
+数组上运行一个紧凑循环：安装了 numba 时JIT编译，否则把数组转为列表后以
+纯Python执行同一函数（仍比 iterrows 快两个数量级）。
+
+规则：
+- 信号成交价 'close' 为信号所在K线收盘价，'next_open' 为下一根K线开盘价
+  （最后一根K线的信号不成交）
+- 止损/止盈按入场价计算触发价，用K线最低/最高价判断盘中触发；同一根K线
+  同时触及时按止损处理，跳空越过触发价时按开盘价成交
+- 每根K线记录盘中成交（开盘成交、止损止盈）之后、收盘信号成交之前的状态，
+  全仓、收盘成交、不设止损止盈时与 Backtester 的全仓回测结果完全一致
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from config import Config
+from strategy import SIGNAL_BUY, SIGNAL_SELL
+
+try:
+    from numba import njit
+except ImportError:  # numba 为可选依赖
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+FILL_PRICES = ('close', 'next_open')
+
+# 成交记录中的方向/平仓原因编码
+SIDE_BUY, EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT = 1, -1, -2, -3
+
+
+def _simulate_path(open_, high, low, close, signals, capital, commission, position_size,
+                   stop_loss, take_profit, next_open,
+                   capital_out, position_out, trade_bar, trade_side, trade_price, trade_quantity, trade_value):
+    """
+    逐根K线模拟持仓（输入为数组或列表，输出写入预分配的缓冲区）
+
+    Returns:
+        tuple: (最终资金, 最终持仓数量, 成交笔数)
+    """
+    position = 0.0
+    entry_price = 0.0
+    pending = 0
+    num_trades = 0
+    for i in range(len(close)):
+        # 上一根K线的信号在开盘成交
+        if pending == SIGNAL_BUY and position == 0.0:
+            spend = capital * position_size
+            position = spend / open_[i] * (1 - commission)
+            capital = capital - spend
+            entry_price = open_[i]
+            trade_bar[num_trades] = i
+            trade_side[num_trades] = SIDE_BUY
+            trade_price[num_trades] = open_[i]
+            trade_quantity[num_trades] = position
+            trade_value[num_trades] = position * open_[i]
+            num_trades += 1
+        elif pending == SIGNAL_SELL and position > 0.0:
+            proceeds = position * open_[i] * (1 - commission)
+            capital = capital + proceeds
+            trade_bar[num_trades] = i
+            trade_side[num_trades] = EXIT_SIGNAL
+            trade_price[num_trades] = open_[i]
+            trade_quantity[num_trades] = position
+            trade_value[num_trades] = proceeds
+            num_trades += 1
+            position = 0.0
+        pending = 0
+
+        # 盘中止损/止盈
+        if position > 0.0:
+            exit_price = 0.0
+            side = 0
+            if stop_loss > 0.0 and low[i] <= entry_price * (1 - stop_loss):
+                exit_price = min(open_[i], entry_price * (1 - stop_loss))
+                side = EXIT_STOP_LOSS
+            elif take_profit > 0.0 and high[i] >= entry_price * (1 + take_profit):
+                exit_price = max(open_[i], entry_price * (1 + take_profit))
+                side = EXIT_TAKE_PROFIT
+            if side != 0:
+                proceeds = position * exit_price * (1 - commission)
+                capital = capital + proceeds
+                trade_bar[num_trades] = i
+                trade_side[num_trades] = side
+                trade_price[num_trades] = exit_price
+                trade_quantity[num_trades] = position
+                trade_value[num_trades] = proceeds
+                num_trades += 1
+                position = 0.0
+
+        capital_out[i] = capital
+        position_out[i] = position
+
+        # 收盘信号
+        signal = signals[i]
+        if next_open:
+            pending = signal
+        elif signal == SIGNAL_BUY and position == 0.0:
+            spend = capital * position_size
+            position = spend / close[i] * (1 - commission)
+            capital = capital - spend
+            entry_price = close[i]
+            trade_bar[num_trades] = i
+            trade_side[num_trades] = SIDE_BUY
+            trade_price[num_trades] = close[i]
+            trade_quantity[num_trades] = position
+            trade_value[num_trades] = position * close[i]
+            num_trades += 1
+        elif signal == SIGNAL_SELL and position > 0.0:
+            proceeds = position * close[i] * (1 - commission)
+            capital = capital + proceeds
+            trade_bar[num_trades] = i
+            trade_side[num_trades] = EXIT_SIGNAL
+            trade_price[num_trades] = close[i]
+            trade_quantity[num_trades] = position
+            trade_value[num_trades] = proceeds
+            num_trades += 1
+            position = 0.0
+    return capital, position, num_trades
+
+
+_simulate_path_jit = njit(cache=True)(_simulate_path) if njit is not None else None
+
+
+def jit_available():
+    """是否安装了numba（可JIT编译模拟循环）"""
+    return _simulate_path_jit is not None
+
+
+def simulate(data, signals, initial_capital, commission, position_size=1.0, stop_loss=None,
+             take_profit=None, fill_price='close'):
+    """
+    按信号编码模拟交易
+
+    Args:
+        data: DataFrame包含 open/high/low/close 列（只用收盘成交且不设止损止盈时只需 close）
+        signals: 信号编码数组（1买入，-1卖出，0持有），见 strategy.signal_codes
+        initial_capital: 初始资金
+        commission: 手续费率
+        position_size: 每次买入使用可用资金的比例 (0, 1]
+        stop_loss: 止损比例（如0.05），None为不止损
+        take_profit: 止盈比例（如0.15），None为不止盈
+        fill_price: 信号成交价，'close' 或 'next_open'
+
+    Returns:
+        tuple: (组合价值 DataFrame [timestamp/value/capital/position/price], 交易记录列表)
+    """
+    if fill_price not in FILL_PRICES:
+        raise ValueError(f"未知的成交价类型: {fill_price}（可选 {', '.join(FILL_PRICES)}）")
+    if not 0 < position_size <= 1:
+        raise ValueError(f"仓位比例需在 (0, 1] 之间: {position_size}")
+
+    # 紧凑模式下价格为float32，资金计算统一使用float64
+    close = data['close'].to_numpy(dtype=np.float64)
+    intrabar = stop_loss or take_profit or fill_price == 'next_open'
+    columns = [data[c].to_numpy(dtype=np.float64) if intrabar else close for c in ('open', 'high', 'low')]
+    signals = np.ascontiguousarray(signals, dtype=np.int8)
+
+    n = len(close)
+    # 每根K线最多两笔成交：开盘成交或盘中平仓一笔，收盘信号成交一笔
+    buffers = [np.empty(n), np.empty(n), np.empty(2 * n, dtype=np.int64), np.empty(2 * n, dtype=np.int8),
+               np.empty(2 * n), np.empty(2 * n), np.empty(2 * n)]
+    args = (float(initial_capital), float(commission), float(position_size),
+            float(stop_loss or 0.0), float(take_profit or 0.0), fill_price == 'next_open')
+    if jit_available() and Config.SIMULATOR_JIT:
+        _, position, num_trades = _simulate_path_jit(*columns, close, signals, *args, *buffers)
+    else:
+        lists = [[0] * len(buffer) for buffer in buffers]
+        _, position, num_trades = _simulate_path(*[a.tolist() for a in (*columns, close, signals)],
+                                                 *args, *lists)
+        for buffer, values in zip(buffers, lists):
+            buffer[:] = values
+
+    capital_out, position_out, bars, sides, prices, quantities, values = buffers
+    pv_df = pd.DataFrame({
+        'timestamp': data.index,
+        'value': capital_out + position_out * close,
+        'capital': capital_out,
+        'position': position_out,
+        'price': close
+    })
+
+    trades = [{
+        'timestamp': data.index[bar],
+        'type': 'BUY' if side == SIDE_BUY else 'SELL',
+        'price': price,
+        'quantity': quantity,
+        'value': value
+    } for bar, side, price, quantity, value in zip(bars[:num_trades].tolist(), sides[:num_trades].tolist(),
+                                                    prices[:num_trades].tolist(),
+                                                    quantities[:num_trades].tolist(),
+                                                    values[:num_trades].tolist())]
+
+    # 如果最后还有持仓，按最后价格卖出
+    if position > 0:
+        trades.append({
+            'timestamp': data.index[-1],
+            'type': 'SELL',
+            'price': float(close[-1]),
+            'quantity': position,
+            'value': position * float(close[-1]) * (1 - commission)
+        })
+
+    exits = sides[:num_trades]
+    logger.info(f"模拟成交 {len(trades)} 笔 - 止损平仓: {(exits == EXIT_STOP_LOSS).sum()}, "
+                f"止盈平仓: {(exits == EXIT_TAKE_PROFIT).sum()}")
+    return pv_df, trades
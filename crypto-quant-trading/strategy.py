@@ -4,27 +4,111 @@
 
 import pandas as pd
 import numpy as np
-from indicators import TechnicalIndicators
+from config import Config
+from indicators import TechnicalIndicators, rsi_column, macd_columns, bollinger_columns
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 信号矩阵中的信号编码
+SIGNAL_SELL, SIGNAL_HOLD, SIGNAL_BUY = -1, 0, 1
+_SIGNAL_LABELS = np.array(['SELL', 'HOLD', 'BUY'], dtype=object)
+
+
+def signal_labels(codes):
+    """
+    信号编码转换为 'BUY'/'SELL'/'HOLD' 标签
+
+    Args:
+        codes: 信号编码数组（-1卖出，0持有，1买入）
+
+    Returns:
+        ndarray: 标签数组
+    """
+    return _SIGNAL_LABELS[np.asarray(codes) + 1]
+
+
+def signal_codes(labels):
+    """
+    'BUY'/'SELL'/'HOLD' 标签转换为信号编码
+    
+    Args:
+        labels: 标签数组或Series
+    
+    Returns:
+        ndarray: int8 信号编码（-1卖出，0持有，1买入）
+    """
+    labels = np.asarray(labels)
+    return _signal_codes(labels == 'BUY', labels == 'SELL')
+
+
+def _previous_row(values):
+    """二维数组整体下移一行，首行为NaN（等价于逐列 shift(1)）"""
+    previous = np.empty_like(values)
+    previous[:1] = np.nan
+    previous[1:] = values[:-1]
+    return previous
+
+
+def _signal_codes(buy, sell):
+    codes = np.zeros(buy.shape, dtype=np.int8)
+    codes[buy] = SIGNAL_BUY
+    codes[sell] = SIGNAL_SELL
+    return codes
+
 
 class TradingStrategy:
     """交易策略类"""
     
-    def __init__(self, strategy_name='ma_crossover'):
+    # 各策略的参数及默认值（参数扫描时逐个覆盖）
+    DEFAULT_PARAMS = {
+        'ma_crossover': {'short_period': Config.MA_SHORT_PERIOD, 'long_period': Config.MA_LONG_PERIOD},
+        'rsi': {'rsi_period': Config.RSI_PERIOD, 'oversold': Config.RSI_OVERSOLD,
+                'overbought': Config.RSI_OVERBOUGHT},
+        'macd': {'fast_period': Config.MACD_FAST, 'slow_period': Config.MACD_SLOW,
+                 'signal_period': Config.MACD_SIGNAL},
+        'bollinger': {'bb_period': Config.BOLLINGER_PERIOD, 'bb_std': Config.BOLLINGER_STD},
+        'combined': {'short_period': Config.MA_SHORT_PERIOD, 'long_period': Config.MA_LONG_PERIOD,
+                     'mid_period': Config.MA_MID_PERIOD, 'rsi_period': Config.RSI_PERIOD,
+                     'oversold': Config.RSI_OVERSOLD, 'overbought': Config.RSI_OVERBOUGHT,
+                     'fast_period': Config.MACD_FAST, 'slow_period': Config.MACD_SLOW,
+                     'signal_period': Config.MACD_SIGNAL}
+    }
+    
+    # 各策略读取的指标（键见 indicator_columns），generate_signals 只计算这些列
+    REQUIRED_INDICATORS = {
+        'ma_crossover': ['ma_short', 'ma_long'],
+        'rsi': ['rsi'],
+        'macd': ['macd', 'macd_signal'],
+        'bollinger': ['bb_upper', 'bb_lower'],
+        'combined': ['ma_short', 'ma_long', 'ma_mid', 'rsi', 'macd', 'macd_signal', 'macd_histogram']
+    }
+    
+    def __init__(self, strategy_name='ma_crossover', trend_filter=None, interval=None, params=None):
         """
         初始化交易策略
         
         Args:
             strategy_name: 策略名称
+            trend_filter: 趋势过滤指标列，通常为更高周期的均线（如 ma_200@1d），
+                          收盘价不高于该值时不产生买入信号；None为不过滤
+            interval: 输入数据的K线间隔，默认由时间索引推断（回看长度默认按 Config.DEFAULT_INTERVAL）
+            params: 覆盖 DEFAULT_PARAMS 的策略参数，如 {'short_period': 10, 'long_period': 50}
         """
         self.strategy_name = strategy_name
+        self.trend_filter = trend_filter
+        self.interval = interval
+        defaults = self.DEFAULT_PARAMS.get(strategy_name, {})
+        unknown = set(params or {}) - set(defaults)
+        if unknown:
+            raise ValueError(f"策略 {strategy_name} 不支持参数: {', '.join(sorted(unknown))}")
+        self.params = {**defaults, **(params or {})}
+        self.columns = self.indicator_columns()
         self.strategies = {
             'ma_crossover': self.ma_crossover_strategy,
             'rsi': self.rsi_strategy,
             'macd': self.macd_strategy,
+            'bollinger': self.bollinger_strategy,
             'combined': self.combined_strategy
         }
     
@@ -42,12 +126,71 @@ class TradingStrategy:
             logger.error(f"未知策略: {self.strategy_name}")
             return data
         
-        # 添加技术指标
-        df = TechnicalIndicators.add_all_indicators(data)
+        # 只添加策略用到的技术指标
+        df = TechnicalIndicators.add_indicators(data, self.required_indicators(), interval=self.interval)
         
         # 应用策略
-        df = self.strategies[self.strategy_name](df)
+        return self.apply_strategy(df)
+    
+    def indicator_columns(self):
+        """
+        策略参数对应的指标列名（默认参数时为 ma_7、rsi、macd 等标准列名）
         
+        Returns:
+            dict: 指标 -> 列名，如 {'ma_short': 'ma_7', 'rsi': 'rsi_21'}
+        """
+        p = self.params
+        columns = {}
+        for key, param in (('ma_short', 'short_period'), ('ma_long', 'long_period'), ('ma_mid', 'mid_period')):
+            if param in p:
+                columns[key] = f"ma_{p[param]}"
+        if 'rsi_period' in p:
+            columns['rsi'] = rsi_column(p['rsi_period'])
+        if 'fast_period' in p:
+            names = macd_columns(p['fast_period'], p['slow_period'], p['signal_period'])
+            columns.update(zip(('macd', 'macd_signal', 'macd_histogram'), names))
+        if 'bb_period' in p:
+            names = bollinger_columns(p['bb_period'], p['bb_std'])
+            columns.update(zip(('bb_upper', 'bb_middle', 'bb_lower'), names))
+        return columns
+    
+    def required_indicators(self):
+        """
+        当前策略需要的指标列
+        
+        Returns:
+            list: 指标列名
+        """
+        columns = [self.columns[key] for key in self.REQUIRED_INDICATORS.get(self.strategy_name, [])]
+        if self.trend_filter and self.trend_filter not in columns:
+            columns.append(self.trend_filter)
+        return columns
+    
+    def lookback(self):
+        """
+        信号有效所需的历史K线数：指标回看长度，加上交叉判断用到的前一根K线
+        
+        Returns:
+            int: 回看K线数（回测预热、实时模式请求的K线数由此决定）
+        """
+        return TechnicalIndicators.lookback(self.required_indicators(), self.interval) + 1
+    
+    def apply_strategy(self, data):
+        """
+        对已包含技术指标的数据应用策略（指标由调用方计算，例如流式指标）
+        
+        Args:
+            data: DataFrame包含OHLCV数据和 required_indicators() 中的指标列
+        
+        Returns:
+            DataFrame: 添加了交易信号的数据
+        """
+        df = self.strategies[self.strategy_name](data)
+        if self.trend_filter:
+            # 趋势过滤：收盘价在过滤线之上（过滤值无效时视为不满足）才允许买入
+            blocked = (df['signal'] == 'BUY') & ~(df['close'] > df[self.trend_filter])
+            df.loc[blocked, 'signal'] = 'HOLD'
+            logger.info(f"趋势过滤 ({self.trend_filter}) - 屏蔽买入信号: {blocked.sum()}")
         return df
     
     def ma_crossover_strategy(self, data):
@@ -62,16 +205,17 @@ class TradingStrategy:
         Returns:
             DataFrame: 添加了信号的数据
         """
-        df = data.copy()
+        df = data.copy(deep=False)  # 只新增 signal 列，输入列写时复制共享
+        short, long = df[self.columns['ma_short']], df[self.columns['ma_long']]
         
         # 初始化信号
         df['signal'] = 'HOLD'
         
         # 金叉：短期均线上穿长期均线
-        golden_cross = (df['ma_7'] > df['ma_25']) & (df['ma_7'].shift(1) <= df['ma_25'].shift(1))
+        golden_cross = (short > long) & (short.shift(1) <= long.shift(1))
         
         # 死叉：短期均线下穿长期均线
-        death_cross = (df['ma_7'] < df['ma_25']) & (df['ma_7'].shift(1) >= df['ma_25'].shift(1))
+        death_cross = (short < long) & (short.shift(1) >= long.shift(1))
         
         df.loc[golden_cross, 'signal'] = 'BUY'
         df.loc[death_cross, 'signal'] = 'SELL'
@@ -84,7 +228,7 @@ class TradingStrategy:
         """
         RSI策略
         
-        RSI < 30 超卖买入，RSI > 70 超买卖出
+        RSI 低于超卖线（默认30）买入，高于超买线（默认70）卖出
         
         Args:
             data: DataFrame
@@ -92,15 +236,17 @@ class TradingStrategy:
         Returns:
             DataFrame: 添加了信号的数据
         """
-        df = data.copy()
+        df = data.copy(deep=False)  # 只新增 signal 列，输入列写时复制共享
+        rsi = df[self.columns['rsi']]
+        oversold_level, overbought_level = self.params['oversold'], self.params['overbought']
         
         df['signal'] = 'HOLD'
         
         # 超卖区买入
-        oversold = (df['rsi'] < 30) & (df['rsi'].shift(1) >= 30)
+        oversold = (rsi < oversold_level) & (rsi.shift(1) >= oversold_level)
         
         # 超买区卖出
-        overbought = (df['rsi'] > 70) & (df['rsi'].shift(1) <= 70)
+        overbought = (rsi > overbought_level) & (rsi.shift(1) <= overbought_level)
         
         df.loc[oversold, 'signal'] = 'BUY'
         df.loc[overbought, 'signal'] = 'SELL'
@@ -121,15 +267,16 @@ class TradingStrategy:
         Returns:
             DataFrame: 添加了信号的数据
         """
-        df = data.copy()
+        df = data.copy(deep=False)  # 只新增 signal 列，输入列写时复制共享
+        macd, signal = df[self.columns['macd']], df[self.columns['macd_signal']]
         
         df['signal'] = 'HOLD'
         
         # MACD金叉
-        macd_bullish = (df['macd'] > df['macd_signal']) & (df['macd'].shift(1) <= df['macd_signal'].shift(1))
+        macd_bullish = (macd > signal) & (macd.shift(1) <= signal.shift(1))
         
         # MACD死叉
-        macd_bearish = (df['macd'] < df['macd_signal']) & (df['macd'].shift(1) >= df['macd_signal'].shift(1))
+        macd_bearish = (macd < signal) & (macd.shift(1) >= signal.shift(1))
         
         df.loc[macd_bullish, 'signal'] = 'BUY'
         df.loc[macd_bearish, 'signal'] = 'SELL'
@@ -138,6 +285,36 @@ class TradingStrategy:
         
         return df
     
+    def bollinger_strategy(self, data):
+        """
+        布林带策略
+        
+        收盘价跌破下轨买入，突破上轨卖出
+        
+        Args:
+            data: DataFrame
+        
+        Returns:
+            DataFrame: 添加了信号的数据
+        """
+        df = data.copy(deep=False)  # 只新增 signal 列，输入列写时复制共享
+        close, upper, lower = df['close'], df[self.columns['bb_upper']], df[self.columns['bb_lower']]
+        
+        df['signal'] = 'HOLD'
+        
+        # 跌破下轨
+        below_lower = (close < lower) & (close.shift(1) >= lower.shift(1))
+        
+        # 突破上轨
+        above_upper = (close > upper) & (close.shift(1) <= upper.shift(1))
+        
+        df.loc[below_lower, 'signal'] = 'BUY'
+        df.loc[above_upper, 'signal'] = 'SELL'
+        
+        logger.info(f"布林带策略 - 买入信号: {below_lower.sum()}, 卖出信号: {above_upper.sum()}")
+        
+        return df
+    
     def combined_strategy(self, data):
         """
         组合策略
@@ -150,32 +327,35 @@ class TradingStrategy:
         Returns:
             DataFrame: 添加了信号的数据
         """
-        df = data.copy()
+        df = data.copy(deep=False)  # 只新增 signal 列，输入列写时复制共享
+        ma_short, ma_long, ma_mid = (df[self.columns[key]] for key in ('ma_short', 'ma_long', 'ma_mid'))
+        rsi = df[self.columns['rsi']]
+        macd, signal, histogram = (df[self.columns[key]] for key in ('macd', 'macd_signal', 'macd_histogram'))
         
         df['signal'] = 'HOLD'
         
         # 买入条件：多个指标确认
         buy_conditions = (
             # MA金叉
-            (df['ma_7'] > df['ma_25']) &
+            (ma_short > ma_long) &
             # RSI不在超买区
-            (df['rsi'] < 70) &
+            (rsi < self.params['overbought']) &
             # MACD为正或即将金叉
-            ((df['macd'] > df['macd_signal']) | (df['macd_histogram'] > df['macd_histogram'].shift(1))) &
+            ((macd > signal) | (histogram > histogram.shift(1))) &
             # 价格在中期均线之上
-            (df['close'] > df['ma_50'])
+            (df['close'] > ma_mid)
         )
         
         # 卖出条件：多个指标确认
         sell_conditions = (
             # MA死叉
-            (df['ma_7'] < df['ma_25']) &
+            (ma_short < ma_long) &
             # RSI不在超卖区
-            (df['rsi'] > 30) &
+            (rsi > self.params['oversold']) &
             # MACD为负或即将死叉
-            ((df['macd'] < df['macd_signal']) | (df['macd_histogram'] < df['macd_histogram'].shift(1))) &
+            ((macd < signal) | (histogram < histogram.shift(1))) &
             # 价格在中期均线之下
-            (df['close'] < df['ma_50'])
+            (df['close'] < ma_mid)
         )
         
         df.loc[buy_conditions, 'signal'] = 'BUY'
@@ -185,12 +365,70 @@ class TradingStrategy:
         
         return df
     
+    def ma_crossover_signal_matrix(self, data, short_periods, long_periods):
+        """
+        MA交叉策略的参数网格：所有 (短周期, 长周期) 组合的信号一次算出
+        
+        所有周期的均线来自同一次前缀和，判断规则与 ma_crossover_strategy 相同；
+        参数组合按 Config.MATRIX_BACKTEST_CHUNK_BYTES 分块比较，只有信号矩阵为完整大小。
+        
+        Args:
+            data: DataFrame包含OHLCV数据
+            short_periods: 短期均线周期序列
+            long_periods: 长期均线周期序列
+        
+        Returns:
+            tuple: (信号矩阵 (时间 × 组合) int8, 组合参数列表 [{short_period, long_period}, ...])
+        """
+        variants = [{'short_period': short, 'long_period': long}
+                    for short in short_periods for long in long_periods if short < long]
+        periods = sorted({period for variant in variants for period in variant.values()})
+        column = {period: j for j, period in enumerate(periods)}
+        averages = TechnicalIndicators.moving_average_grid(data, periods)
+        
+        codes = np.empty((len(averages), len(variants)), dtype=np.int8)
+        chunk = max(1, Config.MATRIX_BACKTEST_CHUNK_BYTES // (4 * averages.itemsize * max(len(averages), 1)))
+        for j in range(0, len(variants), chunk):
+            batch = variants[j:j + chunk]
+            fast = averages[:, [column[v['short_period']] for v in batch]]
+            slow = averages[:, [column[v['long_period']] for v in batch]]
+            prev_fast, prev_slow = _previous_row(fast), _previous_row(slow)
+            codes[:, j:j + chunk] = _signal_codes((fast > slow) & (prev_fast <= prev_slow),
+                                                  (fast < slow) & (prev_fast >= prev_slow))
+        return codes, variants
+    
+    def rsi_signal_matrix(self, data, periods, oversold=30, overbought=70):
+        """
+        RSI策略的参数网格：所有RSI周期的信号一次算出
+        
+        各周期的RSI共用同一组涨跌序列，判断规则与 rsi_strategy 相同。
+        
+        Args:
+            data: DataFrame包含OHLCV数据
+            periods: RSI周期序列
+            oversold: 超卖阈值
+            overbought: 超买阈值
+        
+        Returns:
+            tuple: (信号矩阵 (时间 × 周期) int8, 参数列表 [{rsi_period}, ...])
+        """
+        rsi = TechnicalIndicators.rsi_grid(data, periods)
+        prev_rsi = _previous_row(rsi)
+        
+        codes = _signal_codes((rsi < oversold) & (prev_rsi >= oversold),
+                              (rsi > overbought) & (prev_rsi <= overbought))
+        return codes, [{'rsi_period': period} for period in periods]
+    
     def get_strategy_description(self):
         """获取策略描述"""
+        if self.strategy_name not in self.DEFAULT_PARAMS:
+            return '未知策略'
+        p = self.params
         descriptions = {
-            'ma_crossover': '移动平均线交叉策略 - 短期MA(7)与长期MA(25)交叉',
-            'rsi': 'RSI策略 - 超卖(<30)买入，超买(>70)卖出',
+            'ma_crossover': f"移动平均线交叉策略 - 短期MA({p.get('short_period')})与长期MA({p.get('long_period')})交叉",
+            'rsi': f"RSI策略 - 超卖(<{p.get('oversold')})买入，超买(>{p.get('overbought')})卖出",
             'macd': 'MACD策略 - MACD线与信号线交叉',
+            'bollinger': f"布林带策略 - 跌破下轨买入，突破上轨卖出 (周期{p.get('bb_period')}, {p.get('bb_std')}倍标准差)",
             'combined': '组合策略 - 结合MA、RSI、MACD的多重确认'
         }
-        return descriptions.get(self.strategy_name, '未知策略')
+        return descriptions[self.strategy_name]
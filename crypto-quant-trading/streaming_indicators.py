@@ -0,0 +1,312 @@
+"""
+流式技术指标模块 - 每根新K线以O(1)时间增量更新指标
+
+每个类对应 indicators.py 中的一个批量指标，结果逐根与批量实现一致
+（窗口未填满时同样返回NaN）。update(bar) 接收一根K线（含 open/high/low/close/volume
+的字典或Series），返回该K线对应的最新指标值。
+"""
+
+import math
+from collections import deque
+import pandas as pd
+from indicators import TechnicalIndicators, ALL_INDICATOR_COLUMNS
+
+NAN = float('nan')
+
+
+def _safe_div(numerator, denominator):
+    """与pandas一致的除法：x/0 为 ±inf，0/0 为 NaN"""
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return NAN
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+    return numerator / denominator
+
+
+class RollingSum:
+    """固定窗口的滑动求和（Kahan补偿，避免长时间运行的舍入漂移）"""
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self._compensation = 0.0
+
+    def _add(self, value):
+        y = value - self._compensation
+        t = self.total + y
+        self._compensation = (t - self.total) - y
+        self.total = t
+
+    def update(self, value):
+        """加入新值，返回窗口是否已填满"""
+        self.window.append(value)
+        self._add(value)
+        if len(self.window) > self.period:
+            self._add(-self.window.popleft())
+        return len(self.window) == self.period
+
+
+class StreamingSMA:
+    """简单移动平均 (对应 TechnicalIndicators.moving_average)"""
+
+    def __init__(self, period, column='close'):
+        self.column = column
+        self._sum = RollingSum(period)
+        self.period = period
+        self.value = NAN
+
+    def update(self, bar):
+        full = self._sum.update(float(bar[self.column]))
+        self.value = self._sum.total / self.period if full else NAN
+        return self.value
+
+
+class StreamingEMA:
+    """指数移动平均，adjust=False (对应 TechnicalIndicators.exponential_moving_average)"""
+
+    def __init__(self, period, column='close'):
+        self.column = column
+        self.alpha = 2.0 / (period + 1)
+        self.value = NAN
+
+    def update_value(self, x):
+        """直接用数值更新（供MACD信号线等复合指标使用）"""
+        if math.isnan(self.value):
+            self.value = x
+        else:
+            self.value = self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def update(self, bar):
+        return self.update_value(float(bar[self.column]))
+
+
+class StreamingRSI:
+    """相对强弱指标，涨跌幅取简单平均 (对应 TechnicalIndicators.rsi)"""
+
+    def __init__(self, period=14, column='close'):
+        self.column = column
+        self.period = period
+        self._gain = RollingSum(period)
+        self._loss = RollingSum(period)
+        self._prev = None
+        self.value = NAN
+
+    def update(self, bar):
+        price = float(bar[self.column])
+        # 批量实现中第一根K线的涨跌为0（diff为NaN，where后填0）
+        delta = 0.0 if self._prev is None else price - self._prev
+        self._prev = price
+
+        full = self._gain.update(delta if delta > 0 else 0.0)
+        self._loss.update(-delta if delta < 0 else 0.0)
+        if not full:
+            self.value = NAN
+            return self.value
+
+        rs = _safe_div(self._gain.total / self.period, self._loss.total / self.period)
+        self.value = 100 - 100 / (1 + rs) if not math.isnan(rs) else NAN
+        return self.value
+
+
+class StreamingMACD:
+    """MACD (对应 TechnicalIndicators.macd)"""
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9, column='close'):
+        self.column = column
+        self._fast = StreamingEMA(fast_period)
+        self._slow = StreamingEMA(slow_period)
+        self._signal = StreamingEMA(signal_period)
+        self.value = (NAN, NAN, NAN)
+
+    def update(self, bar):
+        price = float(bar[self.column])
+        macd_line = self._fast.update_value(price) - self._slow.update_value(price)
+        signal_line = self._signal.update_value(macd_line)
+        self.value = (macd_line, signal_line, macd_line - signal_line)
+        return self.value
+
+
+class StreamingBollinger:
+    """布林带 (对应 TechnicalIndicators.bollinger_bands)
+
+    滑动窗口的均值和方差用Welford式增量更新，移入和移出同时处理，
+    不使用 sum(x^2) - n*mean^2 这类容易相消的公式。
+    """
+
+    def __init__(self, period=20, std_dev=2, column='close'):
+        self.column = column
+        self.period = period
+        self.std_dev = std_dev
+        self.window = deque()
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.value = (NAN, NAN, NAN)
+
+    def update(self, bar):
+        x = float(bar[self.column])
+        self.window.append(x)
+
+        if len(self.window) <= self.period:
+            n = len(self.window)
+            delta = x - self.mean
+            self.mean += delta / n
+            self._m2 += delta * (x - self.mean)
+        else:
+            old = self.window.popleft()
+            old_mean = self.mean
+            self.mean += (x - old) / self.period
+            self._m2 += (x - old) * (x - self.mean + old - old_mean)
+            self._m2 = max(self._m2, 0.0)
+
+        if len(self.window) < self.period:
+            self.value = (NAN, NAN, NAN)
+            return self.value
+
+        std = math.sqrt(self._m2 / (self.period - 1)) if self.period > 1 else NAN
+        self.value = (self.mean + std * self.std_dev, self.mean, self.mean - std * self.std_dev)
+        return self.value
+
+
+class StreamingStochastic:
+    """随机震荡指标 %K (对应 TechnicalIndicators.stochastic_oscillator)
+
+    窗口最低价/最高价用单调队列维护，每根K线均摊O(1)。
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self._count = 0
+        self._lows = deque()  # (序号, 最低价)，最低价单调递增
+        self._highs = deque()  # (序号, 最高价)，最高价单调递减
+        self.value = NAN
+
+    def update(self, bar):
+        i = self._count
+        self._count += 1
+        low, high, close = float(bar['low']), float(bar['high']), float(bar['close'])
+
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((i, low))
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((i, high))
+
+        window_start = i - self.period + 1
+        if self._lows[0][0] < window_start:
+            self._lows.popleft()
+        if self._highs[0][0] < window_start:
+            self._highs.popleft()
+
+        if self._count < self.period:
+            self.value = NAN
+            return self.value
+
+        low_min = self._lows[0][1]
+        high_max = self._highs[0][1]
+        self.value = 100 * _safe_div(close - low_min, high_max - low_min)
+        return self.value
+
+
+class StreamingATR:
+    """平均真实波幅 (对应 TechnicalIndicators.atr)"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self._sum = RollingSum(period)
+        self._prev_close = None
+        self.value = NAN
+
+    def update(self, bar):
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        true_range = high - low
+        if self._prev_close is not None:
+            true_range = max(true_range, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+
+        full = self._sum.update(true_range)
+        self.value = self._sum.total / self.period if full else NAN
+        return self.value
+
+
+class StreamingOBV:
+    """能量潮 (对应 TechnicalIndicators.obv)"""
+
+    def __init__(self):
+        self._prev_close = None
+        self.value = 0.0
+
+    def update(self, bar):
+        close, volume = float(bar['close']), float(bar['volume'])
+        if self._prev_close is not None and close != self._prev_close:
+            self.value += volume if close > self._prev_close else -volume
+        self._prev_close = close
+        return self.value
+
+
+class StreamingIndicatorSet:
+    """与 TechnicalIndicators.add_all_indicators 列相同的流式指标集合"""
+
+    def __init__(self, history=2):
+        """
+        Args:
+            history: feed() 返回的最近K线数量（交叉类策略至少需要2根）
+        """
+        self.ma = {period: StreamingSMA(period) for period in (7, 25, 50, 200)}
+        self.ema = {period: StreamingEMA(period) for period in (12, 26)}
+        self.rsi = StreamingRSI(14)
+        self.macd = StreamingMACD()
+        self.bollinger = StreamingBollinger()
+        self.stochastic = StreamingStochastic()
+        self.atr = StreamingATR()
+        self.obv = StreamingOBV()
+        self.last_timestamp = None
+        self._history = deque(maxlen=history)
+
+    @staticmethod
+    def lookback():
+        """全部指标的最大回看长度（见 TechnicalIndicators.lookback）"""
+        return TechnicalIndicators.lookback(ALL_INDICATOR_COLUMNS)
+
+    def update(self, bar):
+        """
+        用一根新K线更新所有指标
+
+        Args:
+            bar: 含 open/high/low/close/volume 的字典或Series
+
+        Returns:
+            dict: {指标列名: 最新值}，列名与 add_all_indicators 相同
+        """
+        values = {f'ma_{period}': sma.update(bar) for period, sma in self.ma.items()}
+        values.update({f'ema_{period}': ema.update(bar) for period, ema in self.ema.items()})
+        values['rsi'] = self.rsi.update(bar)
+        values['macd'], values['macd_signal'], values['macd_histogram'] = self.macd.update(bar)
+        values['bb_upper'], values['bb_middle'], values['bb_lower'] = self.bollinger.update(bar)
+        values['stoch_k'] = self.stochastic.update(bar)
+        values['atr'] = self.atr.update(bar)
+        values['obv'] = self.obv.update(bar)
+        return values
+
+    def feed(self, df):
+        """
+        把DataFrame中晚于上次更新的K线依次送入指标（已处理过的K线自动跳过，
+        重连补数据后可以直接传入整个缓冲区）
+
+        Args:
+            df: 以时间戳为索引、按时间升序的OHLCV数据
+
+        Returns:
+            DataFrame: 最近 history 根K线的OHLCV及指标，格式与 add_all_indicators 相同
+        """
+        if self.last_timestamp is not None:
+            df = df[df.index > self.last_timestamp]
+        for timestamp, bar in zip(df.index, df.to_dict('records')):
+            bar.update(self.update(bar))
+            self._history.append((timestamp, bar))
+            self.last_timestamp = timestamp
+
+        index = pd.DatetimeIndex([ts for ts, _ in self._history], name='timestamp')
+        return pd.DataFrame([bar for _, bar in self._history], index=index)
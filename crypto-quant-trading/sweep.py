@@ -0,0 +1,252 @@
+"""
+参数扫描模块 - 在进程池中回测策略参数空间的全部组合
+
+- 参数空间为 {参数名: 取值列表}，展开为笛卡尔积并去掉无效组合（如短周期不小于长周期）
+- OHLCV 数组放入一块共享内存，工作进程启动时按名称附加一次，任务只传参数字典，
+  不为每个任务序列化整张行情表
+- 每完成一组参数立即向结果CSV追加一行；对同一结果文件重新运行时跳过已完成的
+  参数组合（断点续跑），最后读取整个文件排序。结果文件旁的 .json 记录运行设置
+  （资金、手续费、止损止盈、趋势过滤等）和数据范围，与本次不一致时拒绝续跑
+- 各工作进程有独立的指标缓存，不同参数组合共用的均线、EMA等只计算一次
+"""
+
+import os
+import csv
+import json
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from config import Config
+from kline_store import OHLCV_COLUMNS
+from strategy import TradingStrategy
+from backtester import Backtester
+from indicator_cache import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# 各策略的默认参数空间（main.py --sweep-space 可用JSON文件替换）
+DEFAULT_SPACES = {
+    'ma_crossover': {'short_period': [5, 7, 10, 15, 20], 'long_period': [20, 25, 30, 50, 100, 200]},
+    'rsi': {'rsi_period': [7, 14, 21], 'oversold': [20, 25, 30, 35], 'overbought': [65, 70, 75, 80]},
+    'macd': {'fast_period': [8, 12, 16], 'slow_period': [21, 26, 34], 'signal_period': [5, 9, 13]},
+    'bollinger': {'bb_period': [10, 20, 30, 50], 'bb_std': [1.5, 2, 2.5, 3]},
+    'combined': {'short_period': [5, 7, 10], 'long_period': [20, 25, 50], 'mid_period': [50, 100],
+                 'rsi_period': [14], 'oversold': [25, 30], 'overbought': [70, 75],
+                 'fast_period': [8, 12], 'slow_period': [26], 'signal_period': [9]}
+}
+
+# 参数之间的大小约束：(较小的参数, 较大的参数)
+_ORDERED_PARAMS = [('short_period', 'long_period'), ('fast_period', 'slow_period'), ('oversold', 'overbought')]
+
+
+def parameter_grid(space):
+    """
+    参数空间展开为参数组合列表
+
+    Args:
+        space: {参数名: 取值列表}
+
+    Returns:
+        list: 参数字典列表（按参数空间的顺序，已去掉违反大小约束的组合）
+    """
+    names = list(space)
+    grid = []
+    for values in itertools.product(*(space[name] for name in names)):
+        params = dict(zip(names, values))
+        if all(params[low] < params[high] for low, high in _ORDERED_PARAMS if low in params and high in params):
+            grid.append(params)
+    return grid
+
+
+class SharedOHLCV:
+    """放在共享内存中的OHLCV数据，工作进程按 spec 附加为只读DataFrame"""
+
+    def __init__(self, data):
+        """
+        Args:
+            data: DataFrame包含OHLCV列，时间索引
+        """
+        self.length = len(data)
+        self.index_dtype = data.index.dtype.str
+        self.dtype = np.result_type(*data[OHLCV_COLUMNS].dtypes).str
+        itemsize = np.dtype(self.dtype).itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, self.length * (8 + 5 * itemsize)))
+        index, values = _shared_arrays(self._shm, self.length, self.index_dtype, self.dtype)
+        index[:] = data.index.values
+        values[:] = data[OHLCV_COLUMNS].to_numpy(dtype=self.dtype).T
+
+    @property
+    def spec(self):
+        """工作进程附加所需的信息（名称、长度、数据类型）"""
+        return self._shm.name, self.length, self.index_dtype, self.dtype
+
+    def close(self):
+        """释放共享内存"""
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def attach(spec):
+        """
+        按 spec 附加共享内存
+
+        Returns:
+            tuple: (SharedMemory, DataFrame)；DataFrame直接引用共享内存，使用期间须保持 SharedMemory 不被释放
+        """
+        name, length, index_dtype, dtype = spec
+        shm = shared_memory.SharedMemory(name=name)
+        index, values = _shared_arrays(shm, length, index_dtype, dtype)
+        index = pd.DatetimeIndex(index, name='timestamp')
+        return shm, pd.DataFrame(values.T, index=index, columns=OHLCV_COLUMNS, copy=False)
+
+
+def _shared_arrays(shm, length, index_dtype, dtype):
+    """共享内存布局：时间索引，其后为 (列 × 时间) 的OHLCV数组"""
+    index = np.ndarray((length,), dtype=index_dtype, buffer=shm.buf)
+    values = np.ndarray((len(OHLCV_COLUMNS), length), dtype=dtype, buffer=shm.buf, offset=length * 8)
+    return index, values
+
+
+# 工作进程状态（由 _init_worker 设置）
+_worker = {}
+
+
+def _init_worker(spec, settings, strategy_name, strategy_kwargs, backtester_kwargs, start):
+    for key, value in settings.items():
+        setattr(Config, key, value)
+    logging.getLogger().setLevel(logging.WARNING)  # 每组参数的信号与成交日志不输出
+    shm, data = SharedOHLCV.attach(spec)
+    _worker.update(shm=shm, data=data, strategy_name=strategy_name, strategy_kwargs=strategy_kwargs,
+                   backtester=Backtester(**backtester_kwargs), start=start)
+
+
+def _evaluate(params):
+    strategy = TradingStrategy(_worker['strategy_name'], params=params, **_worker['strategy_kwargs'])
+    results = _worker['backtester'].run(_worker['data'], strategy, start=_worker['start'], log_trades=False)
+    return params, {key: results[key] for key in Backtester.SUMMARY_METRICS}
+
+
+def config_snapshot():
+    """
+    传给工作进程的配置：当前配置的全部取值（spawn 启动的进程不继承主进程修改过的配置），
+    指标计算改为单线程，避免每个进程再各开 CPU 核数个线程
+    """
+    settings = {key: value for key, value in vars(Config).items() if key.isupper()}
+    settings['INDICATOR_THREADS'] = 1
+    return settings
+
+
+def _run_settings(data, strategy_name, start, strategy_kwargs, backtester_kwargs):
+    """影响回测结果的运行设置和数据范围（JSON可序列化）"""
+    backtester = Backtester(**backtester_kwargs)
+    settings = {
+        'strategy': strategy_name,
+        **strategy_kwargs,
+        'start': None if start is None else str(pd.Timestamp(start)),
+        **{key: getattr(backtester, key) for key in ('initial_capital', 'commission', 'position_size',
+                                                       'stop_loss', 'take_profit', 'fill_price')},
+        'data_start': str(data.index[0]) if len(data) else None,
+        'data_end': str(data.index[-1]) if len(data) else None,
+        'bars': len(data),
+        'data_fingerprint': fingerprint(data[OHLCV_COLUMNS].to_numpy()),
+    }
+    return json.loads(json.dumps(settings))
+
+
+def _check_settings(path, settings):
+    """结果文件的运行设置（path + '.json'）：新文件时写入，已有结果时必须与本次一致"""
+    settings_path = path + '.json'
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        previous = None
+        if os.path.exists(settings_path):
+            with open(settings_path) as f:
+                previous = json.load(f)
+        if previous != settings:
+            raise ValueError(f"结果文件 {path} 由不同的运行设置或数据生成（见 {settings_path}），"
+                             f"请换一个输出文件")
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(settings_path, 'w') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+
+
+def _completed(path, names):
+    """已写入结果文件的参数组合（按CSV中的字符串比较）"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        if header != names + Backtester.SUMMARY_METRICS:
+            raise ValueError(f"结果文件 {path} 的列与参数空间不一致，请换一个输出文件")
+        return {tuple(row[:len(names)]) for row in reader if len(row) == len(header)}
+
+
+def run_sweep(data, strategy_name, space, output, start=None, trend_filter=None, interval=None,
+              backtester_kwargs=None, workers=None):
+    """
+    在进程池中回测参数空间的全部组合，结果逐行写入CSV
+
+    Args:
+        data: DataFrame包含OHLCV数据（含预热K线）
+        strategy_name: 策略名称
+        space: 参数空间 {参数名: 取值列表}，参数名见 TradingStrategy.DEFAULT_PARAMS
+        output: 结果CSV路径；已存在时跳过其中已完成的参数组合（运行设置和数据须与之前一致）
+        start: 回测开始时间（之前的K线只用于预热）
+        trend_filter: 趋势过滤指标列
+        interval: K线间隔
+        backtester_kwargs: Backtester 的参数（初始资金、手续费、止损止盈等）
+        workers: 进程数，默认 Config.SWEEP_WORKERS（None为CPU核数）
+
+    Returns:
+        DataFrame: 全部参数组合的结果表（含之前运行已完成的），按 Backtester.rank_results 排序
+    """
+    names = list(space)
+    grid = parameter_grid(space)
+    if not grid:
+        raise ValueError("参数空间没有有效的参数组合")
+    TradingStrategy(strategy_name, params=grid[0])  # 参数名不属于该策略时在主进程报错
+
+    strategy_kwargs = {'trend_filter': trend_filter, 'interval': interval}
+    backtester_kwargs = backtester_kwargs or {}
+    done = _completed(output, names)
+    _check_settings(output, _run_settings(data, strategy_name, start, strategy_kwargs, backtester_kwargs))
+    pending = [params for params in grid if tuple(str(params[name]) for name in names) not in done]
+    logger.info(f"参数扫描 {strategy_name}: 共 {len(grid)} 组参数，已完成 {len(grid) - len(pending)} 组，"
+                f"本次运行 {len(pending)} 组")
+
+    if pending:
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        with SharedOHLCV(data) as shared, open(output, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(names + Backtester.SUMMARY_METRICS)
+                f.flush()
+            initargs = (shared.spec, config_snapshot(), strategy_name, strategy_kwargs,
+                        backtester_kwargs, start)
+            with ProcessPoolExecutor(max_workers=workers or Config.SWEEP_WORKERS, initializer=_init_worker,
+                                     initargs=initargs) as pool:
+                futures = [pool.submit(_evaluate, params) for params in pending]
+                try:
+                    for finished, future in enumerate(as_completed(futures), 1):
+                        params, metrics = future.result()
+                        writer.writerow([params[name] for name in names] +
+                                        [metrics[key] for key in Backtester.SUMMARY_METRICS])
+                        f.flush()
+                        if finished % 50 == 0 or finished == len(futures):
+                            logger.info(f"已完成 {finished}/{len(futures)} 组参数")
+                except KeyboardInterrupt:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    logger.warning(f"参数扫描中断，已完成的结果保存在 {output}，重新运行同一命令继续")
+                    raise
+
+    return Backtester.rank_results(pd.read_csv(output))
@@ -0,0 +1,223 @@
+"""
+滚动优化（walk-forward）模块 - 在训练窗口上选参数，在随后的测试窗口上检验
+
+- 历史数据按训练/测试窗口切分：滚动模式训练窗口长度固定，锚定模式训练窗口
+  始终从起点开始并逐步变长；每次向前移动一个测试窗口，测试窗口首尾相接
+- 每组参数的信号只在整段历史上生成一次（指标只依赖当前及之前的K线，切片后
+  与在窗口内重新计算等价且预热更充分），写入共享内存中的 (参数组合 × 时间)
+  信号矩阵，重叠窗口共用同一份指标结果，总成本接近一次参数扫描
+- 各窗口在进程池中并行：用 Backtester.run_signal_matrix 对训练窗口内的全部参数
+  组合同时回测并排名，取第一名在测试窗口回测
+- 测试窗口开始时空仓，结束时按最后收盘价平仓并扣除手续费；各窗口的资金曲线
+  按上一窗口平仓后的资金依次衔接为一条样本外资金曲线
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from config import Config
+from strategy import TradingStrategy, signal_codes, signal_labels
+from backtester import Backtester
+from sweep import SharedOHLCV, parameter_grid, config_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def parse_period(period):
+    """
+    窗口长度转换为K线根数（int）或时间长度（Timedelta）
+
+    Args:
+        period: 整数或数字字符串为K线根数，其他字符串（如 '180D'、'12h'）为时间长度
+    """
+    if isinstance(period, str) and period.isdigit():
+        period = int(period)
+    if not isinstance(period, int):
+        period = pd.Timedelta(period)
+    if period <= type(period)(0):
+        raise ValueError(f"窗口长度必须为正: {period}")
+    return period
+
+
+def _shift(index, position, period, sign=1):
+    """从第 position 根K线前后移动一个窗口长度后的位置"""
+    if isinstance(period, int):
+        return position + sign * period
+    return int(index.searchsorted(index[position] + sign * period))
+
+
+def walk_forward_windows(index, train, test, start=None, anchored=False):
+    """
+    切分训练/测试窗口
+
+    Args:
+        index: 时间索引
+        train: 训练窗口长度，见 parse_period
+        test: 测试窗口长度，见 parse_period
+        start: 第一个训练窗口的开始时间（之前的K线只用于指标预热）
+        anchored: True 为锚定模式（训练窗口从 start 开始逐步变长）
+
+    Returns:
+        list: (训练开始, 训练结束/测试开始, 测试结束) 位置元组，区间左闭右开
+    """
+    train, test = parse_period(train), parse_period(test)
+    n = len(index)
+    first = int(index.searchsorted(pd.Timestamp(start))) if start is not None else 0
+    windows = []
+    if first >= n:
+        return windows
+    train_end = min(_shift(index, first, train), n)
+    while train_end < n:
+        test_end = min(_shift(index, train_end, test), n)
+        train_start = first if anchored else max(first, _shift(index, train_end, train, -1))
+        windows.append((train_start, train_end, test_end))
+        train_end = test_end
+    return windows
+
+
+# 工作进程状态（由 _init_worker 设置）
+_worker = {}
+
+
+def _init_worker(data_spec, signals_spec, settings, strategy_name, strategy_kwargs, backtester_kwargs, grid):
+    for key, value in settings.items():
+        setattr(Config, key, value)
+    logging.getLogger().setLevel(logging.WARNING)  # 每组参数的信号与成交日志不输出
+    shm, data = SharedOHLCV.attach(data_spec)
+    name, shape = signals_spec
+    signals_shm = shared_memory.SharedMemory(name=name)
+    _worker.update(shm=shm, data=data, signals_shm=signals_shm,
+                   signals=np.ndarray(shape, dtype=np.int8, buffer=signals_shm.buf),
+                   strategy_name=strategy_name, strategy_kwargs=strategy_kwargs,
+                   backtester=Backtester(**backtester_kwargs), grid=grid)
+
+
+def _signal_task(j):
+    """在整段历史上生成第 j 组参数的信号，写入信号矩阵第 j 行"""
+    strategy = TradingStrategy(_worker['strategy_name'], params=_worker['grid'][j], **_worker['strategy_kwargs'])
+    _worker['signals'][j] = signal_codes(strategy.generate_signals(_worker['data'])['signal'])
+    return j
+
+
+def _window_task(window):
+    """训练窗口内选出最优参数，在测试窗口回测"""
+    train_start, train_end, test_end = window
+    data, signals, backtester = _worker['data'], _worker['signals'], _worker['backtester']
+    # 参数组合编号随结果表一起排序，用于取回第一名的信号
+    variants = [dict(params, variant=j) for j, params in enumerate(_worker['grid'])]
+    ranked = backtester.run_signal_matrix(data.iloc[train_start:train_end],
+                                          signals[:, train_start:train_end].T, variants)
+    best = ranked.iloc[0]
+    j = int(best['variant'])
+
+    df = data.iloc[train_end:test_end][['open', 'high', 'low', 'close']]
+    df = df.assign(signal=signal_labels(signals[j, train_end:test_end]))
+    results = backtester.run_signals(df, log_trades=False)
+    return (j, {key: best[key] for key in Backtester.SUMMARY_METRICS},
+            {key: results[key] for key in Backtester.SUMMARY_METRICS},
+            results['portfolio_value'], results['trades'])
+
+
+def _closing_value(trades, initial_capital, commission):
+    """按成交记录（含期末强制平仓）推算窗口结束时的现金：买入花费 value/(1-手续费)，卖出收回 value"""
+    cash = initial_capital
+    for trade in trades:
+        if trade['type'] == 'BUY':
+            cash -= trade['value'] / (1 - commission)
+        else:
+            cash += trade['value']
+    return cash
+
+
+def run_walk_forward(data, strategy_name, space, train, test, start=None, anchored=False, trend_filter=None,
+                     interval=None, backtester_kwargs=None, workers=None):
+    """
+    滚动优化：各训练窗口内选出最优参数组合，衔接各测试窗口的样本外回测
+
+    Args:
+        data: DataFrame包含OHLCV数据（含预热K线）
+        strategy_name: 策略名称
+        space: 参数空间 {参数名: 取值列表}，参数名见 TradingStrategy.DEFAULT_PARAMS
+        train: 训练窗口长度，见 parse_period
+        test: 测试窗口长度，见 parse_period
+        start: 第一个训练窗口的开始时间（之前的K线只用于预热）
+        anchored: True 为锚定模式（训练窗口从 start 开始逐步变长），否则为滚动模式
+        trend_filter: 趋势过滤指标列
+        interval: K线间隔
+        backtester_kwargs: Backtester 的参数（初始资金、手续费、止损止盈等）
+        workers: 进程数，默认 Config.SWEEP_WORKERS（None为CPU核数）
+
+    Returns:
+        dict: 样本外回测结果（与 Backtester.run 的结果格式相同，资金曲线为各测试窗口衔接而成，
+            期末价值为最后一个窗口平仓后的资金），另含 windows：每个窗口一行，包含窗口起止时间、
+            选出的参数、训练和测试指标及该窗口平仓后的资金
+    """
+    grid = parameter_grid(space)
+    if not grid:
+        raise ValueError("参数空间没有有效的参数组合")
+    TradingStrategy(strategy_name, params=grid[0])  # 参数名不属于该策略时在主进程报错
+    windows = walk_forward_windows(data.index, train, test, start=start, anchored=anchored)
+    if not windows:
+        raise ValueError("历史数据不足一个训练窗口，无法进行滚动优化")
+
+    mode = '锚定' if anchored else '滚动'
+    logger.info(f"滚动优化 {strategy_name}（{mode}模式）: {len(windows)} 个窗口，每个窗口 {len(grid)} 组参数")
+
+    backtester_kwargs = backtester_kwargs or {}
+    strategy_kwargs = {'trend_filter': trend_filter, 'interval': interval}
+    shape = (len(grid), len(data))
+    signals_shm = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1]))
+    try:
+        with SharedOHLCV(data) as shared:
+            initargs = (shared.spec, (signals_shm.name, shape), config_snapshot(), strategy_name,
+                        strategy_kwargs, backtester_kwargs, grid)
+            with ProcessPoolExecutor(max_workers=workers or Config.SWEEP_WORKERS, initializer=_init_worker,
+                                     initargs=initargs) as pool:
+                futures = [pool.submit(_signal_task, j) for j in range(len(grid))]
+                for finished, future in enumerate(as_completed(futures), 1):
+                    future.result()
+                    if finished % 50 == 0 or finished == len(futures):
+                        logger.info(f"已生成 {finished}/{len(futures)} 组参数的信号")
+                outcomes = list(pool.map(_window_task, windows))
+    finally:
+        signals_shm.close()
+        signals_shm.unlink()
+
+    # 各测试窗口按初始资金回测，按上一窗口平仓后的资金等比例缩放后衔接
+    backtester = Backtester(**backtester_kwargs)
+    initial = backtester.initial_capital
+    capital = initial
+    rows, pv_frames, trades = [], [], []
+    for (train_start, train_end, test_end), (j, train_metrics, test_metrics, pv_df, window_trades) in zip(
+            windows, outcomes):
+        scale = capital / initial
+        pv_frames.append(pv_df.assign(value=pv_df['value'] * scale, capital=pv_df['capital'] * scale,
+                                      position=pv_df['position'] * scale))
+        trades.extend(dict(trade, quantity=trade['quantity'] * scale, value=trade['value'] * scale)
+                      for trade in window_trades)
+        capital = capital * _closing_value(window_trades, initial, backtester.commission) / initial
+        rows.append({
+            'train_start': data.index[train_start], 'train_end': data.index[train_end - 1],
+            'test_start': data.index[train_end], 'test_end': data.index[test_end - 1],
+            **grid[j],
+            'train_sharpe': train_metrics['sharpe_ratio'],
+            'train_return_pct': train_metrics['total_return_pct'],
+            'test_sharpe': test_metrics['sharpe_ratio'],
+            'test_return_pct': test_metrics['total_return_pct'],
+            'test_max_drawdown': test_metrics['max_drawdown'],
+            'test_trades': test_metrics['num_trades'],
+            'capital': capital
+        })
+
+    results = backtester._calculate_metrics(data.iloc[windows[0][1]:windows[-1][2]],
+                                            pd.concat(pv_frames, ignore_index=True), trades)
+    # 资金曲线记录的是每根K线交易前的价值，期末价值取最后一个窗口平仓后的资金
+    results['final_value'] = capital
+    results['total_return'] = capital - initial
+    results['total_return_pct'] = (capital - initial) / initial * 100
+    results['windows'] = pd.DataFrame(rows)
+    logger.info(f"滚动优化完成: 样本外收益率 {results['total_return_pct']:.2f}%, "
+                f"夏普比率 {results['sharpe_ratio']:.2f}")
+    return results